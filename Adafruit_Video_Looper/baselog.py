@@ -1,13 +1,193 @@
+import atexit
+import copy
 import logging
+import logging.handlers
+import queue
+import sys
+import threading
+import time
+
+# Every logger from getlogger() hands its records to one queue, a single
+# writer thread formats them and writes them to the console and, if [logging]
+# asks for it, a rotating file.  Callers never wait on the console or the SD
+# card.
+
+FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
+# Records waiting for the writer.  When it can't keep up, new records are
+# dropped rather than blocking the caller, the writer reports how many.
+QUEUE_SIZE = 10000
+# At most RATE_LIMIT_BURST records per call site every RATE_LIMIT_INTERVAL
+# seconds, warnings included.  Errors are never limited.
+RATE_LIMIT_INTERVAL = 10.0
+RATE_LIMIT_BURST = 5
+FILE_MAX_BYTES = 1024 * 1024
+FILE_BACKUPS = 3
+
+
+class RateLimitFilter(logging.Filter):
+    """Let through at most burst records per key every interval seconds.
+    The key is the call site, or the rate_key passed in extra.  The first
+    record of a key let through after some were suppressed says how many.
+    """
+
+    def __init__(self, interval=RATE_LIMIT_INTERVAL, burst=RATE_LIMIT_BURST):
+        super().__init__()
+        self.interval = interval
+        self.burst = burst
+        self._lock = threading.Lock()
+        self._windows = {}  # key -> [window start, records, suppressed]
+
+    def filter(self, record):
+        if record.levelno >= logging.ERROR or self.burst <= 0:
+            return True
+        key = getattr(record, 'rate_key', None) or (record.pathname, record.lineno)
+        now = time.monotonic()
+        with self._lock:
+            window = self._windows.get(key)
+            if window is None or now - window[0] >= self.interval:
+                suppressed = window[2] if window is not None else 0
+                self._windows[key] = [now, 1, 0]
+            elif window[1] < self.burst:
+                window[1] += 1
+                suppressed = 0
+            else:
+                window[2] += 1
+                return False
+        if suppressed:
+            record.msg = '%s (%d similar suppressed)' % (record.msg, suppressed)
+        return True
+
+
+class _QueueHandler(logging.handlers.QueueHandler):
+
+    def __init__(self, q):
+        super().__init__(q)
+        self.dropped = 0
+
+    def prepare(self, record):
+        # Merge the args now, they may change before the writer gets to
+        # them.  Timestamps and tracebacks are formatted by the writer.
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class _Writer(logging.Handler):
+    """The writer thread's handler: reports dropped records, then passes
+    records on to the configured handlers.
+    """
+
+    def __init__(self, source, handlers):
+        super().__init__()
+        self._source = source
+        self._reported = source.dropped
+        self.handlers = handlers
+
+    def handle(self, record):
+        dropped = self._source.dropped
+        if dropped != self._reported:
+            note = logging.makeLogRecord({'name': __name__, 'levelno': logging.WARNING, 'levelname': 'WARNING',
+                                          'msg': 'log queue full, dropped %d records' % (dropped - self._reported)})
+            self._reported = dropped
+            self._emit(note)
+        self._emit(record)
+
+    def _emit(self, record):
+        for handler in self.handlers:
+            if record.levelno >= handler.level:
+                handler.handle(record)
+
+    def close(self):
+        for handler in self.handlers:
+            handler.close()
+        super().close()
+
+
+_lock = threading.Lock()
+_level = logging.INFO
+_loggers = {}
+_queue_handler = _QueueHandler(queue.Queue(QUEUE_SIZE))
+_rate_limit = RateLimitFilter()
+_queue_handler.addFilter(_rate_limit)
+_listener = None
+
+
+def _console_handler():
+    console = logging.StreamHandler(sys.stderr)
+    console.setFormatter(logging.Formatter(FORMAT))
+    return console
+
+
+def _start(handlers):
+    """(Re)start the writer thread with handlers.  Call with _lock held."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener.handlers[0].close()
+    _listener = logging.handlers.QueueListener(_queue_handler.queue, _Writer(_queue_handler, handlers))
+    _listener.start()
+
 
 def getlogger(modname):
-    # logger
-    logger = logging.getLogger(modname)
-    logger.setLevel(logging.DEBUG)
-    formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
-
-    console = logging.StreamHandler()
-    console.setLevel(logging.INFO)
-    console.setFormatter(formatter)
-    logger.addHandler(console)
-    return logger
+    """The logger of module modname, writing through the shared queue."""
+    with _lock:
+        logger = _loggers.get(modname)
+        if logger is None:
+            logger = _loggers[modname] = logging.getLogger(modname)
+            logger.setLevel(_level)
+            logger.addHandler(_queue_handler)
+        if _listener is None:
+            _start([_console_handler()])
+        return logger
+
+
+def configure(config):
+    """Apply [logging]: level, rate limiting, console and rotating file."""
+    global _level
+    section = 'logging'
+    level = logging.getLevelName(config.get(section, 'level', fallback='info').strip().upper())
+    _rate_limit.interval = config.getfloat(section, 'rate_limit_interval', fallback=RATE_LIMIT_INTERVAL)
+    _rate_limit.burst = config.getint(section, 'rate_limit_burst', fallback=RATE_LIMIT_BURST)
+    handlers = []
+    if config.getboolean(section, 'console', fallback=True):
+        handlers.append(_console_handler())
+    path = config.get(section, 'file', fallback='').strip()
+    if path:
+        try:
+            rotating = logging.handlers.RotatingFileHandler(
+                path, maxBytes=config.getint(section, 'file_max_bytes', fallback=FILE_MAX_BYTES),
+                backupCount=config.getint(section, 'file_backups', fallback=FILE_BACKUPS))
+            rotating.setFormatter(logging.Formatter(FORMAT))
+            handlers.append(rotating)
+        except OSError as e:
+            print('cannot log to %s: %s' % (path, e), file=sys.stderr)
+            if not handlers:
+                handlers.append(_console_handler())
+    with _lock:
+        _level = level if isinstance(level, int) else logging.INFO
+        for logger in _loggers.values():
+            logger.setLevel(_level)
+        _start(handlers)
+
+
+def flush():
+    """Wait until the writer has written everything logged so far."""
+    if _listener is not None:
+        _queue_handler.queue.join()
+
+
+@atexit.register
+def shutdown():
+    global _listener
+    with _lock:
+        if _listener is not None:
+            _listener.stop()
+            _listener.handlers[0].close()
+            _listener = None
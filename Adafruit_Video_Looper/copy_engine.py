@@ -0,0 +1,174 @@
+# License: GNU GPLv2, see LICENSE.txt
+import concurrent.futures
+import errno
+import os
+import threading
+import time
+
+from . import metrics
+from .baselog import getlogger
+logger = getlogger(__name__)
+
+copied_bytes = metrics.counter('looper_copy_bytes_total', 'Bytes copied from USB drives.')
+copy_failures = metrics.counter('looper_copy_failures_total', 'Files that failed to copy.')
+copy_seconds = metrics.histogram('looper_copy_seconds', 'Time of a copy from USB drives, sync included.',
+                                 buckets=(1, 5, 15, 60, 300, 900, 3600))
+
+# Bytes moved per system call.  Large enough that the syscall overhead
+# vanishes next to the USB transfer, small enough to keep progress moving.
+CHUNK_SIZE = 8 * 1024 * 1024
+
+# Seconds between progress callbacks while copying.
+PROGRESS_INTERVAL = 0.25
+
+# Errors meaning "this copy method doesn't work for these two files", the
+# next one is tried.
+_UNSUPPORTED = (errno.EXDEV, errno.EINVAL, errno.ENOSYS, errno.EOPNOTSUPP, errno.ENOTSUP, errno.EBADF)
+
+
+def _copy_file_range(infd, outfd, chunk):
+    return os.copy_file_range(infd, outfd, chunk)
+
+
+def _sendfile(infd, outfd, chunk):
+    return os.sendfile(outfd, infd, None, chunk)
+
+
+def _read_write(infd, outfd, chunk):
+    buf = os.read(infd, chunk)
+    view = memoryview(buf)
+    while view:
+        view = view[os.write(outfd, view):]
+    return len(buf)
+
+
+# In order of preference: copy in the kernel between the files, through the
+# page cache without a user space copy, plain read/write.
+_METHODS = [m for m in (_copy_file_range if hasattr(os, 'copy_file_range') else None,
+                        _sendfile if hasattr(os, 'sendfile') else None,
+                        _read_write) if m is not None]
+
+
+class CopyProgress:
+    """Bytes copied so far out of total, updated from the copying threads."""
+
+    def __init__(self, total):
+        self.total = total
+        self.copied = 0
+        self._lock = threading.Lock()
+
+    def add(self, n):
+        with self._lock:
+            self.copied += n
+
+
+def copy_file(src, dst, progress=None, chunk=CHUNK_SIZE):
+    """Copy the content of src to dst in chunk sized system calls, adding
+    the bytes copied to progress (a CopyProgress) as it goes.  The data is
+    not synced, see copy_all.  Return the number of bytes copied.
+    """
+    with open(src, 'rb', buffering=0) as fsrc, open(dst, 'wb', buffering=0) as fdst:
+        infd, outfd = fsrc.fileno(), fdst.fileno()
+        if hasattr(os, 'posix_fadvise'):
+            os.posix_fadvise(infd, 0, 0, os.POSIX_FADV_SEQUENTIAL)
+        copied = 0
+        methods = list(_METHODS)
+        while methods:
+            try:
+                while True:
+                    n = methods[0](infd, outfd, chunk)
+                    if n == 0:
+                        return copied
+                    copied += n
+                    if progress is not None:
+                        progress.add(n)
+            except OSError as e:
+                # File offsets move with every successful call, the next
+                # method carries on where this one stopped.
+                if e.errno not in _UNSUPPORTED or len(methods) == 1:
+                    raise
+                methods.pop(0)
+        return copied
+
+
+def _fsync_path(path):
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def sync_files(paths):
+    """Flush the copied files, then the directories holding them, to disk.
+    Unlike os.sync() this leaves the other filesystems (the SD card, the
+    source drives) alone.  Return the list of (path, error) that failed.
+    """
+    failed = []
+    dirs = []
+    for path in paths:
+        parent = os.path.dirname(os.path.abspath(path))
+        if parent not in dirs:
+            dirs.append(parent)
+    for path in list(paths) + dirs:
+        try:
+            _fsync_path(path)
+        except OSError as e:
+            logger.error('sync %s failed: %s' % (path, e))
+            failed.append((path, e))
+    return failed
+
+
+def _copy_list(files, progress):
+    failed = []
+    for src, dst in files:
+        try:
+            copy_file(src, dst, progress)
+        except OSError as e:
+            logger.error('copy %s to %s failed: %s' % (src, dst, e))
+            failed.append((src, dst, e))
+    return failed
+
+
+def copy_all(lists, on_progress=None, interval=PROGRESS_INTERVAL):
+    """Copy lists of (src, dst) pairs, each list on its own thread (one per
+    drive, so drives are read concurrently but each sequentially).  While
+    copying on_progress(progress) is called from the calling thread every
+    interval seconds and once at the end.  The copied files and their
+    directories are synced once, at the end.  Return the list of (src, dst,
+    error) that failed.
+    """
+    lists = [files for files in lists if files]
+    total = 0
+    for files in lists:
+        for src, dst in files:
+            try:
+                total += os.path.getsize(src)
+            except OSError:
+                pass
+    progress = CopyProgress(total)
+    start = time.monotonic()
+    failed = []
+    if lists:
+        with concurrent.futures.ThreadPoolExecutor(max_workers=len(lists), thread_name_prefix='copy') as pool:
+            pending = [pool.submit(_copy_list, files, progress) for files in lists]
+            while pending:
+                done, pending = concurrent.futures.wait(pending, timeout=interval)
+                for future in done:
+                    failed.extend(future.result())
+                if on_progress is not None:
+                    on_progress(progress)
+        not_copied = set(dst for src, dst, e in failed)
+        copied = [(src, dst) for files in lists for src, dst in files if dst not in not_copied]
+        unsynced = dict(sync_files([dst for src, dst in copied]))
+        for src, dst in copied:
+            error = unsynced.get(dst) or unsynced.get(os.path.dirname(os.path.abspath(dst)))
+            if error is not None:
+                failed.append((src, dst, error))
+    elapsed = time.monotonic() - start
+    copied_bytes.inc(progress.copied)
+    copy_failures.inc(len(failed))
+    copy_seconds.observe(elapsed)
+    logger.info('copied %d bytes from %d drive(s) in %.1f s (%.1f MB/s), %d failed' % (
+        progress.copied, len(lists), elapsed, progress.copied / elapsed / 1e6 if elapsed > 0 else 0, len(failed)))
+    return failed
@@ -3,41 +3,234 @@
 # License: GNU GPLv2, see LICENSE.txt
 import os
 
+from .inotify import Inotify, Event, TREE_EVENTS, IN_CLOSE_WRITE, IN_MOVED_FROM, IN_MOVED_TO, \
+    IN_CREATE, IN_DELETE, IN_DELETE_SELF, IN_MOVE_SELF, IN_Q_OVERFLOW, IN_IGNORED, IN_ONLYDIR, IN_ISDIR
+from .baselog import getlogger
+logger = getlogger(__name__)
+
 class DirectoryReader:
+    """File reader for a directory tree on disk.  Changes are followed with
+    inotify, or by comparing directory mtimes where inotify isn't available
+    (or a directory can't be watched, e.g. once max_user_watches is used up),
+    and reported as the exact paths added and removed (see pop_changes) so
+    the playlist can be patched instead of rebuilt.
+
+    A file counts as added once it was written and closed, or moved in.
+    """
 
     def __init__(self, config):
         """Create an instance of a file reader that just reads a single
         directory on disk.
         """
         self._load_config(config)
-        self._filecount = self.count_files()
+        self._dirs = {}       # directory -> names of the files in it
+        self._watches = {}    # inotify watch descriptor -> directory
+        self._mtimes = {}     # directory -> mtime, for the polled ones
+        self._added = set()
+        self._removed = set()
+        self._parent_wd = None
+        try:
+            self._inotify = Inotify()
+        except OSError as e:
+            logger.warning('inotify not available (%s), polling %s' % (e, self._path))
+            self._inotify = None
+        if self._inotify is not None:
+            # to see the directory (re)appear
+            try:
+                self._parent_wd = self._inotify.add_watch(os.path.dirname(self._path),
+                                                          IN_CREATE | IN_MOVED_TO | IN_ONLYDIR)
+            except OSError as e:
+                logger.warning('cannot watch parent of %s: %s' % (self._path, e))
+        self._add_tree(self._path)
+        self._added.clear()
 
     def _load_config(self, config):
-        self._path = config.get('directory', 'path')
+        self._path = os.path.abspath(config.get('directory', 'path'))
 
     def search_paths(self):
         """Return a list of paths to search for files."""
         return [self._path]
 
+    def fileno(self):
+        """Descriptor readable when there are inotify events, None when the
+        directory has to be polled.
+        """
+        return self._inotify.fileno() if self._inotify is not None else None
+
+    def polling(self):
+        """Return true if some directories are polled, is_changed has to be
+        called periodically even though there is a descriptor.
+        """
+        return bool(self._mtimes)
+
     def is_changed(self):
-        """Return true if the number of files in the paths have changed."""
-        current_count = self.count_files()
-        if current_count != self._filecount:
-            self._filecount = current_count
-            return True
-        else:
-            return False
+        """Return true if files were added or removed since the last
+        pop_changes.
+        """
+        if self._inotify is not None:
+            for event in self._inotify.read():
+                self._handle(event)
+        self._poll_mtimes()
+        return bool(self._added or self._removed)
+
+    def pop_changes(self):
+        """Return and forget the (added, removed) lists of file paths."""
+        added, removed = sorted(self._added), sorted(self._removed)
+        self._added.clear()
+        self._removed.clear()
+        return added, removed
 
     def idle_message(self):
         """Return a message to display when idle and no files are found."""
         return 'No files found in {0}'.format(self._path)
 
     def count_files(self):
-        return len(os.listdir(self._path))
+        return sum(len(names) for names in self._dirs.values())
 
     def enable_watchdog(self):
         return False
 
+    def _note_added(self, path):
+        if path in self._removed:
+            self._removed.discard(path)
+        else:
+            self._added.add(path)
+
+    def _note_removed(self, path):
+        if path in self._added:
+            self._added.discard(path)
+        else:
+            self._removed.add(path)
+
+    def _add_file(self, directory, name):
+        names = self._dirs.setdefault(directory, set())
+        if name not in names:
+            names.add(name)
+            self._note_added(os.path.join(directory, name))
+
+    def _remove_file(self, directory, name):
+        names = self._dirs.get(directory)
+        if names is not None and name in names:
+            names.discard(name)
+            self._note_removed(os.path.join(directory, name))
+
+    def _watch(self, directory):
+        if self._inotify is not None:
+            try:
+                self._watches[self._inotify.add_watch(directory, TREE_EVENTS | IN_ONLYDIR)] = directory
+                return
+            except OSError as e:
+                logger.warning('cannot watch %s (%s), polling it' % (directory, e))
+        self._mtimes[directory] = os.stat(directory).st_mtime_ns
+
+    def _add_tree(self, top):
+        # Watch before listing, so nothing created meanwhile is missed.
+        try:
+            self._watch(top)
+            entries = list(os.scandir(top))
+        except OSError as e:
+            logger.warning('cannot read %s: %s' % (top, e))
+            return
+        self._dirs.setdefault(top, set())
+        for entry in entries:
+            if entry.is_dir():
+                if not entry.is_symlink():
+                    self._add_tree(entry.path)
+            else:
+                self._add_file(top, entry.name)
+
+    def _remove_tree(self, top):
+        prefix = top + os.sep
+        for directory in [d for d in self._dirs if d == top or d.startswith(prefix)]:
+            for name in self._dirs.pop(directory):
+                self._note_removed(os.path.join(directory, name))
+            self._mtimes.pop(directory, None)
+        for wd, directory in list(self._watches.items()):
+            if directory == top or directory.startswith(prefix):
+                del self._watches[wd]
+                self._inotify.rm_watch(wd)
+
+    def _rescan_dir(self, directory):
+        """Bring what's known about directory (not its subdirectories) in
+        line with its content.
+        """
+        try:
+            entries = list(os.scandir(directory))
+        except OSError:
+            self._remove_tree(directory)
+            return
+        files = set()
+        subdirs = set()
+        for entry in entries:
+            if entry.is_dir():
+                if not entry.is_symlink():
+                    subdirs.add(entry.path)
+            else:
+                files.add(entry.name)
+        for name in self._dirs.get(directory, set()) - files:
+            self._remove_file(directory, name)
+        for name in files:
+            self._add_file(directory, name)
+        for d in [d for d in self._dirs if os.path.dirname(d) == directory and d not in subdirs]:
+            self._remove_tree(d)
+        for d in subdirs:
+            if d not in self._dirs:
+                self._add_tree(d)
+
+    def _rescan_all(self):
+        for directory in list(self._dirs):
+            if directory in self._dirs:
+                self._rescan_dir(directory)
+        if self._path not in self._dirs:
+            self._add_tree(self._path)
+
+    def _poll_mtimes(self):
+        if self._inotify is None and self._path not in self._dirs:
+            self._add_tree(self._path)
+            return
+        for directory, mtime in list(self._mtimes.items()):
+            if directory not in self._mtimes:
+                continue  # went away with its parent
+            try:
+                st = os.stat(directory)
+            except OSError:
+                self._remove_tree(directory)
+                continue
+            if st.st_mtime_ns != mtime:
+                self._mtimes[directory] = st.st_mtime_ns
+                self._rescan_dir(directory)
+
+    def _handle(self, event: Event):
+        if event.mask & IN_Q_OVERFLOW:
+            logger.warning('inotify queue overflow, rescanning %s' % self._path)
+            self._rescan_all()
+            return
+        if event.wd == self._parent_wd:
+            if event.mask & IN_ISDIR and event.name == os.path.basename(self._path):
+                self._add_tree(self._path)
+            return
+        directory = self._watches.get(event.wd)
+        if directory is None:
+            return
+        if event.mask & IN_IGNORED:
+            del self._watches[event.wd]
+            return
+        if event.mask & (IN_DELETE_SELF | IN_MOVE_SELF):
+            # subdirectories are handled through their parent's events
+            if directory == self._path:
+                self._remove_tree(directory)
+            return
+        if event.mask & IN_ISDIR:
+            path = os.path.join(directory, event.name)
+            if event.mask & (IN_CREATE | IN_MOVED_TO):
+                self._add_tree(path)
+            elif event.mask & (IN_DELETE | IN_MOVED_FROM):
+                self._remove_tree(path)
+        elif event.mask & (IN_CLOSE_WRITE | IN_MOVED_TO):
+            self._add_file(directory, event.name)
+        elif event.mask & (IN_DELETE | IN_MOVED_FROM):
+            self._remove_file(directory, event.name)
+
 def create_file_reader(config, screen):
     """Create new file reader based on reading a directory on disk."""
     return DirectoryReader(config)
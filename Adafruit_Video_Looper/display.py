@@ -0,0 +1,65 @@
+# License: GNU GPLv2, see LICENSE.txt
+import os
+import pygame
+
+from .framebuffer import Framebuffer, parse_geometry
+from .baselog import getlogger
+logger = getlogger(__name__)
+
+SDL = 'sdl'
+FBDEV = 'fbdev'
+
+# Framebuffer frames are presented to, None when SDL drives the display.
+_framebuffer = None
+
+
+def init(config):
+    """Initialize the display output configured in [video_looper] output and
+    return the screen surface to draw on.  Everything drawn is pushed with
+    update() below.
+
+    With "fbdev" SDL renders off screen (dummy video driver) and frames are
+    copied into the mmaped framebuffer device directly.
+    """
+    global _framebuffer
+    output = config.get('video_looper', 'output', fallback=SDL).lower()
+    assert output in (SDL, FBDEV), 'Unknown output value: {0} Expected sdl or fbdev.'.format(output)
+    device = config.get('video_looper', 'sdl_device')
+    if output == FBDEV:
+        geometry = config.get('video_looper', 'fb_geometry', fallback='').strip()
+        _framebuffer = Framebuffer(device, parse_geometry(geometry) if geometry else None)
+        os.environ['SDL_VIDEODRIVER'] = 'dummy'
+        pygame.display.init()
+        pygame.mouse.set_visible(False)
+        return pygame.display.set_mode(_framebuffer.size)
+
+    _framebuffer = None
+    os.environ["SDL_FBDEV"] = device
+    pygame.display.init()
+    pygame.mouse.set_visible(False)
+    return pygame.display.set_mode((0,0), pygame.FULLSCREEN | pygame.NOFRAME)
+
+
+def update(rects=None):
+    """Push the screen, or only the rects of it, to the display.  Like
+    pygame.display.update, rects may also be a single rect style object.
+    """
+    if rects is not None:
+        try:
+            rects = [pygame.Rect(rects)]
+        except TypeError:
+            pass
+    if _framebuffer is None:
+        if rects is None:
+            pygame.display.flip()
+        else:
+            pygame.display.update(rects)
+    else:
+        _framebuffer.present(pygame.display.get_surface(), rects)
+
+
+def quit():
+    global _framebuffer
+    if _framebuffer is not None:
+        _framebuffer.close()
+        _framebuffer = None
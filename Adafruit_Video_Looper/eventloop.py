@@ -0,0 +1,134 @@
+# License: GNU GPLv2, see LICENSE.txt
+import collections
+import heapq
+import itertools
+import os
+import selectors
+import time
+
+from . import trace
+
+
+class Timer:
+    """Handle returned by EventLoop.call_later, can be cancelled."""
+
+    def __init__(self, when, callback, args):
+        self.when = when
+        self._callback = callback
+        self._args = args
+        self.cancelled = False
+
+    def cancel(self):
+        self.cancelled = True
+
+    def _run(self):
+        # may have been cancelled after it expired but before it ran
+        if not self.cancelled:
+            self._callback(*self._args)
+
+
+class EventLoop:
+    """Minimal single threaded scheduler built on selectors.  Callbacks run
+    when a registered file descriptor becomes readable, when a timer expires
+    or when posted from another thread (or a signal handler) through
+    call_soon_threadsafe.  The loop sleeps in select() until one of those
+    happens, so an idle looper costs no CPU.
+    """
+
+    def __init__(self):
+        self._selector = selectors.DefaultSelector()
+        self._timers = []
+        self._sequence = itertools.count()
+        # deque appends and pops are atomic, so other threads and signal
+        # handlers post to it without a lock (a signal handler taking a lock
+        # the interrupted loop holds would deadlock).
+        self._ready = collections.deque()
+        self._running = False
+        # Self-pipe used to wake up select() from other threads.
+        self._wake_r, self._wake_w = os.pipe()
+        os.set_blocking(self._wake_r, False)
+        os.set_blocking(self._wake_w, False)
+        self._selector.register(self._wake_r, selectors.EVENT_READ, (self._drain_wakeup, ()))
+
+    def _drain_wakeup(self):
+        try:
+            while os.read(self._wake_r, 4096):
+                pass
+        except BlockingIOError:
+            pass
+
+    def call_soon(self, callback, *args):
+        """Run callback on the next loop iteration.  Only call from the loop
+        thread, see call_soon_threadsafe otherwise.
+        """
+        self._ready.append((callback, args))
+
+    def call_soon_threadsafe(self, callback, *args):
+        """Like call_soon, safe from other threads and signal handlers."""
+        self._ready.append((callback, args))
+        try:
+            os.write(self._wake_w, b'\0')
+        except BlockingIOError:
+            # pipe full, the loop is going to wake up anyway
+            pass
+
+    def call_later(self, delay, callback, *args):
+        """Run callback after delay seconds, return a cancellable Timer."""
+        timer = Timer(time.monotonic() + max(delay, 0), callback, args)
+        heapq.heappush(self._timers, (timer.when, next(self._sequence), timer))
+        return timer
+
+    def add_reader(self, fd, callback, *args):
+        """Run callback every time fd is readable until remove_reader."""
+        self._selector.register(fd, selectors.EVENT_READ, (callback, args))
+
+    def remove_reader(self, fd):
+        try:
+            self._selector.unregister(fd)
+        except (KeyError, ValueError):
+            pass
+
+    def stop(self):
+        self._running = False
+
+    def _timeout(self):
+        if self._ready:
+            return 0
+        while self._timers and self._timers[0][2].cancelled:
+            heapq.heappop(self._timers)
+        if not self._timers:
+            return None
+        return max(self._timers[0][0] - time.monotonic(), 0)
+
+    def run_once(self):
+        """Wait for and dispatch one batch of events."""
+        events = self._selector.select(self._timeout())
+        with trace.span('tick'):
+            for key, _ in events:
+                # an earlier callback of this batch may have removed the reader
+                if self._selector.get_map().get(key.fd) is not key:
+                    continue
+                callback, args = key.data
+                callback(*args)
+
+            now = time.monotonic()
+            while self._timers and self._timers[0][0] <= now:
+                _, _, timer = heapq.heappop(self._timers)
+                self._ready.append((timer._run, ()))
+
+            # Only run what is ready now, callbacks queued meanwhile wait for
+            # the next iteration so timers and fds are not starved.
+            for _ in range(len(self._ready)):
+                callback, args = self._ready.popleft()
+                callback(*args)
+
+    def run(self):
+        """Dispatch events until stop() is called."""
+        self._running = True
+        while self._running:
+            self.run_once()
+
+    def close(self):
+        self._selector.close()
+        os.close(self._wake_r)
+        os.close(self._wake_w)
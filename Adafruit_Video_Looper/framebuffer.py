@@ -0,0 +1,170 @@
+# License: GNU GPLv2, see LICENSE.txt
+import fcntl
+import mmap
+import os
+import stat
+import struct
+import pygame
+
+from .baselog import getlogger
+logger = getlogger(__name__)
+
+# linux/fb.h
+FBIOGET_VSCREENINFO = 0x4600
+FBIOGET_FSCREENINFO = 0x4602
+FBIOPAN_DISPLAY = 0x4606
+
+# struct fb_var_screeninfo, 40 __u32.  The fields used here are xres, yres,
+# xres_virtual, yres_virtual, xoffset, yoffset, bits_per_pixel, grayscale
+# then (offset, length, msb_right) for red, green, blue and transp.
+VAR_SCREENINFO = struct.Struct('@40I')
+# struct fb_fix_screeninfo, the trailing 0L pads it like the C compiler does.
+FIX_SCREENINFO = struct.Struct('@16sLIIIIHHHILIIH2H0L')
+
+# Pixel masks (r, g, b, a) used for a regular file standing in for the device,
+# the layout of the usual RGB565 and XRGB8888 framebuffers.
+DEFAULT_MASKS = {
+    16: (0xF800, 0x07E0, 0x001F, 0),
+    24: (0xFF0000, 0x00FF00, 0x0000FF, 0),
+    32: (0xFF0000, 0x00FF00, 0x0000FF, 0),
+}
+
+
+def parse_geometry(value):
+    """Parse a 'WIDTHxHEIGHTxBPP' string, return (width, height, bpp)."""
+    try:
+        width, height, bpp = (int(v) for v in value.lower().split('x'))
+    except ValueError:
+        raise ValueError('Invalid framebuffer geometry: {0} Expected WIDTHxHEIGHTxBPP.'.format(value))
+    if bpp not in DEFAULT_MASKS:
+        raise ValueError('Unsupported framebuffer depth: {0}'.format(bpp))
+    return width, height, bpp
+
+
+class Framebuffer:
+    """Linux framebuffer mapped in memory.
+
+    Frames are converted to the framebuffer's native pixel format by blitting
+    them on a surface with the same layout (SDL does the conversion), whose
+    rows are then copied straight into the mapping.  When the driver can pan
+    and has room for two pages, full frames are drawn to the hidden page and
+    panned to, so a fade never shows a half drawn frame.
+
+    A regular file can stand in for the device, its geometry is then given as
+    (width, height, bpp) and it is never double-buffered.
+    """
+
+    def __init__(self, path, geometry=None):
+        self._fd = os.open(path, os.O_RDWR)
+        try:
+            if stat.S_ISCHR(os.fstat(self._fd).st_mode):
+                length = self._query()
+            else:
+                if geometry is None:
+                    raise ValueError('{0} is not a framebuffer device, its geometry must be configured'.format(path))
+                length = self._from_geometry(geometry)
+            self._mm = mmap.mmap(self._fd, length, mmap.MAP_SHARED, mmap.PROT_READ | mmap.PROT_WRITE)
+        except:
+            os.close(self._fd)
+            raise
+        self._convert = pygame.Surface(self.size, 0, self.bpp, self.masks)
+        self._rowbytes = self.width * self.bpp // 8
+        # Page currently scanned out.
+        self._page = 0
+        logger.info('framebuffer %s: %dx%d %dbpp, stride %d, %s' % (
+            path, self.width, self.height, self.bpp, self.stride,
+            'double-buffered' if self.double_buffered else 'single-buffered'))
+
+    def _query(self):
+        var = bytearray(VAR_SCREENINFO.size)
+        fix = bytearray(FIX_SCREENINFO.size)
+        fcntl.ioctl(self._fd, FBIOGET_VSCREENINFO, var)
+        fcntl.ioctl(self._fd, FBIOGET_FSCREENINFO, fix)
+        self._var = list(VAR_SCREENINFO.unpack(var))
+        v = self._var
+        f = FIX_SCREENINFO.unpack(fix)
+        self.width, self.height = v[0], v[1]
+        self.bpp = v[6]
+        if self.bpp not in DEFAULT_MASKS:
+            raise ValueError('Unsupported framebuffer depth: {0}'.format(self.bpp))
+        # bitfields are (offset, length, msb_right), alpha is left out
+        self.masks = tuple(((1 << v[i + 1]) - 1) << v[i] for i in (8, 11, 14)) + (0,)
+        self.stride = f[9]
+        ypanstep = f[7]
+        self.double_buffered = ypanstep > 0 and v[3] >= 2 * self.height
+        return f[2]
+
+    def _from_geometry(self, geometry):
+        self.width, self.height, self.bpp = geometry
+        self.masks = DEFAULT_MASKS[self.bpp]
+        self.stride = self.width * self.bpp // 8
+        self.double_buffered = False
+        length = self.stride * self.height
+        if os.fstat(self._fd).st_size < length:
+            os.ftruncate(self._fd, length)
+        return length
+
+    @property
+    def size(self):
+        return (self.width, self.height)
+
+    def close(self):
+        if self._fd is not None:
+            self._mm.close()
+            os.close(self._fd)
+            self._fd = None
+
+    def _write(self, rects, page):
+        """Copy rects of the conversion surface to page of the mapping."""
+        pitch = self._convert.get_pitch()
+        base = page * self.height * self.stride
+        pixel = self.bpp // 8
+        view = memoryview(self._convert.get_buffer())
+        try:
+            for rect in rects:
+                if rect.w == self.width and pitch == self.stride:
+                    # whole rows, one copy
+                    src = rect.y * pitch
+                    dst = base + rect.y * self.stride
+                    n = rect.h * pitch
+                    self._mm[dst:dst + n] = view[src:src + n]
+                    continue
+                n = rect.w * pixel
+                for y in range(rect.y, rect.bottom):
+                    src = y * pitch + rect.x * pixel
+                    dst = base + y * self.stride + rect.x * pixel
+                    self._mm[dst:dst + n] = view[src:src + n]
+        finally:
+            # releases the surface lock
+            view.release()
+
+    def _pan(self, page):
+        var = self._var
+        var[5] = page * self.height  # yoffset
+        fcntl.ioctl(self._fd, FBIOPAN_DISPLAY, VAR_SCREENINFO.pack(*var))
+        self._page = page
+
+    def present(self, surface, rects=None):
+        """Show surface (of the framebuffer size) on the framebuffer.  Only
+        the areas in rects are copied when given, the whole frame otherwise.
+        """
+        bounds = self._convert.get_rect()
+        if rects is None:
+            self._convert.blit(surface, (0, 0))
+            if self.double_buffered:
+                back = 1 - self._page
+                self._write([bounds], back)
+                self._pan(back)
+            else:
+                self._write([bounds], self._page)
+            return
+
+        # Partial updates are small (OSD labels, progress bar) and go to the
+        # visible page, the next full frame rewrites the hidden one anyway.
+        clipped = []
+        for rect in rects:
+            rect = pygame.Rect(rect).clip(bounds)
+            if rect.w and rect.h:
+                self._convert.blit(surface, rect, rect)
+                clipped.append(rect)
+        self._write(clipped, self._page)
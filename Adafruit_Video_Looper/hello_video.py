@@ -1,9 +1,7 @@
 # Copyright 2015 Adafruit Industries.
 # Author: Tony DiCola
 # License: GNU GPLv2, see LICENSE.txt
-import os
-import subprocess
-import time
+from .supervisor import ChildProcess
 
 
 class HelloVideoPlayer:
@@ -39,33 +37,31 @@ class HelloVideoPlayer:
 
         args.append(movie.filename)       # Add movie file path.
         # Run hello_video process and direct standard output to /dev/null.
-        self._process = subprocess.Popen(args,
-                                         stdout=open(os.devnull, 'wb'),
-                                         close_fds=True)
+        self._process = ChildProcess(args)
 
     def is_playing(self):
         """Return true if the video player is running, false otherwise."""
         if self._process is None:
             return False
-        self._process.poll()
-        return self._process.returncode is None
+        return self._process.is_running()
+
+    def fileno(self):
+        """Return a file descriptor that becomes readable when the current
+        video finished playing, None if nothing was started.
+        """
+        if self._process is None:
+            return None
+        return self._process.fileno()
 
     def stop(self, block_timeout_sec=0):
         """Stop the video player.  block_timeout_sec is how many seconds to
         block waiting for the player to stop before moving on.
         """
-        # Stop the player if it's running.
-        if self._process is not None and self._process.returncode is None:
-            # process.kill() doesn't seem to work reliably if USB drive is
-            # removed, instead just run a kill -9 on it.
-            subprocess.call(['kill', '-9', str(self._process.pid)])
-        # If a blocking timeout was specified, wait up to that amount of time
-        # for the process to stop.
-        start = time.time()
-        while self._process is not None and self._process.returncode is None:
-            if (time.time() - start) >= block_timeout_sec:
-                break
-            time.sleep(0)
+        # Stop the player if it's running.  process.kill() doesn't seem to
+        # work reliably if USB drive is removed, the supervisor escalates to
+        # SIGKILL and waits on the process exit instead of spinning.
+        if self._process is not None:
+            self._process.stop(block_timeout_sec)
         # Let the process be garbage collected.
         self._process = None
 
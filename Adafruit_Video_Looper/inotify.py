@@ -0,0 +1,93 @@
+# License: GNU GPLv2, see LICENSE.txt
+import collections
+import ctypes
+import errno
+import os
+import struct
+
+# inotify(7) event masks.
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_ISDIR = 0x40000000
+
+IN_NONBLOCK = os.O_NONBLOCK
+IN_CLOEXEC = 0o2000000
+
+# What a directory tree watcher needs: files appearing complete, files and
+# directories disappearing, and the watched directory itself going away.
+TREE_EVENTS = IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE \
+              | IN_DELETE_SELF | IN_MOVE_SELF
+
+# struct inotify_event without the trailing name.
+_EVENT = struct.Struct('iIII')
+
+Event = collections.namedtuple('Event', 'wd mask cookie name')
+
+
+def _libc():
+    return ctypes.CDLL(None, use_errno=True)
+
+
+class Inotify:
+    """A non-blocking inotify instance.  Raises OSError when the kernel or
+    C library doesn't provide inotify.
+    """
+
+    def __init__(self):
+        try:
+            libc = _libc()
+            self._add_watch = libc.inotify_add_watch
+            self._rm_watch = libc.inotify_rm_watch
+            fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        except AttributeError:
+            raise OSError(errno.ENOSYS, 'inotify not available')
+        if fd < 0:
+            err = ctypes.get_errno()
+            raise OSError(err, os.strerror(err))
+        self._fd = fd
+
+    def fileno(self):
+        return self._fd
+
+    def add_watch(self, path, mask):
+        """Watch path for the events in mask, return the watch descriptor."""
+        wd = self._add_watch(self._fd, os.fsencode(path), mask)
+        if wd < 0:
+            err = ctypes.get_errno()
+            raise OSError(err, os.strerror(err), path)
+        return wd
+
+    def rm_watch(self, wd):
+        # fails with EINVAL when the kernel already dropped the watch
+        self._rm_watch(self._fd, wd)
+
+    def read(self):
+        """Return the list of pending events, empty if there are none."""
+        events = []
+        while True:
+            try:
+                buf = os.read(self._fd, 64 * 1024)
+            except BlockingIOError:
+                return events
+            offset = 0
+            while offset < len(buf):
+                wd, mask, cookie, length = _EVENT.unpack_from(buf, offset)
+                offset += _EVENT.size
+                name = os.fsdecode(buf[offset:offset + length].rstrip(b'\0'))
+                offset += length
+                events.append(Event(wd, mask, cookie, name))
+
+    def close(self):
+        if self._fd >= 0:
+            os.close(self._fd)
+            self._fd = -1
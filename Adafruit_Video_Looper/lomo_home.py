@@ -1,14 +1,215 @@
 import glob
 import os
 import json
+import http.client
+import select
+import threading
 import time
-import urllib.request
-from urllib.error import HTTPError, URLError
-from socket import timeout
+import urllib.parse
 from .baselog import getlogger
 logger = getlogger(__name__)
 
 UPDATE_INTERVAL = 3
+# Upper bound for the retry delay while lomoframed can't be reached.
+MAX_BACKOFF = 60
+STATUS_URL = 'http://127.0.0.1:8003/system'
+STATUS_ERROR = (-1, -1, -1)
+MOUNTINFO = '/proc/self/mountinfo'
+# Seconds between checks of the mount paths when the mount table doesn't
+# change (a directory can appear without a mount).
+REVALIDATE_INTERVAL = 10
+# Seconds a check of the mount paths may take before they count as missing.
+STAT_TIMEOUT = 2
+
+class LomoStatusClient:
+    """Poll lomoframed's system status from a background thread, so readers
+    of the status never block on the network.  The connection is kept alive
+    between polls, failures are retried with exponential backoff.
+    """
+
+    def __init__(self, url=STATUS_URL, interval=UPDATE_INTERVAL, timeout=3, max_backoff=MAX_BACKOFF):
+        parts = urllib.parse.urlsplit(url)
+        self._host = parts.hostname
+        self._port = parts.port
+        self._path = parts.path or '/'
+        self._url = url
+        self._interval = interval
+        self._timeout = timeout
+        self._max_backoff = max_backoff
+        self._conn = None
+        self._thread = None
+        self._stop = threading.Event()
+        # Latest (sysstatus, mountstatus, keepalivestatus), None until the
+        # first poll completed.  Only ever replaced as a whole tuple, so it
+        # can be read from any thread without locking.
+        self.status = None
+        self.failures = 0
+        # Set once the first poll completed, successfully or not.
+        self.updated = threading.Event()
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self._close()
+
+    def _close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    def _fetch(self):
+        if self._conn is None:
+            self._conn = http.client.HTTPConnection(self._host, self._port, timeout=self._timeout)
+        self._conn.request('GET', self._path)
+        response = self._conn.getresponse()
+        body = response.read()
+        if response.status != 200:
+            raise http.client.HTTPException('HTTP %d' % response.status)
+        if response.will_close:
+            self._close()
+        resp = json.loads(body)
+        return (resp['SystemStatus'], resp['MountStatus'], resp['KeepaliveStatus'])
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.status = self._fetch()
+                self.failures = 0
+                delay = self._interval
+            except Exception as e:
+                # drop the connection, it may be half closed
+                self._close()
+                self.failures += 1
+                delay = min(self._interval * 2 ** self.failures, self._max_backoff)
+                logger.error('get_lomoframed_status: %s, %s, retry in %d s' % (e, self._url, delay))
+                self.status = STATUS_ERROR
+            self.updated.set()
+            self._stop.wait(delay)
+
+class MountWatcher:
+    """Keep track of the existing paths matching lists of glob patterns from
+    a background thread, so the main loop never touches a (possibly hung)
+    network filesystem.  The paths are checked when the mount table changes
+    (/proc/self/mountinfo signals POLLPRI) and every interval seconds.  Each
+    check runs on its own thread and finds nothing if it takes longer than
+    timeout.  fileno() becomes readable when the result changed.
+    """
+
+    def __init__(self, patterns, interval=REVALIDATE_INTERVAL, timeout=STAT_TIMEOUT, mountinfo=MOUNTINFO):
+        self._patterns = patterns
+        self._interval = interval
+        self._timeout = timeout
+        self._mountinfo = mountinfo
+        self._lock = threading.Lock()
+        # name -> check thread that didn't return in time
+        self._stuck = {}
+        self._thread = None
+        self._stop = threading.Event()
+        self._wake_r, self._wake_w = os.pipe2(os.O_NONBLOCK | os.O_CLOEXEC)
+        self._changed_r, self._changed_w = os.pipe2(os.O_NONBLOCK | os.O_CLOEXEC)
+        # name -> tuple of the existing paths.  Only ever replaced as a
+        # whole, so it can be read from any thread without locking.
+        self.paths = dict((name, ()) for name in patterns)
+        self.checks = 0
+
+    def fileno(self):
+        return self._changed_r
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='mounts', daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        os.write(self._wake_w, b'\0')
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def drain(self):
+        """Consume the change notifications."""
+        try:
+            while os.read(self._changed_r, 64):
+                pass
+        except BlockingIOError:
+            pass
+
+    def refresh(self):
+        """Check all paths now, blocking for up to timeout per list of
+        patterns.  Return true if anything changed.
+        """
+        with self._lock:
+            paths = dict((name, self._probe(name, patterns)) for name, patterns in self._patterns.items())
+            self.checks += 1
+            changed = paths != self.paths
+            self.paths = paths
+        if changed:
+            logger.info('mount paths changed: %s' % paths)
+            try:
+                os.write(self._changed_w, b'\0')
+            except BlockingIOError:
+                pass  # already signalled
+        return changed
+
+    def _check(self, patterns):
+        found = []
+        for pattern in patterns:
+            found.extend(path for path in sorted(glob.glob(pattern)) if os.path.exists(path))
+        return tuple(found)
+
+    def _probe(self, name, patterns):
+        stuck = self._stuck.get(name)
+        if stuck is not None:
+            if stuck.is_alive():
+                return ()
+            del self._stuck[name]
+        result = []
+        thread = threading.Thread(target=lambda: result.append(self._check(patterns)),
+                                  name='mount-check', daemon=True)
+        thread.start()
+        thread.join(self._timeout)
+        if thread.is_alive():
+            # don't pile up threads behind a hung mount, wait for this one
+            logger.warning('checking %s timed out after %.1f s' % (patterns, self._timeout))
+            self._stuck[name] = thread
+            return ()
+        return result[0] if result else ()
+
+    def _run(self):
+        poller = select.poll()
+        poller.register(self._wake_r, select.POLLIN)
+        try:
+            mountinfo = open(self._mountinfo, 'rb')
+            mountinfo.read()
+            poller.register(mountinfo, select.POLLPRI)
+        except OSError as e:
+            logger.warning('cannot watch %s: %s' % (self._mountinfo, e))
+            mountinfo = None
+        deadline = time.monotonic() + self._interval
+        try:
+            while not self._stop.is_set():
+                events = poller.poll(max(deadline - time.monotonic(), 0) * 1000)
+                if self._stop.is_set():
+                    break
+                mounted = mountinfo is not None and any(fd == mountinfo.fileno() for fd, _ in events)
+                if mounted:
+                    # read it again to rearm the notification
+                    mountinfo.seek(0)
+                    mountinfo.read()
+                if mounted or time.monotonic() >= deadline:
+                    self.refresh()
+                    deadline = time.monotonic() + self._interval
+        finally:
+            if mountinfo is not None:
+                mountinfo.close()
 
 class LomoReader:
     
@@ -17,26 +218,35 @@ class LomoReader:
         Lomorage mount directory
         """
         self._enable_watchdog = False
-        self._mount_path_exists = False
-        self._mount_share_path_exists = False
         self._load_config(config)
+        self._mounts = MountWatcher({'home': self._mount_path, 'share': self._mount_share_path},
+                                    self._revalidate_interval, self._stat_timeout)
+        self._mounts.refresh()
+        self._mount_path_exists = len(self._mounts.paths['home']) > 0
+        self._mount_share_path_exists = len(self._mounts.paths['share']) > 0
+        logger.info("loading mount_path: %s [%s], mount_share_path: %s [%s]" %
+            (self._mount_path, self._mount_path_exists, self._mount_share_path, self._mount_share_path_exists))
         self._lomoframed_status = None
-        self._last_update = None
-
-    def _any_path_exists(self, paths):
-        spaths = []
-        for mpath in paths:
-            spaths.extend(glob.glob(mpath))
-        return any([os.path.exists(item) for item in spaths])
+        self._status_client = LomoStatusClient(self._status_url)
 
     def _load_config(self, config):
         # mount path like "/media/WD_90C27F73C27F5C82:/media/SanDisk_ADFCEE"
         self._mount_path = config.get('lomorage', 'mount_path').split(':')
         self._mount_share_path = config.get('lomorage', 'mount_share_path').split(':')
-        self._mount_path_exists = self._any_path_exists(self._mount_path)
-        self._mount_share_path_exists = self._any_path_exists(self._mount_share_path)
-        logger.info("loading mount_path: %s [%s], mount_share_path: %s [%s]" %
-            (self._mount_path, self._mount_path_exists, self._mount_share_path, self._mount_share_path_exists))
+        self._status_url = config.get('lomorage', 'status_url', fallback=STATUS_URL)
+        self._revalidate_interval = config.getfloat('lomorage', 'revalidate_interval', fallback=REVALIDATE_INTERVAL)
+        self._stat_timeout = config.getfloat('lomorage', 'stat_timeout', fallback=STAT_TIMEOUT)
+
+    def fileno(self):
+        """Descriptor readable when the mount paths may have changed."""
+        self._mounts.start()
+        return self._mounts.fileno()
+
+    def refresh(self):
+        """Check the mount paths now instead of waiting for the watcher,
+        blocks for up to stat_timeout per list of paths.
+        """
+        return self._mounts.refresh()
 
     def search_paths(self):
         """Return a list of paths to search for files. Will return a list of all
@@ -44,27 +254,26 @@ class LomoReader:
         Used to generate playlist, will find all media files if no playlist files
         found in those directories,
         """
-        spaths = []
-
-        if self._any_path_exists(self._mount_share_path):
+        paths = self._mounts.paths
+        if paths['share']:
             self._enable_watchdog = True
-            for mpath in self._mount_share_path:
-                spaths.extend(glob.glob(mpath))
+            spaths = list(paths['share'])
         else:
             self._enable_watchdog = False
-            for mpath in self._mount_path:
-                spaths.extend(glob.glob(mpath))
+            spaths = list(paths['home'])
         logger.info('search path: %s' % spaths)
         return spaths
 
     def is_changed(self):
         """Check if any changes on existence of mount path and mount share path,
-        will prefer media share path over media path
+        will prefer media share path over media path.  Only looks at what
+        the mount watcher found last.
         """
-        #print('old mount_path_exists: %s, mount_share_path_exists: %s' % (self._mount_path_exists, self._mount_share_path_exists))
-        mount_path_exists = self._any_path_exists(self._mount_path)
-        mount_share_path_exists = self._any_path_exists(self._mount_share_path)
-        #print('new mount_path_exists: %s, mount_share_path_exists: %s' % (mount_path_exists, mount_share_path_exists))
+        self._mounts.start()
+        self._mounts.drain()
+        paths = self._mounts.paths
+        mount_path_exists = len(paths['home']) > 0
+        mount_share_path_exists = len(paths['share']) > 0
 
         changed = False
 
@@ -83,37 +292,18 @@ class LomoReader:
         return changed
 
     def get_lomoframed_status(self):
-        now = time.time()
-        if self._last_update is None:
-            self._last_update = now
-
-        if self._lomoframed_status is not None and (now - self._last_update < UPDATE_INTERVAL):
-            return self._lomoframed_status
-
-        self._last_update = now
-
-        sysstatus = -1
-        mountstatus = -1
-        keepalivestatus = -1
-        try:
-            url = 'http://127.0.0.1:8003/system'
-            response = urllib.request.urlopen(url, timeout=3)
-            resp = json.loads(response.read())
-            sysstatus = resp['SystemStatus']
-            mountstatus = resp['MountStatus']
-            keepalivestatus = resp['KeepaliveStatus']
-            #logger.debug('get_lomoframed_status: %d' % resp)
-        except (HTTPError, URLError) as error:
-            logger.error('get_lomoframed_status: %s, %s' %(error, url))
-        except timeout:
-            logger.error('get_lomoframed_status: %s socket timed out' % url)
-        except Exception as RESTex:
-            logger.error('get_lomoframed_status: %s, %s' %(RESTex, url))
-        return (sysstatus, mountstatus, keepalivestatus)
+        """Return the latest lomoframed status tuple published by the
+        background client, None if not known yet.  Never blocks.
+        """
+        self._status_client.start()
+        return self._status_client.status
 
     def idle_message(self):
         """Return a message to display when idle and no files are found."""
-        sysstatus, mountstatus, keepalivestatus = self.get_lomoframed_status()
+        status = self.get_lomoframed_status()
+        if status is None:
+            return 'Checking system status...'
+        sysstatus, mountstatus, keepalivestatus = status
         message = ''
         if sysstatus == -1:
             message = 'System Error, please contact support@lomorage.com'
@@ -1,18 +1,25 @@
 # License: GNU GPLv2, see LICENSE.txt
 import os
 import re
+import select
 import shutil
-import subprocess
 import tempfile
-import time
+import threading
 import pygame
-from multiprocessing import Process
 
+from . import display
+from . import metrics
+from . import trace
 from .alsa_config import parse_hw_device
-from .utils import timeit, load_image_fit_screen, is_media_type
+from .utils import load_image_fit_screen, is_media_type, FILL_COLOR, FILL_BLUR
+from .supervisor import ChildProcess
+from .resample import SMOOTH, METHODS
+from .transition import FadeEngine, CrossFade, FADE, CROSSFADE
 from .baselog import getlogger
 logger = getlogger(__name__)
 
+spawn_seconds = metrics.histogram('looper_player_spawn_seconds', 'Time to start the video player process.')
+
 class LomoPlayer:
 
     def __init__(self, config, screen):
@@ -20,10 +27,24 @@ class LomoPlayer:
         background for video and load images using sdl.
         """
         self._vprocess = None
-        self._iprocess = None
+        self._ithread = None
+        self._icancel = None
+        self._idone = None
+        # Cancelled render thread that didn't stop in time, joined before
+        # anything else draws.
+        self._istale = None
         self._temp_directory = None
         self._screen = screen
         self._load_config(config)
+        self._fader = FadeEngine(screen, self._bgcolor, self._fade_ms, self._fade_fps)
+        self._crossfade = None
+        if self._transition == CROSSFADE:
+            try:
+                self._crossfade = CrossFade(screen, self._fade_ms, self._fade_fps)
+            except RuntimeError as e:
+                logger.error('%s, falling back to fade' % e)
+        # Full screen frame of the last image shown, to crossfade from.
+        self._last_frame = None
 
     def __del__(self):
         if self._temp_directory:
@@ -43,7 +64,15 @@ class LomoPlayer:
                                  .split(',')
         self._alpha_max = config.getint('sdl_image', 'alpha_max')
         self._alpha_min = config.getint('sdl_image', 'alpha_min')
-        self._interval_sec = config.getint('sdl_image', 'interval_sec')
+        self._interval_sec = config.getfloat('sdl_image', 'interval_sec')
+        self._fade_ms = config.getint('sdl_image', 'fade_ms', fallback=1500)
+        self._fade_fps = config.getint('sdl_image', 'fade_fps', fallback=30)
+        self._transition = config.get('sdl_image', 'transition', fallback=FADE).lower()
+        assert self._transition in (FADE, CROSSFADE), 'Unknown transition value: {0} Expected fade or crossfade.'.format(self._transition)
+        self._fill_mode = config.get('sdl_image', 'fill_mode', fallback=FILL_COLOR).lower()
+        assert self._fill_mode in (FILL_COLOR, FILL_BLUR), 'Unknown fill_mode value: {0} Expected color or blur.'.format(self._fill_mode)
+        self._resample = config.get('sdl_image', 'resample', fallback=SMOOTH).lower()
+        assert self._resample in METHODS, 'Unknown resample value: {0} Expected smooth or nearest.'.format(self._resample)
         self._bgcolor = list(map(int, config.get('video_looper', 'bgcolor')
                                              .translate(str.maketrans('','', ','))
                                              .split()))
@@ -77,38 +106,98 @@ class LomoPlayer:
         else:
             logger.warn('not support, skip %s' % asset)
 
-    def fade(self, image, direction):
-        X, Y = self._screen.get_size()
-        for i in direction:
-            image.set_alpha(i)
-            self._screen.fill(self._bgcolor)
-            self._screen.blit(image,  ( (0.5 * X) - (0.5 * image.get_width() ), (0.5 * Y) - (0.5 * image.get_height() ) ))
-            pygame.display.flip()
+    def _start_render(self, target, *args):
+        """Run target(*args, cancel, done_w) on the render thread."""
+        # The render thread closes its end of the pipe when it's done, which
+        # makes fileno() readable.
+        self._join_stale()
+        self._idone, done_w = os.pipe()
+        self._icancel = threading.Event()
+        self._ithread = threading.Thread(target=target, args=args + (self._icancel, done_w), daemon=True)
+        self._ithread.start()
+
+    def _join_stale(self):
+        if self._istale is not None:
+            self._istale.join()
+            self._istale = None
 
     def play_image(self, image, loop, vol):
-        self._iprocess = Process(target=self._play_image, args=(image,))
-        self._iprocess.start()
+        self.stop()
+        self._start_render(self._play_image, image)
+
+    def _get_image(self, image):
+        if self._preload:
+            return image.preload_resource
+        else:
+            return load_image_fit_screen(image.filename, self._fill_mode, self._resample)
 
-    def _play_image(self, image):
+    def _compose(self, img, alpha):
+        """Return a screen sized frame with img centered at alpha."""
+        frame = pygame.Surface(self._screen.get_size()).convert(self._screen)
+        frame.fill(self._bgcolor)
+        X, Y = frame.get_size()
+        img.set_alpha(alpha)
+        frame.blit(img, (X // 2 - img.get_width() // 2, Y // 2 - img.get_height() // 2))
+        return frame
+
+    def _play_image(self, image, cancel, done_w):
+        """Render thread, shows one image.  Returns early once cancel is set."""
         logger.info('play image %s' % image)
         try:
-            if self._preload:
-                img = image.preload_resource
-            else:
-                img = load_image_fit_screen(image.filename)
+            img = self._get_image(image)
+            if cancel.is_set():
+                # stopped while loading, the screen belongs to the next one
+                return
+            if self._crossfade is not None:
+                # Blend straight from the previous image and stay on this
+                # one, the next image blends from it in turn.
+                frame = self._compose(img, self._alpha_max)
+                last_frame, self._last_frame = self._last_frame, frame
+                if last_frame is not None:
+                    self._crossfade.fade(last_frame, frame, cancel)
+                else:
+                    self._fader.fade(img, self._alpha_min, self._alpha_max, cancel)
+                cancel.wait(self._interval_sec)
+                return
 
-            self.fade(img, range(self._alpha_min, self._alpha_max, 3))
-            pygame.time.delay(int(self._interval_sec) * 1000)
-            self.fade(img, range(self._alpha_max, self._alpha_min, -3))
+            self._fader.fade(img, self._alpha_min, self._alpha_max, cancel)
+            if not cancel.wait(self._interval_sec):
+                self._fader.fade(img, self._alpha_max, self._alpha_min, cancel)
         except Exception as e:
             logger.error('error loading image %s: %s' % (image, e))
+            self._last_frame = None
+        finally:
+            os.close(done_w)
+
+    def _show_poster(self, poster, last_frame, cancel, done_w):
+        """Render thread, covers the player's startup with the poster."""
+        try:
+            frame = self._compose(poster, 255)
+            if self._crossfade is not None and last_frame is not None:
+                self._crossfade.fade(last_frame, frame, cancel)
+            else:
+                self._screen.blit(frame, (0, 0))
+                display.update()
+        except Exception as e:
+            logger.error('error showing poster: %s' % e)
+        finally:
+            os.close(done_w)
 
     def play_video(self, movie, loop, vol):
         """Play the provided movie file, optionally looping it repeatedly."""
         logger.info('play video %s' % movie)
-        self._screen.fill(self._bgcolor)
-        pygame.display.flip()
         self.stop(3)  # Up to 3 second delay to let the old player stop.
+        # Poster frame extracted by the preloader, if any.
+        poster = movie.preload_resource if isinstance(movie.preload_resource, pygame.Surface) else None
+        last_frame, self._last_frame = self._last_frame, None
+        if poster is not None:
+            # Show it (or crossfade to it) while vlc starts, the render
+            # thread does it so a crossfade doesn't delay vlc.
+            self._start_render(self._show_poster, poster, last_frame)
+        else:
+            self._join_stale()
+            self._screen.fill(self._bgcolor)
+            display.update()
         # Assemble list of arguments.
         args = ['cvlc', '--play-and-exit']
         #args.extend(['--alsa-audio-device', self._sound])  # Add sound arguments.
@@ -127,50 +216,57 @@ class LomoPlayer:
             args.extend(['--sub-file', srt_path])
         args.append(movie.filename)       # Add movie file path.
         # Run vlc process and direct standard output to /dev/null.
-        logger.info('play video: %s' % args)
-        self._vprocess = subprocess.Popen(args,
-                                         stdout=open(os.devnull, 'wb'),
-                                         close_fds=True)
+        logger.debug('play video: %s', args)
+        with spawn_seconds.time(), trace.span('player start'):
+            self._vprocess = ChildProcess(args)
 
     def is_playing(self):
         """Return true if the video/image player is running, false otherwise."""
         if self._vprocess is None:
             vplaying = False
         else:
-            self._vprocess.poll()
-            vplaying = self._vprocess.returncode is None
+            vplaying = self._vprocess.is_running()
 
-        if self._iprocess is None:
+        if self._ithread is None:
             iplaying = False
         else:
-            iplaying = self._iprocess.is_alive()
+            # Done once the render thread closed its end of the pipe, same
+            # as what fileno() reports (the thread may still be exiting).
+            iplaying = not select.select([self._idone], [], [], 0)[0]
 
         return vplaying or iplaying
 
+    def fileno(self):
+        """Return a file descriptor that becomes readable when the current
+        video/image finished playing, None if nothing was started.
+        """
+        if self._vprocess is not None:
+            return self._vprocess.fileno()
+        if self._ithread is not None:
+            return self._idone
+        return None
+
     def stop(self, block_timeout_sec=0):
         """Stop the video player.  block_timeout_sec is how many seconds to
         block waiting for the player to stop before moving on.
         """
-        # Stop the process if it's running.
-        if self._iprocess is not None and self._iprocess.is_alive():
-            self._iprocess.kill()
-
-        if self._vprocess is not None and self._vprocess.returncode is None:
-            # There are a couple processes used by vlc, so kill both
-            # with a pkill command.
-            subprocess.call(['pkill', '-9', 'vlc'])
-
-        # If a blocking timeout was specified, wait up to that amount of time
-        # for the process to stop.
-        start = time.time()
-        while self._vprocess is not None and self._vprocess.returncode is None:
-            if (time.time() - start) >= block_timeout_sec:
-                break
-            time.sleep(0)
-
-        # Let the process be garbage collected.
-        self._vprocess = None
-        self._iprocess = None
+        # Ask the render thread to stop, it checks between frames so this
+        # takes at most a frame.  Wait for it even with no timeout, two
+        # threads must not draw at the same time.
+        if self._ithread is not None:
+            self._icancel.set()
+            self._ithread.join(max(block_timeout_sec, 1))
+            if self._ithread.is_alive():
+                logger.warning('image render thread did not stop, waiting for it before drawing')
+                self._istale = self._ithread
+            os.close(self._idone)
+            self._ithread = None
+
+        # Walk vlc's process group (vlc forks helpers) up the signal ladder,
+        # waiting on its exit rather than polling.
+        if self._vprocess is not None:
+            self._vprocess.stop(block_timeout_sec)
+            self._vprocess = None
 
     @staticmethod
     def can_loop_count():
@@ -0,0 +1,436 @@
+# License: GNU GPLv2, see LICENSE.txt
+import bisect
+import json
+import math
+import os
+import socketserver
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from .baselog import getlogger
+logger = getlogger(__name__)
+
+# Histogram buckets in seconds, from a fast decode to a slow scan.
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+# Seconds between snapshot files.
+SNAPSHOT_INTERVAL = 60
+
+PROMETHEUS_CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(names, values, extra=()):
+    pairs = ['%s="%s"' % (name, _escape(value)) for name, value in list(zip(names, values)) + list(extra)]
+    return '{%s}' % ','.join(pairs) if pairs else ''
+
+
+def _format_value(value):
+    if value == math.inf:
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    """A metric family: one value per combination of label values."""
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._children = {}
+        if not self.labelnames:
+            self._children[()] = self._new_child()
+
+    def labels(self, *values):
+        """The child metric of the given label values."""
+        values = tuple(str(v) for v in values)
+        assert len(values) == len(self.labelnames), 'expected labels %s' % (self.labelnames,)
+        child = self._children.get(values)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(values, self._new_child())
+        return child
+
+    def _only(self):
+        return self._children[()]
+
+    def children(self):
+        """(label values, child) pairs, sorted."""
+        with self._lock:
+            return sorted(self._children.items(), key=lambda item: item[0])
+
+    def samples(self):
+        """Yield (suffix, label values, extra labels, value)."""
+        for values, child in self.children():
+            for suffix, extra, value in child.samples():
+                yield suffix, values, extra, value
+
+
+class _CounterChild:
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.value = 0
+
+    def inc(self, amount=1):
+        with self._lock:
+            self.value += amount
+
+    def samples(self):
+        yield '', (), self.value
+
+
+class Counter(_Metric):
+    """A value that only goes up, like the number of ffprobe calls.  By
+    convention the name ends in _total.
+    """
+    kind = 'counter'
+
+    def _new_child(self):
+        return _CounterChild()
+
+    def inc(self, amount=1):
+        self._only().inc(amount)
+
+    @property
+    def value(self):
+        return self._only().value
+
+
+class _GaugeChild:
+
+    def __init__(self):
+        self.value = 0
+        self._function = None
+
+    def set(self, value):
+        self.value = value
+
+    def set_function(self, function):
+        """Read the value from function() whenever it's collected."""
+        self._function = function
+
+    def samples(self):
+        value = self.value
+        if self._function is not None:
+            try:
+                value = self._function()
+            except Exception as e:
+                logger.warning('gauge function failed: %s' % e)
+        yield '', (), value
+
+
+class Gauge(_Metric):
+    """A value that goes up and down, like the number of assets indexed."""
+    kind = 'gauge'
+
+    def _new_child(self):
+        return _GaugeChild()
+
+    def set(self, value):
+        self._only().set(value)
+
+    def set_function(self, function):
+        self._only().set_function(function)
+
+    @property
+    def value(self):
+        return next(self._only().samples())[2]
+
+
+class _HistogramChild:
+
+    def __init__(self, buckets):
+        self._lock = threading.Lock()
+        self._buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        i = bisect.bisect_left(self._buckets, value)
+        with self._lock:
+            self.counts[i] += 1
+            self.sum += value
+            self.count += 1
+
+    def time(self):
+        return _Timer(self)
+
+    def samples(self):
+        with self._lock:
+            counts, total, count = list(self.counts), self.sum, self.count
+        cumulative = 0
+        for bound, n in zip(self._buckets + (math.inf,), counts):
+            cumulative += n
+            yield '_bucket', (('le', _format_value(float(bound))),), cumulative
+        yield '_sum', (), total
+        yield '_count', (), count
+
+
+class _Timer:
+    """Context manager observing the seconds its block took."""
+
+    def __init__(self, histogram):
+        self._histogram = histogram
+
+    def __enter__(self):
+        self._start = time.monotonic()
+        return self
+
+    def __exit__(self, *exc):
+        self._histogram.observe(time.monotonic() - self._start)
+
+
+class Histogram(_Metric):
+    """Distribution of observed values (seconds unless the name says
+    otherwise) over fixed buckets.
+    """
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self._buckets = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames)
+
+    def _new_child(self):
+        return _HistogramChild(self._buckets)
+
+    def observe(self, value):
+        self._only().observe(value)
+
+    def time(self):
+        return self._only().time()
+
+    @property
+    def count(self):
+        return self._only().count
+
+
+class Registry:
+    """The metrics of the process, by name."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._metrics = {}
+
+    def _get(self, cls, name, documentation, *args, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, documentation, *args, **kwargs)
+            assert isinstance(metric, cls), '%s is a %s' % (name, metric.kind)
+            return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        return self._get(Counter, name, documentation, labelnames)
+
+    def gauge(self, name, documentation, labelnames=()):
+        return self._get(Gauge, name, documentation, labelnames)
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self._get(Histogram, name, documentation, labelnames, buckets)
+
+    def metrics(self):
+        with self._lock:
+            return [self._metrics[name] for name in sorted(self._metrics)]
+
+    def prometheus(self):
+        """All metrics in the Prometheus text exposition format."""
+        lines = []
+        for metric in self.metrics():
+            name = metric.name
+            lines.append('# HELP %s %s' % (name, _escape(metric.documentation)))
+            lines.append('# TYPE %s %s' % (name, metric.kind))
+            for suffix, values, extra, value in metric.samples():
+                lines.append('%s%s%s %s' % (name, suffix, _format_labels(metric.labelnames, values, extra),
+                                            _format_value(value)))
+        return '\n'.join(lines) + '\n'
+
+    def snapshot(self):
+        """All metrics as a dict of name to value, or to a dict of label
+        values to value for labelled ones.  Histograms give their count,
+        sum and cumulative bucket counts.
+        """
+        result = {}
+        for metric in self.metrics():
+            values = {}
+            for labels, child in metric.children():
+                key = ','.join('%s=%s' % pair for pair in zip(metric.labelnames, labels))
+                if metric.kind == 'histogram':
+                    samples = list(child.samples())
+                    value = {'count': samples[-1][2], 'sum': samples[-2][2],
+                             'buckets': dict((extra[0][1], n) for _, extra, n in samples[:-2])}
+                else:
+                    value = next(child.samples())[2]
+                values[key] = value
+            result[metric.name] = values[''] if list(values) == [''] else values
+        return result
+
+
+REGISTRY = Registry()
+
+
+def counter(name, documentation, labelnames=()):
+    return REGISTRY.counter(name, documentation, labelnames)
+
+
+def gauge(name, documentation, labelnames=()):
+    return REGISTRY.gauge(name, documentation, labelnames)
+
+
+def histogram(name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+    return REGISTRY.histogram(name, documentation, labelnames, buckets)
+
+
+def rss_bytes():
+    with open('/proc/self/status') as f:
+        for line in f:
+            if line.startswith('VmRSS:'):
+                return int(line.split()[1]) * 1024
+    return 0
+
+
+gauge('looper_rss_bytes', 'Resident set size of the looper process.').set_function(rss_bytes)
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    registry = REGISTRY
+
+    def do_GET(self):
+        if self.path in ('/', '/metrics'):
+            body, content_type = self.registry.prometheus().encode(), PROMETHEUS_CONTENT_TYPE
+        elif self.path == '/metrics.json':
+            body, content_type = json.dumps(self.registry.snapshot()).encode(), 'application/json'
+        else:
+            self.send_error(404)
+            return
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def address_string(self):
+        # unix socket clients have no address
+        return str(self.client_address[0]) if self.client_address else 'unix'
+
+    def log_message(self, format, *args):
+        pass
+
+
+class _UnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def get_request(self):
+        request, _ = super().get_request()
+        return request, ('unix', 0)
+
+
+class MetricsServer:
+    """Serve the registry over HTTP: /metrics in the Prometheus text format
+    and /metrics.json as a snapshot.  address is "host:port" or
+    "unix:/path/to/socket".
+    """
+
+    def __init__(self, address, registry=REGISTRY):
+        handler = type('MetricsHandler', (_MetricsHandler,), {'registry': registry})
+        if address.startswith('unix:'):
+            path = address[len('unix:'):]
+            if os.path.exists(path):
+                os.remove(path)
+            self._server = _UnixHTTPServer(path, handler)
+            self.address = path
+        else:
+            host, _, port = address.rpartition(':')
+            self._server = ThreadingHTTPServer((host or '127.0.0.1', int(port)), handler)
+            self._server.daemon_threads = True
+            self.address = '%s:%d' % self._server.server_address[:2]
+        self._thread = threading.Thread(target=self._server.serve_forever, name='metrics', daemon=True)
+
+    def start(self):
+        self._thread.start()
+        logger.info('serving metrics on %s' % self.address)
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+        if isinstance(self._server, _UnixHTTPServer) and os.path.exists(self.address):
+            os.remove(self.address)
+
+
+class SnapshotWriter:
+    """Write the registry's snapshot as JSON to path every interval
+    seconds, replacing the file atomically.
+    """
+
+    def __init__(self, path, interval=SNAPSHOT_INTERVAL, registry=REGISTRY):
+        self._path = path
+        self._interval = interval
+        self._registry = registry
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='metrics-snapshot', daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        self.write()
+
+    def write(self):
+        tmp = self._path + '.tmp'
+        try:
+            with open(tmp, 'w') as f:
+                json.dump({'time': time.time(), 'metrics': self._registry.snapshot()}, f)
+            os.replace(tmp, self._path)
+        except OSError as e:
+            logger.warning('cannot write metrics snapshot %s: %s' % (self._path, e))
+
+    def _run(self):
+        while not self._stop.wait(self._interval):
+            self.write()
+
+
+class Exporters:
+    """The server and snapshot writer configured in [metrics]."""
+
+    def __init__(self, server=None, writer=None):
+        self.server = server
+        self.writer = writer
+
+    def stop(self):
+        if self.server is not None:
+            self.server.stop()
+        if self.writer is not None:
+            self.writer.stop()
+
+
+def configure(config):
+    """Start what [metrics] asks for.  Metrics are always collected, this
+    only decides whether and where they're published.
+    """
+    if not config.getboolean('metrics', 'enabled', fallback=False):
+        return Exporters()
+    server = writer = None
+    listen = config.get('metrics', 'listen', fallback='').strip()
+    if listen:
+        try:
+            server = MetricsServer(listen)
+            server.start()
+        except OSError as e:
+            logger.error('cannot serve metrics on %s: %s' % (listen, e))
+            server = None
+    snapshot_path = config.get('metrics', 'snapshot_path', fallback='').strip()
+    if snapshot_path:
+        writer = SnapshotWriter(snapshot_path,
+                                config.getfloat('metrics', 'snapshot_interval', fallback=SNAPSHOT_INTERVAL))
+        writer.start()
+    return Exporters(server, writer)
@@ -1,44 +1,114 @@
 # Copyright 2015 Adafruit Industries.
 # Author: Tony DiCola
 # License: GNU GPLv2, see LICENSE.txt
+import logging
 import random
 import os
 import re
 import itertools
 import pygame
 import threading
+import time
 from typing import Optional
 from enum import Enum
 from watchdog.observers.polling import PollingObserver
 from watchdog import events
 
-from .utils import timeit, load_image_fit_screen, is_media_type, is_short_video, get_sysinfo
+from .utils import load_image_fit_screen, is_media_type, is_short_video, get_sysinfo, FILL_COLOR
+from .resample import SMOOTH
+from . import metrics
+from . import trace
 from .baselog import getlogger
 logger = getlogger(__name__)
 
+scan_seconds = metrics.histogram('looper_scan_seconds', 'Time of a full scan of the media paths.')
+assets_indexed = metrics.gauge('looper_assets_indexed', 'Assets in the playlist.')
+load_seconds = metrics.histogram('looper_preload_seconds', 'Time to preload an asset, by media type.', ['type'])
+
 random.seed()
 
 LOAD_FAIL = -1
 LOAD_PENDING = 0
 LOAD_SUCC = 1
 
+# Number of assets a scanning playlist needs to find before playback starts.
+STREAM_AFTER = 10
+# Removing files from the cache file means rewriting it, removals are held
+# back until this many seconds passed since the first one (or the playlist
+# is stopped).  Added files are appended right away.
+CACHE_REWRITE_SEC = 30
+
 class MediaType(Enum):
     OTHERS = -1
     IMAGE = 0
     VIDEO = 1
     ALL = 2
 
-class MediaAsset:
-    """Representation of a media asset, either image or video"""
+# Directory prefixes of the assets' filenames.  Assets only keep the index
+# of theirs, the thousands of files in a directory share one string.
+_prefixes = []
+_prefix_ids = {}
+_prefix_lock = threading.Lock()
+
+def _prefix_id(prefix):
+    i = _prefix_ids.get(prefix)
+    if i is None:
+        with _prefix_lock:
+            i = _prefix_ids.get(prefix)
+            if i is None:
+                i = len(_prefixes)
+                _prefixes.append(prefix)
+                _prefix_ids[prefix] = i
+    return i
+
+# title or repeats taken from the filename, see getMediaAsset
+FROM_NAME = object()
 
-    def __init__(self, filename: str, title: Optional[str] = None, repeats: int = 1):
+class MediaAsset:
+    """Representation of a media asset, either image or video.  Kept small,
+    playlists hold hundreds of thousands of them: the filename is stored as
+    its directory's index in a shared table plus its basename, and a title
+    and repeats taken from the filename are only worked out when used.
+    """
+    __slots__ = ('_prefix', '_name', '_title', '_repeats', 'playcount',
+                 'preload_resource', 'loading_status', 'short')
+
+    def __init__(self, filename: str, title: Optional[str] = None, repeats=1):
         """Create a playlist from the provided list of media assets."""
-        self.filename = filename
-        self.title = title
-        self.repeats = int(repeats)
+        prefix, sep, self._name = filename.rpartition('/')
+        self._prefix = _prefix_id(prefix + sep)
+        self._title = title
+        self._repeats = repeats if repeats is FROM_NAME else int(repeats)
         self.playcount = 0
         self.preload_resource = None
         self.loading_status = LOAD_PENDING
+        # whether it's a video too short to play, None until probed
+        self.short = None
+
+    @property
+    def filename(self):
+        return _prefixes[self._prefix] + self._name
+
+    @property
+    def title(self):
+        if self._title is FROM_NAME:
+            return os.path.splitext(self._name)[0]
+        return self._title
+
+    @title.setter
+    def title(self, title):
+        self._title = title
+
+    @property
+    def repeats(self):
+        if self._repeats is FROM_NAME:
+            repeatsetting = re.search('_repeat_([0-9]*)x', self._name, flags=re.IGNORECASE)
+            self._repeats = int(repeatsetting.group(1) or 1) if repeatsetting is not None else 1
+        return self._repeats
+
+    @repeats.setter
+    def repeats(self, repeats):
+        self._repeats = int(repeats)
 
     def was_played(self):
         if self.repeats > 1:
@@ -60,20 +130,21 @@ class MediaAsset:
         return hash(self.filename)
 
     def __str__(self):
-        return "{0} ({1})".format(self.filename, self.title) if self.title else self.filename
+        title = self.title
+        return "{0} ({1})".format(self.filename, title) if title else self.filename
 
     def __repr__(self):
         return repr((self.filename, self.title, self.repeats))
 
 def getMediaAsset(filepath):
+    """Asset for filepath, titled after the file's name without extension
+    and repeated as often as a "_repeat_<n>x" in it says.
+    """
+    return MediaAsset(filepath, FROM_NAME, FROM_NAME)
+
+def isMediaFile(filepath, extensions):
     filename = os.path.basename(filepath)
-    repeatsetting = re.search('_repeat_([0-9]*)x', filename, flags=re.IGNORECASE)
-    if (repeatsetting is not None):
-        repeat = repeatsetting.group(1)
-    else:
-        repeat = 1
-    basename, extension = os.path.splitext(filename)
-    return MediaAsset(filepath, basename, repeat)
+    return filename[0] != '.' and re.search('\\.{0}$'.format(extensions), filename, flags=re.IGNORECASE) is not None
 
 def fileSystemMediaIter(media_paths, extensions):
     for mpath in media_paths:
@@ -88,9 +159,8 @@ def fileSystemMediaIter(media_paths, extensions):
         for subdir, _, files in os.walk(mpath):
             for f in files:
                 filepath = os.path.join(subdir, f)
-                filename = os.path.basename(filepath)
-                if filename[0] is not '.' and re.search('\.{0}$'.format(extensions), filename, flags=re.IGNORECASE):
-                    logger.debug('found %s' % filepath)
+                if isMediaFile(filepath, extensions):
+                    logger.debug('found %s', filepath)
                     yield getMediaAsset(filepath)
 
 def mediaListIter(media_list):
@@ -121,9 +191,10 @@ def random_sample(iter, k):
 
 class WatchDogWrapIter(events.FileSystemEventHandler):
 
-    def __init__(self, it, paths):
+    def __init__(self, it, paths, accept=None):
         self.index = 0
-        self.items = list(it)
+        self.accept = accept
+        self.items = [item for item in it if accept is None or accept(item)]
         self.added = []
         self.observer = PollingObserver()
         for path in paths:
@@ -146,10 +217,13 @@ class WatchDogWrapIter(events.FileSystemEventHandler):
         else:
             return None
 
-    def __del__(self):
+    def stop(self):
         self.observer.stop()
         self.observer.join()
 
+    def __del__(self):
+        self.stop()
+
     def __iter__(self):
         return self
 
@@ -172,14 +246,16 @@ class WatchDogWrapIter(events.FileSystemEventHandler):
             return None
 
     def on_created(self, event):
-        logger.info('watchdog add %s' % event.src_path)
+        logger.debug('watchdog add %s', event.src_path)
         asset = getMediaAsset(event.src_path)
+        if self.accept is not None and not self.accept(asset):
+            return
         if not self.added.count(asset):
             self.added.append(asset)
         self._print_stats()
 
     def on_deleted(self, event):
-        logger.info('watchdog del %s' % event.src_path)
+        logger.debug('watchdog del %s', event.src_path)
         asset = getMediaAsset(event.src_path)
         while self.added.count(asset):
             self.added.remove(asset)
@@ -188,8 +264,7 @@ class WatchDogWrapIter(events.FileSystemEventHandler):
         self._print_stats()
 
     def _print_stats(self):
-        output = 'added: %d, items: %d, total: %d' % (len(self.added), len(self.items), self.count())
-        logger.info(output)
+        logger.debug('added: %d, items: %d, total: %d', len(self.added), len(self.items), self.count())
 
 class WrapIter(object):
 
@@ -233,13 +308,39 @@ class PlaylistBase(object):
                                  .translate(str.maketrans('', '', ' \t\r\n.')) \
                                  .split(',')
 
-    def _is_media_type(self, asset):
-        if is_media_type(asset.filename, self._video_extensions):
-            return self._media_type == MediaType.ALL or self._media_type == MediaType.VIDEO
-        elif is_media_type(asset.filename, self._image_extensions):
-            return self._media_type == MediaType.ALL or self._media_type == MediaType.IMAGE
+        if self._media_type == MediaType.ALL:
+            self._eligible_types = (MediaType.IMAGE, MediaType.VIDEO)
         else:
-            return False
+            self._eligible_types = (self._media_type,)
+        self._extension_types = dict((ext.lower(), MediaType.VIDEO) for ext in self._video_extensions)
+        self._extension_types.update((ext.lower(), MediaType.IMAGE) for ext in self._image_extensions)
+        # assets seen per media type, eligible or not
+        self._type_counts = dict((t, 0) for t in MediaType)
+
+    def _type_of(self, filename):
+        return self._extension_types.get(os.path.splitext(filename)[1][1:].lower(), MediaType.OTHERS)
+
+    def _is_media_type(self, asset):
+        return self._type_of(asset.filename) in self._eligible_types
+
+    def _accept(self, asset):
+        """Sort asset into its media type partition when the playlist is
+        built, return true if it belongs in the playlist.
+        """
+        media_type = self._type_of(asset.filename)
+        self._type_counts[media_type] += 1
+        return media_type in self._eligible_types
+
+    def _log_partitions(self):
+        assets_indexed.set(sum(self._type_counts[t] for t in self._eligible_types))
+        logger.info('playlist: %d images, %d videos, %d others, playing %s' % (
+            self._type_counts[MediaType.IMAGE], self._type_counts[MediaType.VIDEO],
+            self._type_counts[MediaType.OTHERS], self._media_type.name.lower()))
+
+    def _is_short(self, asset):
+        if asset.short is None:
+            asset.short = is_short_video(asset.filename)
+        return asset.short
 
     def reload(self, func_progress=None):
         pass
@@ -255,39 +356,50 @@ class PlaylistBase(object):
 
     def get_next(self, is_random) -> MediaAsset:
         """Get the next asset in the playlist. Will loop to start of playlist
-        after reaching end.
+        after reaching end.  The playlist only holds assets of the eligible
+        media types, videos too short to play are skipped, giving up (and
+        returning None) once every asset was found too short.
         """
-        while True:
-            if not is_random:
-                asset = self._get_next()
-            else:
-                asset = self._get_random()
-
+        n = max(self.length() or 0, 1)
+        # Random draws repeat, after length() of them walk the playlist once
+        # in order so a playable asset is found whenever there is one.
+        draws = [self._get_random] * n + [self._get_next] * n if is_random else [self._get_next] * n
+        for draw in draws:
+            asset = draw()
             if asset is None:
                 return None
-            elif self._is_media_type(asset):
-                if is_media_type(asset.filename, self._video_extensions):
-                    if not is_short_video(asset.filename):
-                        return asset
-                else:
-                    return asset
-            else:
-                logger.info('ingore %s' % asset)
+            if self._type_of(asset.filename) == MediaType.VIDEO and self._is_short(asset):
+                logger.debug('skip short video %s', asset)
+                continue
+            return asset
 
+        logger.warning('no playable asset in %d' % self.length())
         return None
 
     def length(self):
         pass
 
+    def patch(self, added, removed):
+        """Add the files at the paths in added and drop those in removed
+        without rebuilding the playlist.  Return false if the playlist can't
+        be patched and has to be rebuilt.
+        """
+        return False
+
+    def stop(self):
+        """Release background resources, the playlist is no longer used."""
+        pass
+
 
 class SimplePlaylist(PlaylistBase):
 
     def __init__(self, media_list, config):
         super().__init__(config)
-        self._wrap_asset_iter = WrapIter(mediaListIter(media_list))
+        self._wrap_asset_iter = WrapIter(mediaListIter([asset for asset in media_list if self._accept(asset)]))
 
     def load(self, func_progress=None):
         self._length = self._wrap_asset_iter.count()
+        self._log_partitions()
 
         if func_progress is not None:
             func_progress(self._length)
@@ -303,6 +415,12 @@ class SimplePlaylist(PlaylistBase):
 
 
 class CacheFilePlayList(PlaylistBase):
+    """Playlist of all media files below media_paths.  The list is kept in
+    a cache file, when there is none the paths are scanned in a background
+    thread: the playlist becomes playable once the first stream_after assets
+    were found, and assets found after that are added as the scan goes on.
+    The cache file is only put in place once the scan completed.
+    """
 
     def removeCacheFile(self):
         if self.cacheFileExists():
@@ -315,62 +433,213 @@ class CacheFilePlayList(PlaylistBase):
     def __init__(self, media_paths, extensions, config):
         super().__init__(config)
         self.cache_file_path = config.get('playlist', 'cache_path', fallback='/tmp/playlist.txt')
+        self._stream_after = config.getint('playlist', 'stream_after', fallback=STREAM_AFTER)
         self.media_paths = media_paths
         self.extensions = extensions
-        if self.cacheFileExists():
-            self._wrap_asset_iter = WrapIter(cacheIter(self.cache_file_path))
-        else:
-            self._wrap_asset_iter = WrapIter(fileSystemMediaIter(media_paths, extensions))
+        self._assets = []
+        self._index = 0
+        self._lock = threading.Lock()
+        self._changed = threading.Condition(self._lock)
+        self._scan_thread = None
+        self._scan_done = threading.Event()
+        self._scan_cancel = threading.Event()
+        self._cached = None         # filenames in the cache file, read on the first patch
+        self._cache_removed = set() # still in the cache file, to be dropped by the next rewrite
+        self._cache_removed_since = None
 
     def reload(self, func_progress=None):
+        self.stop()
         self.removeCacheFile()
-        self._wrap_asset_iter = WrapIter(fileSystemMediaIter(self.media_paths, self.extensions))
-        self._scan(func_progress)
+        self._start_scan()
+        self._wait_ready(func_progress)
 
     def load(self, func_progress=None):
-        if not self.cacheFileExists():
-            logger.info('%s not found, scanning %s' % (self.cache_file_path, self.media_paths))
-            self._scan(func_progress)
-        else:
-            logger.info('loading from cache file %s' % self.cache_file_path)
-            self._length = self._wrap_asset_iter.count()
-            if func_progress is not None:
-                func_progress(self._length)
+        if self._scan_thread is None:
+            if not self.cacheFileExists():
+                logger.info('%s not found, scanning %s' % (self.cache_file_path, self.media_paths))
+                self._start_scan()
+            else:
+                logger.info('loading from cache file %s' % self.cache_file_path)
+                self._assets = [asset for asset in cacheIter(self.cache_file_path) if self._accept(asset)]
+                self._scan_done.set()
+                self._log_partitions()
+        self._wait_ready(func_progress)
+
+    def stop(self):
+        """Cancel a running scan and write out held back cache file edits."""
+        self._rewrite_cache()
+        if self._scan_thread is not None:
+            self._scan_cancel.set()
+            self._scan_thread.join()
+            self._scan_thread = None
+        self._scan_cancel.clear()
+
+    def wait_scanned(self, timeout=None):
+        """Wait for the background scan to complete, return true if it did."""
+        return self._scan_done.wait(timeout)
+
+    def _start_scan(self):
+        self._assets = []
+        self._index = 0
+        self._type_counts = dict((t, 0) for t in MediaType)
+        self._scan_done.clear()
+        self._cached = None
+        self._cache_removed = set()
+        self._cache_removed_since = None
+        self._scan_start = time.monotonic()
+        self._scan_thread = threading.Thread(target=self._scan, daemon=True)
+        self._scan_thread.start()
+
+    def _wait_ready(self, func_progress):
+        """Block until there are enough assets to start playing, reporting
+        the number found so far from the calling thread.
+        """
+        with self._changed:
+            while len(self._assets) < self._stream_after and not self._scan_done.is_set():
+                self._changed.wait(0.1)
+                if func_progress is not None:
+                    func_progress(len(self._assets))
+        if func_progress is not None:
+            func_progress(self.length())
+        if self._scan_thread is not None:
+            logger.info('%d assets ready after %.1f ms' % (self.length(), (time.monotonic() - self._scan_start) * 1000))
 
     def _get_next(self) -> MediaAsset:
-        return next(self._wrap_asset_iter)
+        with self._lock:
+            if len(self._assets) == 0:
+                return None
+            if self._index >= len(self._assets):
+                # Wrap around to the start after finishing.
+                self._index = 0
+            asset = self._assets[self._index]
+            self._index += 1
+            return asset
 
     def _get_random(self) -> MediaAsset:
-        return self._wrap_asset_iter.random()
+        with self._lock:
+            if len(self._assets) == 0:
+                return None
+            return random.choice(self._assets)
 
     def length(self):
-        return self._length
+        return len(self._assets)
 
-    @timeit
-    def _scan(self, func_progress):
-        self._length = 0
+    def patch(self, added, removed):
+        if not self._scan_done.is_set():
+            # the scan may or may not see these files
+            return False
+        removed = set(removed)
+        added = [path for path in added if isMediaFile(path, self.extensions)]
+        with self._lock:
+            before = self._assets[:self._index]
+            self._index -= sum(1 for asset in before if asset.filename in removed)
+            self._assets = [asset for asset in self._assets if asset.filename not in removed]
+            known = set(asset.filename for asset in self._assets)
+            self._assets.extend(asset for asset in map(getMediaAsset, added)
+                                if asset.filename not in known and self._accept(asset))
+            assets_indexed.set(len(self._assets))
+        self._patch_cache(added, removed)
+        return True
+
+    def _patch_cache(self, added, removed):
+        """Edit the cache file, which lists the media files of all types:
+        append the added files, and rewrite it without the removed ones once
+        CACHE_REWRITE_SEC passed since the first removal held back.
+        """
+        if self._cached is None:
+            self._cached = set(asset.filename for asset in cacheIter(self.cache_file_path)) \
+                if self.cacheFileExists() else set()
+        removed = self._cached.intersection(removed)
+        self._cached -= removed
+        self._cache_removed |= removed
+        if removed and self._cache_removed_since is None:
+            self._cache_removed_since = time.monotonic()
+        appended = []
+        for path in added:
+            if path in self._cached:
+                continue
+            self._cached.add(path)
+            if path in self._cache_removed:
+                # removed and added back, still listed
+                self._cache_removed.discard(path)
+            else:
+                appended.append(path)
+        if not self._cached:
+            self._cache_removed = set()
+            self._cache_removed_since = None
+            self.removeCacheFile()
+            return
+        if appended:
+            try:
+                with open(self.cache_file_path, 'a') as f:
+                    for path in appended:
+                        f.write('%s\n' % path)
+            except OSError as e:
+                logger.error('write %s error: %s' % (self.cache_file_path, e))
+        if self._cache_removed_since is not None \
+                and time.monotonic() - self._cache_removed_since >= CACHE_REWRITE_SEC:
+            self._rewrite_cache()
+
+    def _rewrite_cache(self):
+        """Rewrite the cache file without the removed files held back."""
+        if not self._cache_removed:
+            return
+        removed, self._cache_removed = self._cache_removed, set()
+        self._cache_removed_since = None
+        tmpfile = self.cache_file_path + ".tmp"
         try:
-            tmpfile = self.cache_file_path + ".tmp"
+            filenames = [asset.filename for asset in cacheIter(self.cache_file_path)]
             with open(tmpfile, 'w') as f:
-                for item in self._wrap_asset_iter.it:
-                    self._length += 1
+                for filename in filenames:
+                    if filename not in removed:
+                        f.write('%s\n' % filename)
+            os.rename(tmpfile, self.cache_file_path)
+        except OSError as e:
+            logger.error('write %s error: %s' % (self.cache_file_path, e))
+
+    @trace.traced('scan')
+    def _scan(self):
+        tmpfile = self.cache_file_path + ".tmp"
+        found = 0
+        start = time.monotonic()
+        try:
+            with open(tmpfile, 'w') as f:
+                for item in fileSystemMediaIter(self.media_paths, self.extensions):
+                    if self._scan_cancel.is_set():
+                        break
                     f.write('%s\n' % item.filename)
-                    if func_progress is not None:
-                        func_progress(self._length)
-            if self._length > 0:
+                    found += 1
+                    if not self._accept(item):
+                        continue
+                    with self._changed:
+                        self._assets.append(item)
+                        self._changed.notify()
+            if self._scan_cancel.is_set():
+                logger.info("scan cancelled after %d assets" % len(self._assets))
+                os.remove(tmpfile)
+            elif found > 0:
+                self._log_partitions()
                 os.rename(tmpfile, self.cache_file_path)
                 logger.info("scan done, create playlist file %s" % self.cache_file_path)
+            else:
+                os.remove(tmpfile)
         except Exception as e:
             logger.error('scan error: %s' % e)
+        finally:
+            scan_seconds.observe(time.monotonic() - start)
+            with self._changed:
+                self._scan_done.set()
+                self._changed.notify()
 
 
 class WatchDogPlaylist(PlaylistBase):
 
     def __init__(self, media_paths, extensions, config):
         super().__init__(config)
-        self._wrap_asset_iter = WatchDogWrapIter(fileSystemMediaIter(media_paths, extensions), media_paths)
+        self._wrap_asset_iter = WatchDogWrapIter(fileSystemMediaIter(media_paths, extensions), media_paths, self._accept)
 
     def load(self, func_progress=None):
+        self._log_partitions()
         if func_progress is not None:
             func_progress(self.length())
 
@@ -383,25 +652,41 @@ class WatchDogPlaylist(PlaylistBase):
     def length(self):
         return self._wrap_asset_iter.count()
 
+    def patch(self, added, removed):
+        # the watchdog observer follows the paths itself
+        return True
+
+    def stop(self):
+        self._wrap_asset_iter.stop()
+
 
 class ResourceLoader:
 
-    def __init__(self, playlist, config):
+    def __init__(self, playlist, config, on_loaded=None, posters=None):
+        """Preload the next assets of playlist in background threads.  The
+        optional on_loaded callback is called from the loading thread with
+        the asset once its loading_status is final.  posters is an optional
+        PosterCache videos' poster frames are loaded from.
+        """
         self._video_extensions = config.get('vlc', 'extensions') \
                                  .translate(str.maketrans('', '', ' \t\r\n.')) \
                                  .split(',')
         self._image_extensions = config.get('sdl_image', 'extensions') \
                                  .translate(str.maketrans('', '', ' \t\r\n.')) \
                                  .split(',')
+        self._fill_mode = config.get('sdl_image', 'fill_mode', fallback=FILL_COLOR).lower()
+        self._resample = config.get('sdl_image', 'resample', fallback=SMOOTH).lower()
         self._preload = max(config.getint('video_looper', 'preload'), 1)
         self._playlist = playlist
         self._cache = []
         self._threads= {}
+        self._on_loaded = on_loaded
+        self._posters = posters
 
     def get_next(self, is_random) -> MediaAsset:
         if len(self._cache) > 0 and self._cache[0].loading_status != LOAD_PENDING:
             asset = self._cache.pop(0)
-            logger.info("pop asset %s: %s" % (asset, asset.loading_status))
+            logger.debug("pop asset %s: %s", asset, asset.loading_status)
             if asset in self._threads:
                 t = self._threads[asset]
                 if t.is_alive():
@@ -419,7 +704,7 @@ class ResourceLoader:
                 logger.warn('no new asset append: %s' % asset)
                 break
 
-        logger.info('current cache list: %s' % self._cache)
+        logger.debug('current cache list: %s', self._cache)
 
         if len(self._cache) > 0:
             return self._cache[0]
@@ -429,9 +714,24 @@ class ResourceLoader:
     def length(self):
         return self._playlist.length()
 
+    def patch(self, added, removed):
+        """Patch the playlist and forget preloaded assets that were removed,
+        except the current one (it may be playing).
+        """
+        if not self._playlist.patch(added, removed):
+            return False
+        removed = set(removed)
+        for asset in [asset for asset in self._cache[1:] if asset.filename in removed]:
+            self._cache.remove(asset)
+            # its loading thread ends by itself
+            self._threads.pop(asset, None)
+            asset.preload_resource = None
+        return True
+
     def stop(self):
         for t in self._threads.values():
             t.join()
+        self._playlist.stop()
 
     def loading_status(self, asset):
         if asset in self._threads:
@@ -448,23 +748,30 @@ class ResourceLoader:
         self._threads[asset] = t
         t.start()
 
-        logger.info('_load (mem: %s) %s' % (get_sysinfo(), asset.filename))
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug('_load (mem: %s) %s', get_sysinfo(), asset.filename)
 
-    @timeit
+    @trace.traced('load')
     def _do_load(self, asset):
+        start = time.monotonic()
         try:
             if is_media_type(asset.filename, self._image_extensions):
-                asset.preload_resource = load_image_fit_screen(asset.filename)
+                asset.preload_resource = load_image_fit_screen(asset.filename, self._fill_mode, self._resample)
+                load_seconds.labels('image').observe(time.monotonic() - start)
                 asset.loading_status = LOAD_SUCC
-                logger.info('_do_load image %s [%s]' % (asset.filename, asset.preload_resource))
+                logger.debug('_do_load image %s [%s]', asset.filename, asset.preload_resource)
             elif is_media_type(asset.filename, self._video_extensions):
                 # todo request transcoded video according to screen size
-                asset.preload_resource = True
+                if self._posters is not None:
+                    asset.preload_resource = self._posters.load(asset.filename)
+                    load_seconds.labels('video').observe(time.monotonic() - start)
                 asset.loading_status = LOAD_SUCC
-                logger.info('_do_load video %s [%s]' % (asset.filename, asset.preload_resource))
+                logger.debug('_do_load video %s [%s]', asset.filename, asset.preload_resource)
             else:
                 logger.warn('not support, skip %s' % asset)
                 asset.loading_status = LOAD_FAIL
         except Exception as e:
             logger.error('error _do_load %s: %s' % (asset.filename, e))
             asset.loading_status = LOAD_FAIL
+        if self._on_loaded is not None:
+            self._on_loaded(asset)
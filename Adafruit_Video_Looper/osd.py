@@ -0,0 +1,100 @@
+# License: GNU GPLv2, see LICENSE.txt
+import collections
+
+from . import display
+from .baselog import getlogger
+logger = getlogger(__name__)
+
+# Number of rendered text labels kept around.
+LABEL_CACHE_SIZE = 32
+
+
+class OSD:
+    """On screen display for the looper's messages (idle screen, countdown,
+    progress).  Rendered labels are cached by their content and a frame is
+    only redrawn when what it shows changed, in which case only the
+    rectangles that changed are pushed to the display.
+    """
+
+    def __init__(self, screen, fgcolor, bgcolor):
+        self._screen = screen
+        self._fgcolor = fgcolor
+        self._bgcolor = bgcolor
+        self._labels = collections.OrderedDict()
+        # (surface, rect) pairs currently on screen, None when something else
+        # drew on the screen since and a full redraw is needed.
+        self._items = None
+
+    def render_text(self, message, font):
+        """Return message rendered with font, from cache if possible."""
+        key = (message, font)
+        label = self._labels.get(key)
+        if label is not None:
+            self._labels.move_to_end(key)
+            return label
+        label = font.render(message, True, self._fgcolor, self._bgcolor)
+        self._labels[key] = label
+        if len(self._labels) > LABEL_CACHE_SIZE:
+            self._labels.popitem(last=False)
+        return label
+
+    def invalidate(self):
+        """Tell the OSD someone else drew on the screen."""
+        self._items = None
+
+    def show(self, items):
+        """Show items, a list of (surface, (x, y)) pairs, on a screen filled
+        with the background color.  Return the list of rectangles that had to
+        be updated, empty if the frame is already on screen.
+        """
+        items = [(surface, surface.get_rect(topleft=(int(x), int(y)))) for surface, (x, y) in items]
+        # Frames are keyed by the surfaces (cached labels keep their
+        # identity) and where they are drawn.
+        if self._items is not None and \
+                [(id(s), tuple(r)) for s, r in items] == [(id(s), tuple(r)) for s, r in self._items]:
+            return []
+
+        if self._items is None:
+            self._screen.fill(self._bgcolor)
+            for surface, rect in items:
+                self._screen.blit(surface, rect)
+            dirty = [self._screen.get_rect()]
+        else:
+            new = {(id(s), tuple(r)) for s, r in items}
+            old = {(id(s), tuple(r)) for s, r in self._items}
+            dirty = []
+            for surface, rect in self._items:
+                if (id(surface), tuple(rect)) not in new:
+                    self._screen.fill(self._bgcolor, rect)
+                    dirty.append(rect)
+            for surface, rect in items:
+                # redraw what's new and what got partially erased
+                if (id(surface), tuple(rect)) not in old or rect.collidelist(dirty) != -1:
+                    self._screen.blit(surface, rect)
+                    dirty.append(rect)
+
+        # Hold on to the surfaces so their ids stay valid for the comparison.
+        self._items = items
+        display.update(dirty)
+        return dirty
+
+    def show_centered(self, surface):
+        """Show a single surface in the center of the screen."""
+        sw, sh = self._screen.get_size()
+        w, h = surface.get_size()
+        return self.show([(surface, (sw/2-w/2, sh/2-h/2))])
+
+    def show_stack(self, surfaces, gap):
+        """Show surfaces stacked vertically, gap pixels apart, the whole
+        stack centered.  Nothing is drawn if it doesn't fit the screen.
+        """
+        sw, sh = self._screen.get_size()
+        total_h = sum(s.get_height() for s in surfaces) + gap * (len(surfaces) - 1)
+        if total_h > sh:
+            return []
+        y = sh/2 - total_h/2
+        items = []
+        for surface in surfaces:
+            items.append((surface, (sw/2-surface.get_width()/2, y)))
+            y += surface.get_height() + gap
+        return self.show(items)
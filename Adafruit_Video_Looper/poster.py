@@ -0,0 +1,148 @@
+# License: GNU GPLv2, see LICENSE.txt
+import hashlib
+import os
+import subprocess
+import threading
+import time
+import pygame
+
+from . import metrics
+from .baselog import getlogger
+logger = getlogger(__name__)
+
+posters = metrics.counter('looper_posters_total', 'Poster frames asked for, by outcome.', ['result'])
+extract_seconds = metrics.histogram('looper_poster_extract_seconds', 'Time to extract a poster frame.')
+
+# Seconds an ffmpeg extraction may take before it's given up.
+EXTRACT_TIMEOUT = 20
+# Posters kept in the cache directory, the least recently used are deleted.
+MAX_POSTERS = 500
+
+
+class PosterStats:
+    """Hit rate and extraction cost of a PosterCache."""
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.failures = 0
+        self.extract_time = 0.0
+
+    @property
+    def hit_rate(self):
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    @property
+    def mean_extract_ms(self):
+        return self.extract_time * 1000 / self.misses if self.misses else 0.0
+
+    def __str__(self):
+        return '%d hits, %d misses (%.0f%% hit rate), %d failures, %.0f ms per extraction' % (
+            self.hits, self.misses, self.hit_rate * 100, self.failures, self.mean_extract_ms)
+
+
+class PosterCache:
+    """First frame of videos, scaled to fit the screen, shown while the video
+    player starts up.  Frames are extracted with ffmpeg and kept in
+    cache_dir as jpegs named after a hash of the video's path, mtime and the
+    screen size, so an edited video or a different screen gets a new one.
+    At most max_posters are kept, a poster's mtime is when it was last used
+    and the oldest go first.
+    """
+
+    def __init__(self, cache_dir, size, max_posters=MAX_POSTERS):
+        self._cache_dir = cache_dir
+        self._size = size
+        self._max_posters = max(max_posters, 1)
+        self._lock = threading.Lock()
+        # cleared when ffmpeg isn't installed, no point trying every video
+        self._enabled = True
+        self.stats = PosterStats()
+
+    def path_for(self, video):
+        """Return the cache file of video's poster, None if video is gone."""
+        try:
+            mtime = os.stat(video).st_mtime_ns
+        except OSError:
+            return None
+        key = '%s\0%d\0%dx%d' % (video, mtime, self._size[0], self._size[1])
+        return os.path.join(self._cache_dir, hashlib.sha1(key.encode('utf-8', 'surrogateescape')).hexdigest() + '.jpg')
+
+    def _extract(self, video, path):
+        os.makedirs(self._cache_dir, exist_ok=True)
+        tmp = path + '.tmp.jpg'
+        w, h = self._size
+        args = ['ffmpeg', '-nostdin', '-v', 'error', '-y', '-i', video, '-frames:v', '1',
+                '-vf', 'scale=%d:%d:force_original_aspect_ratio=decrease' % (w, h), tmp]
+        try:
+            subprocess.run(args, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE,
+                           timeout=EXTRACT_TIMEOUT, check=True)
+            os.replace(tmp, path)
+        finally:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+
+    def _prune(self):
+        """Delete the least recently used posters beyond max_posters."""
+        try:
+            entries = [(e.stat().st_mtime_ns, e.path) for e in os.scandir(self._cache_dir)
+                       if e.name.endswith('.jpg') and not e.name.endswith('.tmp.jpg')]
+        except OSError as e:
+            logger.warning('cannot list %s: %s' % (self._cache_dir, e))
+            return
+        entries.sort()
+        for _, path in entries[:max(len(entries) - self._max_posters, 0)]:
+            try:
+                os.remove(path)
+            except OSError as e:
+                logger.warning('cannot delete poster %s: %s' % (path, e))
+
+    def load(self, video):
+        """Return the poster of video as a surface, extracting it first if
+        it's not cached yet.  None if it can't be had.  Blocks for the
+        extraction, call it from a background thread.
+        """
+        path = self.path_for(video)
+        if path is None or not self._enabled:
+            return None
+        if os.path.exists(path):
+            with self._lock:
+                self.stats.hits += 1
+            posters.labels('hit').inc()
+            try:
+                os.utime(path)
+            except OSError:
+                pass
+        else:
+            start = time.monotonic()
+            try:
+                self._extract(video, path)
+            except FileNotFoundError:
+                logger.error('ffmpeg not found, poster frames disabled')
+                self._enabled = False
+                return None
+            except (subprocess.SubprocessError, OSError) as e:
+                logger.warning('poster extraction failed for %s: %s' % (video, e))
+                with self._lock:
+                    self.stats.failures += 1
+                posters.labels('failure').inc()
+                return None
+            elapsed = time.monotonic() - start
+            with self._lock:
+                self.stats.misses += 1
+                self.stats.extract_time += elapsed
+            posters.labels('miss').inc()
+            extract_seconds.observe(elapsed)
+            logger.debug('poster of %s extracted in %.0f ms (%s)', video, elapsed * 1000, self.stats)
+            with self._lock:
+                self._prune()
+        try:
+            return pygame.image.load(path).convert()
+        except pygame.error as e:
+            logger.warning('bad poster %s for %s: %s' % (path, video, e))
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            return None
@@ -0,0 +1,106 @@
+# License: GNU GPLv2, see LICENSE.txt
+import concurrent.futures
+import math
+import os
+import threading
+import pygame
+
+from . import metrics
+from . import trace
+from .baselog import getlogger
+logger = getlogger(__name__)
+
+resample_seconds = metrics.histogram('looper_resample_seconds', 'Time to scale an image.', ['method'])
+
+# Resampling methods, see [sdl_image] resample.
+SMOOTH = 'smooth'
+NEAREST = 'nearest'
+METHODS = (SMOOTH, NEAREST)
+
+# Filters SMOOTH picks from, by scale ratio.
+AREA = 'area'
+BILINEAR = 'bilinear'
+
+# Fewest output rows worth handing to a thread.
+MIN_TILE_ROWS = 32
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor():
+    """Thread pool the tiles run on.  smoothscale releases the GIL while it
+    filters, so threads use all cores without copying the source into
+    worker processes (which for a 48 MP photo costs more than the filter).
+    """
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = concurrent.futures.ThreadPoolExecutor(max_workers=os.cpu_count() or 1,
+                                                              thread_name_prefix='resample')
+        return _executor
+
+
+def choose(src_size, dst_size):
+    """Return the filter for scaling src_size to dst_size: area average when
+    shrinking (every source pixel counts, no aliasing), bilinear when
+    enlarging.
+    """
+    ratio = max(src_size[0] / float(dst_size[0]), src_size[1] / float(dst_size[1]))
+    return AREA if ratio > 1 else BILINEAR
+
+
+def tile_rows(src_h, dst_h, tiles):
+    """Return how many output rows each of about tiles tiles gets, a
+    multiple of the smallest band that maps onto whole source rows so the
+    area filter sees the same pixels as without tiling.  None when tiling
+    isn't worth it.
+    """
+    step = dst_h // math.gcd(src_h, dst_h)
+    rows = max(int(math.ceil(dst_h / float(tiles * step))) * step, step)
+    if rows < MIN_TILE_ROWS or rows >= dst_h:
+        return None
+    return rows
+
+
+def _scale_tile(src, out, y0, y1):
+    sw, sh = src.get_size()
+    dw, dh = out.get_size()
+    sy0 = y0 * sh // dh
+    sy1 = y1 * sh // dh
+    pygame.transform.smoothscale(src.subsurface((0, sy0, sw, sy1 - sy0)), (dw, y1 - y0),
+                                 out.subsurface((0, y0, dw, y1 - y0)))
+
+
+def resample(surface, size, method=SMOOTH, tiles=None):
+    """Return surface scaled to size.  SMOOTH uses pygame's smoothscale, an
+    area average when shrinking and bilinear when enlarging; large shrinks
+    are split in bands of rows scaled in parallel on tiles threads (the
+    number of cores by default).  NEAREST is pygame's scale.
+    """
+    with resample_seconds.labels(method).time(), trace.span('scale'):
+        return _resample(surface, size, method, tiles)
+
+
+def _resample(surface, size, method, tiles):
+    size = (max(int(size[0]), 1), max(int(size[1]), 1))
+    if method == NEAREST:
+        return pygame.transform.scale(surface, size)
+    if surface.get_size() == size:
+        return surface.copy()
+    if surface.get_bitsize() not in (24, 32):
+        surface = surface.convert(32)
+
+    if tiles is None:
+        tiles = os.cpu_count() or 1
+    rows = None
+    if tiles > 1 and choose(surface.get_size(), size) == AREA:
+        rows = tile_rows(surface.get_height(), size[1], tiles)
+    if rows is None:
+        return pygame.transform.smoothscale(surface, size)
+
+    out = pygame.Surface(size, surface.get_flags() & pygame.SRCALPHA, surface)
+    bands = [(y, min(y + rows, size[1])) for y in range(0, size[1], rows)]
+    # list() re-raises the first error of a tile
+    list(_get_executor().map(lambda band: _scale_tile(surface, out, *band), bands))
+    return out
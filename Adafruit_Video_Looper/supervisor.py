@@ -0,0 +1,122 @@
+# License: GNU GPLv2, see LICENSE.txt
+import os
+import select
+import signal
+import subprocess
+import threading
+import time
+
+from .baselog import getlogger
+logger = getlogger(__name__)
+
+# Signals sent, in order, when stopping a child.  Each rung waits up to the
+# given number of seconds for the process to exit before escalating, the last
+# rung waits for whatever is left of the caller's timeout.
+TERMINATE_LADDER = ((signal.SIGTERM, 0.5), (signal.SIGKILL, None))
+
+
+class ChildProcess:
+    """A player process started in its own session so it (and any helper
+    processes it forks, like vlc does) can be signalled as a group without
+    touching anything else on the system.  Exit is observable through a file
+    descriptor: a pidfd when the kernel supports it, otherwise a pipe closed
+    by a waiter thread.
+    """
+
+    def __init__(self, args, ladder=TERMINATE_LADDER, **kwargs):
+        kwargs.setdefault('stdout', subprocess.DEVNULL)
+        kwargs.setdefault('close_fds', True)
+        self.args = args
+        self._ladder = ladder
+        self._pidfd = None
+        self._pipe_r = None
+        self._popen = subprocess.Popen(args, start_new_session=True, **kwargs)
+        try:
+            self._pidfd = os.pidfd_open(self._popen.pid)
+        except (AttributeError, OSError):
+            # No pidfd (kernel < 5.3), let a thread block in waitpid and
+            # signal the exit by closing the write end of a pipe.
+            self._pipe_r, pipe_w = os.pipe()
+            threading.Thread(target=self._wait_thread, args=(pipe_w,), daemon=True).start()
+
+    def _wait_thread(self, pipe_w):
+        try:
+            self._popen.wait()
+        finally:
+            os.close(pipe_w)
+
+    @property
+    def pid(self):
+        return self._popen.pid
+
+    @property
+    def returncode(self):
+        return self._popen.returncode
+
+    def fileno(self):
+        """File descriptor that becomes readable once the process exited."""
+        return self._pidfd if self._pidfd is not None else self._pipe_r
+
+    def poll(self):
+        """Reap the process if it exited, return its exit code or None."""
+        return self._popen.poll()
+
+    def is_running(self):
+        return self.poll() is None
+
+    def wait(self, timeout=None):
+        """Block until the process exits or timeout seconds elapsed, without
+        spinning.  Return true if the process has exited.
+        """
+        if self.poll() is not None:
+            return True
+        fd = self.fileno()
+        if fd is not None:
+            try:
+                select.select([fd], [], [], timeout)
+            except (OSError, ValueError):
+                # fd already closed by a concurrent stop()
+                pass
+        return self.poll() is not None
+
+    def _signal(self, sig):
+        try:
+            os.killpg(self._popen.pid, sig)
+        except (ProcessLookupError, PermissionError):
+            pass
+
+    def stop(self, timeout=0):
+        """Terminate the process group walking the signal ladder.  timeout is
+        how many seconds to block waiting for the exit in total, with 0 the
+        last (strongest) signal is sent straight away and we don't wait.
+        Return true if the process is gone.
+        """
+        start = time.monotonic()
+        ladder = self._ladder if timeout > 0 else self._ladder[-1:]
+        for sig, grace in ladder:
+            if self.poll() is not None:
+                break
+            self._signal(sig)
+            remaining = max(timeout - (time.monotonic() - start), 0)
+            if self.wait(remaining if grace is None else min(grace, remaining)):
+                break
+        exited = self.poll() is not None
+        if exited:
+            logger.debug('%s exited with %s after %.1f ms' %
+                         (self.args[0], self.returncode, (time.monotonic() - start) * 1000))
+            self.close()
+        elif timeout > 0:
+            logger.warning('%s (pid %d) still running after %.1f s' % (self.args[0], self.pid, timeout))
+        return exited
+
+    def __del__(self):
+        self.close()
+
+    def close(self):
+        """Release the exit file descriptor."""
+        if self._pidfd is not None:
+            os.close(self._pidfd)
+            self._pidfd = None
+        if self._pipe_r is not None:
+            os.close(self._pipe_r)
+            self._pipe_r = None
@@ -0,0 +1,113 @@
+# License: GNU GPLv2, see LICENSE.txt
+import hashlib
+import json
+import os
+
+from .baselog import getlogger
+logger = getlogger(__name__)
+
+# Manifest file kept in the target directory (a dot file, so it's never
+# taken for a movie).
+MANIFEST_NAME = '.sync-manifest.json'
+MANIFEST_VERSION = 1
+
+# Bytes read at the start, middle and end of a file for its sampled hash.
+SAMPLE_SIZE = 64 * 1024
+
+
+def sample_hash(path):
+    """Return a hash of path's size and three samples of its content.  Far
+    from a full checksum but cheap on multi-GB videos, and enough to tell a
+    file that only got a new mtime (FAT keeps local time, a timezone change
+    shifts every mtime) from one that was replaced.
+    """
+    h = hashlib.blake2b(digest_size=16)
+    with open(path, 'rb') as f:
+        size = os.fstat(f.fileno()).st_size
+        h.update(str(size).encode())
+        for offset in (0, max(size // 2 - SAMPLE_SIZE // 2, 0), max(size - SAMPLE_SIZE, 0)):
+            f.seek(offset)
+            h.update(f.read(SAMPLE_SIZE))
+    return h.hexdigest()
+
+
+class SyncManifest:
+    """What copy mode copied into a directory: for every file the size and
+    mtime of the source it came from (plus its sampled hash when use_hash)
+    and the size and mtime of the copy.  Used to copy only what changed
+    since the last sync.
+    """
+
+    def __init__(self, directory, use_hash=True):
+        self._path = os.path.join(directory, MANIFEST_NAME)
+        self._directory = directory
+        self._use_hash = use_hash
+        self._entries = {}
+
+    def load(self):
+        """Read the manifest, a missing or unreadable one is empty (which
+        makes the next sync copy everything).
+        """
+        try:
+            with open(self._path) as f:
+                data = json.load(f)
+            if data.get('version') == MANIFEST_VERSION:
+                self._entries = data['files']
+        except (OSError, ValueError, KeyError) as e:
+            logger.info('no usable sync manifest %s: %s' % (self._path, e))
+            self._entries = {}
+        return self
+
+    def save(self):
+        tmp = self._path + '.tmp'
+        with open(tmp, 'w') as f:
+            json.dump({'version': MANIFEST_VERSION, 'files': self._entries}, f)
+        os.replace(tmp, self._path)
+
+    def _unchanged(self, name, src):
+        entry = self._entries.get(name)
+        if entry is None:
+            return False
+        try:
+            st = os.stat(src)
+            dst = os.stat(os.path.join(self._directory, name))
+        except OSError:
+            return False
+        # the copy must still be the one made
+        if (dst.st_size, dst.st_mtime_ns) != (entry['target_size'], entry['target_mtime']):
+            return False
+        if st.st_size != entry['size']:
+            return False
+        if st.st_mtime_ns == entry['mtime']:
+            return True
+        # same size, new mtime: same content?
+        if self._use_hash and entry.get('hash') and sample_hash(src) == entry['hash']:
+            entry['mtime'] = st.st_mtime_ns
+            return True
+        return False
+
+    def plan(self, sources, targets, replace):
+        """Return (to_copy, to_delete): the names in sources (a dict of name
+        to source path) that have to be copied and the names in targets
+        (names of the files in the directory) to delete.  In replace mode
+        files that aren't in sources any more are deleted, in add mode
+        nothing is.
+        """
+        to_copy = sorted(name for name, src in sources.items() if not self._unchanged(name, src))
+        to_delete = sorted(name for name in targets if name not in sources) if replace else []
+        return to_copy, to_delete
+
+    def record(self, name, src):
+        """Remember the file just copied from src to name."""
+        st = os.stat(src)
+        dst = os.stat(os.path.join(self._directory, name))
+        self._entries[name] = {
+            'size': st.st_size,
+            'mtime': st.st_mtime_ns,
+            'hash': sample_hash(src) if self._use_hash else None,
+            'target_size': dst.st_size,
+            'target_mtime': dst.st_mtime_ns,
+        }
+
+    def forget(self, name):
+        self._entries.pop(name, None)
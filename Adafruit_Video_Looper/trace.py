@@ -0,0 +1,139 @@
+# License: GNU GPLv2, see LICENSE.txt
+import collections
+import functools
+import json
+import os
+import threading
+import time
+
+from .baselog import getlogger
+logger = getlogger(__name__)
+
+# Spans kept, the oldest are dropped first.  A span takes about 200 bytes.
+BUFFER_SIZE = 20000
+DUMP_PATH = '/tmp/video_looper_trace.json'
+
+# Module state rather than an object so a disabled span costs one global
+# lookup.  Spans are appended as (name, start us, duration us, thread id,
+# args); deque appends are atomic, no lock needed.
+_enabled = False
+_buffer = collections.deque(maxlen=BUFFER_SIZE)
+
+
+class _Span:
+    __slots__ = ('_name', '_args', '_start')
+
+    def __init__(self, name, args):
+        self._name = name
+        self._args = args
+
+    def __enter__(self):
+        self._start = time.monotonic_ns()
+        return self
+
+    def __exit__(self, *exc):
+        end = time.monotonic_ns()
+        _buffer.append((self._name, self._start // 1000, (end - self._start) // 1000,
+                        threading.get_ident(), self._args))
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        pass
+
+
+_NULL_SPAN = _NullSpan()
+
+
+def span(name, args=None):
+    """Context manager recording the time of its block as name, with an
+    optional dict of args shown with it.  Does nothing unless enabled.
+    """
+    if not _enabled:
+        return _NULL_SPAN
+    return _Span(name, args)
+
+
+def traced(name):
+    """Decorator recording every call of the function as a span."""
+    def decorate(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return func(*args, **kwargs)
+            with _Span(name, None):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def enable(buffer_size=BUFFER_SIZE):
+    global _enabled, _buffer
+    if _buffer.maxlen != buffer_size:
+        _buffer = collections.deque(_buffer, maxlen=buffer_size)
+    _enabled = True
+
+
+def disable():
+    global _enabled
+    _enabled = False
+
+
+def is_enabled():
+    return _enabled
+
+
+def clear():
+    _buffer.clear()
+
+
+def spans():
+    """The recorded spans, oldest first."""
+    return list(_buffer)
+
+
+def trace_events():
+    """The recorded spans as a Chrome trace-event document, loadable in
+    chrome://tracing or Perfetto.
+    """
+    pid = os.getpid()
+    names = dict((t.ident, t.name) for t in threading.enumerate())
+    events = []
+    tids = set()
+    for name, start, duration, tid, args in spans():
+        event = {'name': name, 'cat': 'looper', 'ph': 'X', 'ts': start, 'dur': duration,
+                 'pid': pid, 'tid': tid}
+        if args:
+            event['args'] = args
+        events.append(event)
+        tids.add(tid)
+    for tid in sorted(tids):
+        events.append({'name': 'thread_name', 'ph': 'M', 'pid': pid, 'tid': tid,
+                       'args': {'name': names.get(tid, str(tid))}})
+    return {'traceEvents': events, 'displayTimeUnit': 'ms'}
+
+
+def dump(path=DUMP_PATH):
+    """Write the recorded spans to path, return how many there were."""
+    document = trace_events()
+    count = sum(1 for e in document['traceEvents'] if e['ph'] == 'X')
+    tmp = path + '.tmp'
+    with open(tmp, 'w') as f:
+        json.dump(document, f)
+    os.replace(tmp, path)
+    logger.info('dumped %d trace spans to %s' % (count, path))
+    return count
+
+
+def configure(config):
+    """Enable tracing if [trace] asks for it, return the dump path."""
+    if config.getboolean('trace', 'enabled', fallback=False):
+        enable(config.getint('trace', 'buffer_size', fallback=BUFFER_SIZE))
+    else:
+        disable()
+    return config.get('trace', 'dump_path', fallback=DUMP_PATH).strip() or DUMP_PATH
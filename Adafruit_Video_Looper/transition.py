@@ -0,0 +1,169 @@
+# License: GNU GPLv2, see LICENSE.txt
+import time
+import pygame
+
+# numpy is optional, only needed for crossfades.
+try:
+    import numpy
+    import pygame.surfarray
+except ImportError:
+    numpy = None
+
+from . import display
+from . import metrics
+from . import trace
+from .baselog import getlogger
+logger = getlogger(__name__)
+
+fade_fps = metrics.gauge('looper_fade_fps', 'Frames per second of the last transition.')
+fade_dropped = metrics.counter('looper_fade_dropped_frames_total', 'Transition frames skipped to keep up.')
+
+FADE = 'fade'
+CROSSFADE = 'crossfade'
+
+
+class FadeStats:
+    """Outcome of the last transition, to tune duration/fps on slow boards."""
+
+    def __init__(self, frames=0, dropped=0, elapsed=0.0):
+        self.frames = frames
+        self.dropped = dropped
+        self.elapsed = elapsed
+
+    @property
+    def fps(self):
+        return self.frames / self.elapsed if self.elapsed > 0 else 0.0
+
+    def __str__(self):
+        return '%d frames in %.0f ms, %.1f fps, %d dropped' % (self.frames, self.elapsed * 1000, self.fps, self.dropped)
+
+
+class Transition:
+    """Base of the screen transitions: runs a fixed number of steps in a
+    fixed amount of time.  Frames are paced with a pygame Clock at the
+    configured rate, when drawing falls behind the steps that are already
+    late are skipped instead of stretching the transition.
+    """
+
+    def __init__(self, screen, duration_ms, fps):
+        self._screen = screen
+        self._duration = max(duration_ms, 0) / 1000.0
+        self._fps = max(fps, 1)
+        self._steps = {}
+        self.stats = FadeStats()
+
+    def steps(self, value_from, value_to):
+        """Return the value of every frame, computed once per range."""
+        key = (value_from, value_to)
+        steps = self._steps.get(key)
+        if steps is None:
+            n = max(int(round(self._duration * self._fps)), 1)
+            steps = [int(round(value_from + (value_to - value_from) * (i + 1) / n)) for i in range(n)]
+            self._steps[key] = steps
+        return steps
+
+    def _run(self, steps, draw, cancel):
+        clock = pygame.time.Clock()
+        frames = dropped = 0
+        start = time.monotonic()
+        i = 0
+        while i < len(steps):
+            if cancel is not None and cancel.is_set():
+                break
+            # Frame due at this point in time, skip the ones we missed.
+            due = int((time.monotonic() - start) * self._fps)
+            if due > i:
+                dropped += min(due, len(steps) - 1) - i
+                i = min(due, len(steps) - 1)
+            with trace.span('fade frame'):
+                draw(steps[i])
+            frames += 1
+            i += 1
+            if i < len(steps):
+                clock.tick(self._fps)
+        self.stats = FadeStats(frames, dropped, time.monotonic() - start)
+        fade_fps.set(self.stats.fps)
+        fade_dropped.inc(dropped)
+        return self.stats
+
+
+class FadeEngine(Transition):
+    """Fade an image in or out over the background color."""
+
+    def __init__(self, screen, bgcolor, duration_ms, fps):
+        super().__init__(screen, duration_ms, fps)
+        self._bgcolor = bgcolor
+
+    def _draw(self, image, alpha, pos):
+        image.set_alpha(alpha)
+        self._screen.fill(self._bgcolor)
+        self._screen.blit(image, pos)
+        display.update()
+
+    def fade(self, image, alpha_from, alpha_to, cancel=None):
+        """Fade image, centered on screen, from alpha_from to alpha_to.
+        cancel is an optional threading.Event checked before every frame.
+        """
+        X, Y = self._screen.get_size()
+        pos = (X // 2 - image.get_width() // 2, Y // 2 - image.get_height() // 2)
+        stats = self._run(self.steps(alpha_from, alpha_to),
+                          lambda alpha: self._draw(image, alpha, pos), cancel)
+        logger.debug('fade %d -> %d: %s', alpha_from, alpha_to, stats)
+        return stats
+
+
+class CrossFade(Transition):
+    """Blend two full screen frames into each other.  The blend runs on
+    int16 numpy arrays with a fixed point weight (0..128, so (b - a) * w
+    can't overflow) into buffers allocated once per screen size, a frame
+    allocates nothing.
+    """
+
+    # Weight of the incoming frame at the end of the blend, 1.0 in fixed point.
+    ONE = 128
+
+    def __init__(self, screen, duration_ms, fps):
+        if numpy is None:
+            raise RuntimeError('crossfade transition needs numpy')
+        super().__init__(screen, duration_ms, fps)
+        self._size = None
+
+    def _buffers(self, size):
+        if size != self._size:
+            shape = (size[0], size[1], 3)
+            self._from = numpy.empty(shape, numpy.int16)
+            self._diff = numpy.empty(shape, numpy.int16)
+            self._tmp = numpy.empty(shape, numpy.int16)
+            self._out = numpy.empty(shape, numpy.uint8)
+            self._size = size
+
+    def prepare(self, frame_from, frame_to):
+        """Load the two frames (surfaces of the screen size) to blend."""
+        self._buffers(frame_from.get_size())
+        pixels_from = pygame.surfarray.pixels3d(frame_from)
+        pixels_to = pygame.surfarray.pixels3d(frame_to)
+        numpy.copyto(self._from, pixels_from)
+        numpy.subtract(pixels_to, self._from, out=self._diff)
+        # release the surface locks
+        del pixels_from, pixels_to
+
+    def blend(self, weight):
+        """Return frame_from + (frame_to - frame_from) * weight / ONE."""
+        numpy.multiply(self._diff, weight, out=self._tmp)
+        numpy.right_shift(self._tmp, 7, out=self._tmp)
+        numpy.add(self._tmp, self._from, out=self._tmp)
+        numpy.copyto(self._out, self._tmp, casting='unsafe')
+        return self._out
+
+    def _draw(self, weight):
+        pygame.surfarray.blit_array(self._screen, self.blend(weight))
+        display.update()
+
+    def fade(self, frame_from, frame_to, cancel=None):
+        """Crossfade the screen from frame_from to frame_to.  cancel is an
+        optional threading.Event checked before every frame.
+        """
+        self.prepare(frame_from, frame_to)
+        stats = self._run(self.steps(0, self.ONE), self._draw, cancel)
+        logger.debug('crossfade: %s', stats)
+        return stats
@@ -1,8 +1,6 @@
 # Copyright 2015 Adafruit Industries.
 # Author: Tony DiCola
 # License: GNU GPLv2, see LICENSE.txt
-import glob
-
 from .usb_drive_mounter import USBDriveMounter
 
 
@@ -28,7 +26,7 @@ class USBDriveReader:
         mounted USB drives.
         """
         self._mounter.mount_all()
-        return glob.glob(self._mount_path + '*')
+        return self._mounter.mount_points()
 
     def is_changed(self):
         """Return true if the file search paths have changed, like when a new
@@ -36,6 +34,12 @@ class USBDriveReader:
         """
         return self._mounter.poll_changes()
 
+    def fileno(self):
+        """Return a file descriptor readable when is_changed() should be
+        checked, the udev monitor socket.
+        """
+        return self._mounter.fileno()
+
     def idle_message(self):
         """Return a message to display when idle and no files are found."""
         return 'Insert USB drive with compatible movies.'
@@ -3,11 +3,15 @@
 # License: GNU GPLv2, see LICENSE.txt
 import glob
 import os
-import shutil
 import re
 import pygame
 import time
+from . import display
 from .usb_drive_mounter import USBDriveMounter
+from .copy_engine import copy_all
+from .sync_manifest import SyncManifest
+from .baselog import getlogger
+logger = getlogger(__name__)
 
 
 class USBDriveReaderCopy(object):
@@ -57,66 +61,116 @@ class USBDriveReaderCopy(object):
         self._copy_mode = config.get('copymode', 'mode')
         self._copyloader = config.getboolean('copymode', 'copyloader')
         self._password = config.get('copymode', 'password')
+        self._sample_hash = config.getboolean('copymode', 'sample_hash', fallback=True)
 
         #needs to be changed to a more generic approach to support other players
         self._extensions = '|'.join(config.get(self._config.get('video_looper', 'video_player'), 'extensions') \
                                  .translate(str.maketrans('','', ' \t\r\n.')) \
                                  .split(','))
 
+    def _drive_mode(self, path):
+        """Return (copy_mode, info) for the drive at path, None if the drive
+        doesn't hold the password file.
+        """
+        #check password
+        if not self._password == "":
+            if not self.check_file_exists('{0}/{1}'.format(path.rstrip('/'), self._password)):
+                return None
+
+        #override copymode?
+        replace = self.check_file_exists('{0}/{1}'.format(path.rstrip('/'), 'replace'))
+        add = self.check_file_exists('{0}/{1}'.format(path.rstrip('/'), 'add'))
+        if replace and not add:
+            return "replace", "(overridden)"
+        if add and not replace:
+            return "add", "(overridden)"
+        return self._copy_mode, "(from config)"
+
+    def _is_movie(self, name):
+        return name[0] != '.' and re.search('\.{0}$'.format(self._extensions), name, flags=re.IGNORECASE)
+
     def copy_files(self, paths):
         self.clear_screen()
 
-        copy_mode = self._copy_mode
-        copy_mode_info = "(from config)"
+        drives = []
         for path in paths:
             if not os.path.exists(path) or not os.path.isdir(path):
                 continue
-
-            #check password
-            if not self._password == "":
-                if not self.check_file_exists('{0}/{1}'.format(path.rstrip('/'), self._password)):
-                    continue
-
-            #override copymode?
-            if self.check_file_exists('{0}/{1}'.format(path.rstrip('/'), 'replace')):
-                copy_mode = "replace"
-                copy_mode_info = "(overridden)"
-            if self.check_file_exists('{0}/{1}'.format(path.rstrip('/'), 'add')):
-                copy_mode = "add"
-                copy_mode_info = "(overridden)"
-            if self.check_file_exists('{0}/{1}'.format(path.rstrip('/'), 'replace')) \
-                    and self.check_file_exists('{0}/{1}'.format(path.rstrip('/'), 'add')):
-                copy_mode = self._copy_mode
-                copy_mode_info = "(from config)"
-
-            #inform about copymode
-            self.draw_info_text("Mode: " + copy_mode + " " + copy_mode_info)
-
-            if copy_mode == "replace":
-                # iterate over target path for deleting:
-                for x in os.listdir(self._target_path):
-                    if x[0] is not '.' and re.search('\.{0}$'.format(self._extensions), x, flags=re.IGNORECASE):
-                        os.remove('{0}/{1}'.format(self._target_path.rstrip('/'), x))
-
-            # iterate over source path for copying:
+            mode = self._drive_mode(path)
+            if mode is not None:
+                drives.append((path, mode))
+        if not drives:
+            return
+
+        #inform about copymode
+        self.draw_info_text("Mode: " + ", ".join(sorted(set(' '.join(mode) for path, mode in drives))))
+
+        # iterate over source paths for copying, a file on several drives is
+        # copied from the last one
+        sources = {}
+        drive_of = {}
+        for index, (path, mode) in enumerate(drives):
             for x in os.listdir(path):
-                if x[0] is not '.' and re.search('\.{0}$'.format(self._extensions), x, flags=re.IGNORECASE):
-                    #copy file
-                    self.copy_with_progress('{0}/{1}'.format(path.rstrip('/'), x), '{0}/{1}'.format(self._target_path.rstrip('/'), x))
-
-            #copy loader image
-            if self._copyloader:
+                if self._is_movie(x):
+                    sources[x] = '{0}/{1}'.format(path.rstrip('/'), x)
+                    drive_of[x] = index
+        targets = [x for x in os.listdir(self._target_path) if self._is_movie(x)]
+
+        # Only what changed since the last sync is copied.  All drives are
+        # copied at once, so with several drives the files that aren't on
+        # any of them are deleted if one of them asks for replace.
+        manifest = SyncManifest(self._target_path, self._sample_hash).load()
+        replace = any(mode[0] == "replace" for path, mode in drives)
+        to_copy, to_delete = manifest.plan(sources, targets, replace)
+        logger.info('sync: %d to copy, %d to delete, %d unchanged' % (
+            len(to_copy), len(to_delete), len(sources) - len(to_copy)))
+
+        for x in to_delete:
+            manifest.forget(x)
+            try:
+                os.remove('{0}/{1}'.format(self._target_path.rstrip('/'), x))
+            except OSError as e:
+                logger.error('cannot delete %s: %s' % (x, e))
+
+        if to_copy:
+            lists = [[] for drive in drives]
+            for x in to_copy:
+                # a failed copy must not pass for a good one next time
+                manifest.forget(x)
+                lists[drive_of[x]].append((sources[x], '{0}/{1}'.format(self._target_path.rstrip('/'), x)))
+
+            # clear screen before copying
+            self.clear_screen(False)
+            failed = copy_all(lists, lambda progress: self.draw_copy_progress(progress.copied, progress.total))
+            failed = set(src for src, dst, error in failed)
+            for x in to_copy:
+                if sources[x] not in failed:
+                    try:
+                        manifest.record(x, sources[x])
+                    except OSError as e:
+                        # e.g. the drive was pulled right after the copy
+                        logger.error('cannot record %s: %s' % (x, e))
+                        manifest.forget(x)
+        try:
+            manifest.save()
+        except OSError as e:
+            logger.error('cannot save the sync manifest: %s' % e)
+
+        #copy loader image
+        if self._copyloader:
+            for path, mode in drives:
                 loader_file_path = '{0}/{1}'.format(path.rstrip('/'), 'loader.png')
                 if os.path.exists(loader_file_path):
                     self.clear_screen()
                     self.draw_info_text("Copying splashscreen file...")
                     time.sleep(2)
                     self.copy_with_progress(loader_file_path,'/home/pi/loader.png')
-                    
+
     def draw_copy_progress(self, copied, total):
-        perc = 100 * copied / total
-        assert (isinstance(perc, float))
-        assert (0. <= perc <= 100.)
+        if total <= 0:
+            return
+        # sources may grow while they're copied
+        perc = min(max(100 * copied / total, 0.), 100.)
 
         progressrect =  pygame.Rect((self.screenwidth / 2) - (self.pwidth / 2) + self.borderthickness,
                                                                 (self.screenheight / 2) - (self.pheight / 2) + self.borderthickness,
@@ -131,13 +185,13 @@ class USBDriveReaderCopy(object):
         #progress_text
         self.draw_progress_text(str(int(round(perc)))+"%")
 
-        pygame.display.update(self.borderrect)
+        display.update(self.borderrect)
 
     def draw_info_text(self, message):
         label1 = self._font.render(message, True, self._fontcolor, self._bgcolor)
         l1w, l1h = label1.get_size()
         self._screen.blit(label1, (self.screenwidth / 2 - l1w / 2, self.screenheight / 2 - l1h - self.pheight/2 - 3*self.borderthickness))
-        pygame.display.update()
+        display.update()
 
     def draw_progress_text(self, progress):
         label1 = self._font.render(progress, True, self._bgcolor, self._fgcolor)
@@ -147,64 +201,23 @@ class USBDriveReaderCopy(object):
     def clear_screen(self, full=True):
         if full:
             self._screen.fill(self._bgcolor)
-            pygame.display.update()
+            display.update()
         else:
             self._screen.fill(self._bgcolor,self.borderrect)
-            pygame.display.update(self.borderrect)
+            display.update(self.borderrect)
 
     #checks for file without and with any extension
     def check_file_exists(self,file):
         return (glob.glob(file + ".*") + glob.glob(file)) != []
 
-    def copyfile(self, src, dst, *, follow_symlinks=True):
-        """Copy data from src to dst.
-
-        If follow_symlinks is not set and src is a symbolic link, a new
-        symlink will be created instead of copying the file it points to.
-
-        """
-        if shutil._samefile(src, dst):
-            raise shutil.SameFileError("{!r} and {!r} are the same file".format(src, dst))
-
-        for fn in [src, dst]:
-            try:
-                st = os.stat(fn)
-            except OSError:
-                # File most likely does not exist
-                pass
-            else:
-                # XXX What about other special files? (sockets, devices...)
-                if shutil.stat.S_ISFIFO(st.st_mode):
-                    raise shutil.SpecialFileError("`%s` is a named pipe" % fn)
-
-        if not follow_symlinks and os.path.islink(src):
-            os.symlink(os.readlink(src), dst)
-        else:
-            size = os.stat(src).st_size
-            with open(src, 'rb') as fsrc:
-                with open(dst, 'wb') as fdst:
-                    self.copyfileobj(fsrc, fdst, callback=self.draw_copy_progress, total=size)
-        return dst
-
-    def copyfileobj(self, fsrc, fdst, callback, total, length=16 * 1024):
-        copied = 0
-        while True:
-            buf = fsrc.read(length)
-            if not buf:
-                break
-            fdst.write(buf)
-            copied += len(buf)
-            callback(copied, total=total)
-
-    def copy_with_progress(self, src, dst, *, follow_symlinks=True):
+    def copy_with_progress(self, src, dst):
         if os.path.isdir(dst):
             dst = os.path.join(dst, os.path.basename(src))
 
         # clear screen before copying
         self.clear_screen(False)
 
-        self.copyfile(src, dst, follow_symlinks=follow_symlinks)
-        # shutil.copymode(src, dst)
+        copy_all([[(src, dst)]], lambda progress: self.draw_copy_progress(progress.copied, progress.total))
         return dst
 
     def search_paths(self):
@@ -213,7 +226,7 @@ class USBDriveReaderCopy(object):
         """
         if(self._mounter.has_nodes()):
             self._mounter.mount_all()
-            self.copy_files(glob.glob(self._mount_path + '*'))
+            self.copy_files(self._mounter.mount_points())
 
         return [self._target_path]
 
@@ -226,6 +239,12 @@ class USBDriveReaderCopy(object):
         else:
             return False
 
+    def fileno(self):
+        """Return a file descriptor readable when is_changed() should be
+        checked, the udev monitor socket.
+        """
+        return self._mounter.fileno()
+
     def idle_message(self):
         """Return a message to display when idle and no files are found."""
         return 'Insert USB drive with compatible movies. Copy Mode: files will be copied to RPi.'
@@ -1,12 +1,141 @@
 # Copyright 2015 Adafruit Industries.
 # Author: Tony DiCola
 # License: GNU GPLv2, see LICENSE.txt
+import collections
+import ctypes
 import glob
+import os
+import re
 import subprocess
 import time
 
 import pyudev
 
+from .baselog import getlogger
+logger = getlogger(__name__)
+
+MOUNTINFO = '/proc/self/mountinfo'
+
+# linux/fs.h, sys/mount.h
+MS_RDONLY = 1
+MNT_DETACH = 2
+
+# A USB partition, key identifies it across replugs (see partition_key).
+Partition = collections.namedtuple('Partition', 'key node fstype')
+# A line of /proc/self/mountinfo.
+Mount = collections.namedtuple('Mount', 'mount_point source fstype')
+
+
+def _unescape(field):
+    # mountinfo escapes space, tab, newline and backslash as \ooo
+    return re.sub(r'\\([0-7]{3})', lambda m: chr(int(m.group(1), 8)), field)
+
+
+def parse_mountinfo(text):
+    """Return the list of Mounts in the content of a mountinfo file."""
+    mounts = []
+    for line in text.splitlines():
+        fields = line.split()
+        try:
+            sep = fields.index('-')
+            mounts.append(Mount(_unescape(fields[4]), _unescape(fields[sep + 2]), fields[sep + 1]))
+        except (ValueError, IndexError):
+            continue
+    return mounts
+
+
+def partition_key(properties):
+    """Return a string identifying a partition from its udev properties:
+    the filesystem UUID, else the drive's serial and partition number, else
+    the device node.
+    """
+    if properties.get('ID_FS_UUID'):
+        return 'uuid:' + properties['ID_FS_UUID']
+    if properties.get('ID_SERIAL'):
+        return 'serial:%s:%s' % (properties['ID_SERIAL'], properties.get('ID_PART_ENTRY_NUMBER', ''))
+    return 'node:' + properties.get('DEVNAME', '')
+
+
+def plan(partitions, mounts, root, owners, slots):
+    """Work out the changes that leave exactly one mount per partition under
+    root (root0, root1, ...) without touching mounts that are already right.
+
+    partitions are the attached USB Partitions, mounts the current Mounts,
+    owners maps the mount points this process mounted to the partition key
+    it mounted there (a node can be reused by another drive), slots maps
+    partition keys to the mount point number they had before, so a drive
+    keeps its name across reloads and replugs when it can.
+
+    Return (to_mount, to_unmount, slots): a list of (Partition, path) to
+    mount, a list of paths to unmount and the updated slots.
+    """
+    pattern = re.compile(re.escape(root) + r'(\d+)$')
+    by_node = {p.node: p for p in partitions}
+    slots = dict(slots)
+    keep = {}
+    to_unmount = []
+    for m in mounts:
+        match = pattern.match(m.mount_point)
+        if match is None:
+            continue
+        p = by_node.get(m.source)
+        if p is None or owners.get(m.mount_point, p.key) != p.key or p.key in keep:
+            to_unmount.append(m.mount_point)
+        else:
+            keep[p.key] = m.mount_point
+            slots[p.key] = int(match.group(1))
+
+    used = set(slots[key] for key in keep)
+    pending = [p for p in partitions if p.key not in keep]
+    to_mount = []
+    # Drives seen before get their mount point back if it's free...
+    for p in pending:
+        index = slots.get(p.key)
+        if index is not None and index not in used:
+            used.add(index)
+            to_mount.append((p, root + str(index)))
+    # ...the others the first free one.
+    mounted = set(p.key for p, path in to_mount)
+    for p in pending:
+        if p.key in mounted:
+            continue
+        index = 0
+        while index in used:
+            index += 1
+        used.add(index)
+        slots[p.key] = index
+        to_mount.append((p, root + str(index)))
+    to_mount.sort(key=lambda item: item[1])
+    return to_mount, to_unmount, slots
+
+
+def _libc():
+    return ctypes.CDLL(None, use_errno=True)
+
+
+def sys_mount(source, target, fstype, readonly):
+    """mount(2) a block device, falling back to mount(8) for the filesystems
+    the kernel can't mount itself (e.g. ntfs-3g through FUSE).
+    """
+    flags = MS_RDONLY if readonly else 0
+    if _libc().mount(source.encode(), target.encode(), fstype.encode(), flags, None) == 0:
+        return
+    err = ctypes.get_errno()
+    logger.info('mount(2) %s on %s failed (%s), trying mount(8)' % (source, target, os.strerror(err)))
+    args = ['mount']
+    if readonly:
+        args.append('-r')
+    args.extend([source, target])
+    subprocess.check_call(args)
+
+
+def sys_umount(target):
+    """Lazily unmount target, like umount -l."""
+    if _libc().umount2(target.encode(), MNT_DETACH) == 0:
+        return
+    err = ctypes.get_errno()
+    raise OSError(err, os.strerror(err), target)
+
 
 class USBDriveMounter:
     """Service for automatically mounting attached USB drives."""
@@ -21,37 +150,75 @@ class USBDriveMounter:
         self._root = root
         self._readonly = readonly
         self._context = pyudev.Context()
+        # mount point -> partition key, for the mounts made here
+        self._owners = {}
+        # partition key -> mount point number, kept for the process' lifetime
+        self._slots = {}
+
+    def _partitions(self):
+        return [Partition(partition_key(x), x.device_node, x.get('ID_FS_TYPE', 'auto'))
+                for x in self._context.list_devices(subsystem='block', DEVTYPE='partition')
+                if x.get('ID_BUS') == 'usb']
+
+    def _mounts(self):
+        with open(MOUNTINFO) as f:
+            return parse_mountinfo(f.read())
+
+    def _remove_stale_dirs(self, keep):
+        # Only empty directories: whatever is in one that isn't a mount point
+        # is on the SD card and not ours to delete.
+        for path in glob.glob(self._root + '*'):
+            if path not in keep and os.path.isdir(path) and not os.path.ismount(path):
+                try:
+                    os.rmdir(path)
+                except OSError as e:
+                    logger.warning('not removing %s: %s' % (path, e))
+
+    def _unmount(self, path):
+        logger.info('unmount %s' % path)
+        try:
+            sys_umount(path)
+        except OSError as e:
+            logger.error('unmount %s failed: %s' % (path, e))
+        self._owners.pop(path, None)
 
     def remove_all(self):
         """Unmount and remove mount points for all mounted drives."""
-        for path in glob.glob(self._root + '*'):
-            subprocess.call(['umount', '-l', path])
-            subprocess.call(['rm', '-r', path])
+        pattern = re.compile(re.escape(self._root) + r'\d+$')
+        for m in self._mounts():
+            if pattern.match(m.mount_point):
+                self._unmount(m.mount_point)
+        self._remove_stale_dirs(())
 
     def mount_all(self):
-        """Mount all attached USB drives.  Readonly is a boolean that specifies
-        if the drives should be mounted read only (defaults to true).
+        """Bring the mounts under root in line with the attached USB drive
+        partitions: mount new ones, unmount the ones that are gone and leave
+        the rest alone.  Return the list of partition device nodes.
         """
-        self.remove_all()
-        # Enumerate USB drive partitions by path like /dev/sda1, etc.
-        nodes = [x.device_node for x in self._context.list_devices(subsystem='block', DEVTYPE='partition')
-                 if 'ID_BUS' in x and x['ID_BUS'] == 'usb']
-        # Mount each drive under the mount root.
-        for i, node in enumerate(nodes):
-            path = self._root + str(i)
-            subprocess.call(['mkdir', path])
-            args = ['mount']
-            if self._readonly:
-                args.append('-r')
-            args.extend([node, path])
-            subprocess.check_call(args)
-
-        return nodes
+        partitions = self._partitions()
+        to_mount, to_unmount, self._slots = plan(partitions, self._mounts(), self._root,
+                                                 self._owners, self._slots)
+        for path in to_unmount:
+            self._unmount(path)
+        for partition, path in to_mount:
+            logger.info('mount %s (%s) on %s' % (partition.node, partition.key, path))
+            try:
+                os.makedirs(path, exist_ok=True)
+                sys_mount(partition.node, path, partition.fstype, self._readonly)
+                self._owners[path] = partition.key
+            except (OSError, subprocess.CalledProcessError) as e:
+                # one bad drive shouldn't keep the others from playing
+                logger.error('mount %s on %s failed: %s' % (partition.node, path, e))
+        self._remove_stale_dirs(self.mount_points())
+        return [p.node for p in partitions]
+
+    def mount_points(self):
+        """Return the mounted drives' paths."""
+        pattern = re.compile(re.escape(self._root) + r'\d+$')
+        return sorted(set(m.mount_point for m in self._mounts() if pattern.match(m.mount_point)))
 
     def has_nodes(self):
-        nodes = [x.device_node for x in self._context.list_devices(subsystem='block', DEVTYPE='partition')
-                 if 'ID_BUS' in x and x['ID_BUS'] == 'usb']
-        return nodes != []
+        return self._partitions() != []
 
     def start_monitor(self):
         """Initialize monitoring of USB drive changes."""
@@ -59,14 +226,18 @@ class USBDriveMounter:
         self._monitor.filter_by('block', 'partition')
         self._monitor.start()
 
+    def fileno(self):
+        """Return the udev monitor socket, readable when a drive changed."""
+        return self._monitor.fileno()
+
     def poll_changes(self):
-        """Check for changes to USB drives.  Returns true if there was a USB 
+        """Check for changes to USB drives.  Returns true if there was a USB
         drive change, otherwise false.
         """
         # Look for a drive change.
         device = self._monitor.poll(0)
         # If a USB drive changed (added/remove) remount all drives.
-        if device is not None and device['ID_BUS'] == 'usb':
+        if device is not None and device.get('ID_BUS') == 'usb':
             return True
         # Else nothing changed.
         return False
@@ -3,21 +3,53 @@ import pygame
 import re
 import subprocess
 
+from .resample import resample, SMOOTH
+from . import metrics
+from . import trace
 from .baselog import getlogger
 logger = getlogger(__name__)
 
+decode_seconds = metrics.histogram('looper_image_decode_seconds', 'Time to decode an image file.')
+ffprobe_calls = metrics.counter('looper_ffprobe_total', 'ffprobe runs to get a video duration.')
+ffprobe_seconds = metrics.histogram('looper_ffprobe_seconds', 'Time of an ffprobe run.')
+
 is_media_type = lambda filename, ext: re.search('\.{0}$'.format('|'.join(ext)), filename, flags=re.IGNORECASE) is not None
 
-def timeit(method):
-    def timed(*args, **kw):
-        ts = time.time()
-        result = method(*args, **kw)
-        te = time.time()
-        logger.info('%r  %2.2f ms' % (method.__name__, (te - ts) * 1000))
-        return result
-    return timed
+class ProgressThrottle:
+    """Wrap a progress callback taking a count so it is forwarded at most
+    once per interval seconds.  The clock is only read every check_every
+    calls, keeping the cost per call to an integer comparison.  Call
+    flush() when done so the last count is always shown.
+    """
+
+    def __init__(self, func, interval=0.25, check_every=16):
+        self._func = func
+        self._interval = interval
+        self._check_every = check_every
+        self._last_time = None
+        self._checked = 0
+        self._count = None
+        self._shown = None
+
+    def __call__(self, count):
+        self._count = count
+        if self._last_time is not None and count - self._checked < self._check_every:
+            return
+        self._checked = count
+        now = time.monotonic()
+        if self._last_time is None or now - self._last_time >= self._interval:
+            self._last_time = now
+            self._show()
+
+    def _show(self):
+        self._shown = self._count
+        self._func(self._count)
 
-def scale_image(img, image_size):
+    def flush(self):
+        if self._count is not None and self._count != self._shown:
+            self._show()
+
+def scale_image(img, image_size, method=SMOOTH):
     (bx, by) = image_size
     ix,iy = img.get_size()
     if ix > iy:
@@ -39,18 +71,61 @@ def scale_image(img, image_size):
         else:
             sy = by
 
-    return pygame.transform.scale(img, (int(sx),int(sy)))
+    return resample(img, (int(sx),int(sy)), method)
+
+# How the screen around an image that doesn't fill it is drawn, see
+# [sdl_image] fill_mode.
+FILL_COLOR = 'color'
+FILL_BLUR = 'blur'
+
+# Width of the thumbnail the blurred background is upscaled from, the
+# upscale does most of the blurring.
+AMBIENT_WIDTH = 32
+# Brightness (out of 255) the blurred background is multiplied with.
+AMBIENT_BRIGHTNESS = 90
+
+def ambient_background(img, screen_size):
+    """Return a screen sized, blurred and darkened copy of img, cropped to
+    cover the whole screen, to fill the bars around img.
+    """
+    sw, sh = screen_size
+    iw, ih = img.get_size()
+    scale = max(sw / float(iw), sh / float(ih))
+    cw, ch = min(iw, int(round(sw / scale))), min(ih, int(round(sh / scale)))
+    crop = img.subsurface(pygame.Rect((iw - cw) // 2, (ih - ch) // 2, cw, ch))
+    tiny = pygame.transform.smoothscale(crop, (AMBIENT_WIDTH, max(int(round(AMBIENT_WIDTH * sh / float(sw))), 1)))
+    if hasattr(pygame.transform, 'box_blur'):  # pygame >= 2.2
+        tiny = pygame.transform.box_blur(tiny, 1)
+    tiny.fill((AMBIENT_BRIGHTNESS,) * 3, special_flags=pygame.BLEND_MULT)
+    return pygame.transform.smoothscale(tiny, screen_size)
 
-def load_image_fit_screen(imgpath):
+def load_image_fit_screen(imgpath, fill=FILL_COLOR, method=SMOOTH):
+    """Load imgpath scaled to fit the screen with the resample method (see
+    resample.METHODS).  With fill=FILL_BLUR the result
+    is a full screen frame with the image centered on its blurred copy, so
+    drawing it costs the same whatever the image's aspect ratio.
+    """
     screen_size = (pygame.display.Info().current_w, pygame.display.Info().current_h)
-    fullimg = pygame.image.load(imgpath)
-    img = scale_image(fullimg.convert(), screen_size)
+    with decode_seconds.time(), trace.span('decode'):
+        fullimg = pygame.image.load(imgpath)
+    img = scale_image(fullimg.convert(), screen_size, method)
+    if fill == FILL_BLUR and img.get_size() != screen_size:
+        frame = ambient_background(img, screen_size)
+        frame.blit(img, img.get_rect(center=frame.get_rect().center))
+        img = frame
     return img
 
 def is_short_video(videpath):
     args = ['ffprobe', '-v', 'error', '-show_entries', 'format=duration', '-of', 'default=noprint_wrappers=1:nokey=1', videpath]
-    p = subprocess.Popen(args , stdout=subprocess.PIPE, stderr=subprocess.PIPE, universal_newlines=True)
-    out, err = p.communicate()
+    ffprobe_calls.inc()
+    with ffprobe_seconds.time(), trace.span('probe'):
+        try:
+            p = subprocess.Popen(args , stdout=subprocess.PIPE, stderr=subprocess.PIPE, universal_newlines=True)
+        except OSError as e:
+            # can't tell without ffprobe, let the player try
+            logger.warning('ffprobe %s: %s' % (videpath, e))
+            return False
+        out, err = p.communicate()
     try:
         duration = float(out.strip())
     except:
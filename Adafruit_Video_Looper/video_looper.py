@@ -17,12 +17,32 @@ from watchdog.observers import Observer
 from watchdog import events
 
 from .model import CacheFilePlayList, WatchDogPlaylist, ResourceLoader, LOAD_PENDING, LOAD_SUCC, LOAD_FAIL
+from . import display
+from . import metrics
+from . import trace
+from .eventloop import EventLoop
+from .osd import OSD
+from .poster import PosterCache, MAX_POSTERS
+from .utils import ProgressThrottle
 from .alsa_config import parse_hw_device
 from .playlist_builders import build_playlist_m3u
 
+from . import baselog
 from .baselog import getlogger
 logger = getlogger(__name__)
 
+# Seconds between is_changed() checks for file readers that don't expose a
+# file descriptor to wait on.
+READER_POLL_SEC = 1.0
+# Seconds between is_playing() checks for players that don't expose one.
+PLAYER_POLL_SEC = 0.1
+# Seconds between idle screen refreshes (reader status may change).
+IDLE_REFRESH_SEC = 1.0
+
+preloads = metrics.counter('looper_preload_total',
+                           'Assets due to play, by whether the preloader had them ready.', ['result'])
+asset_gap = metrics.histogram('looper_asset_gap_seconds', 'Time from the end of an asset to the start of the next.')
+
 # Basic video looper architecure:
 #
 # - VideoLooper class contains all the main logic for running the looper program.
@@ -46,6 +66,11 @@ logger = getlogger(__name__)
 # - Future file readers and video players can be provided and referenced in the
 #   config to extend the video player use to read from different file sources
 #   or use different video players.
+#
+# - Everything runs from a single EventLoop.  File readers and players can
+#   optionally define a fileno() method returning a descriptor that becomes
+#   readable when the search paths may have changed, respectively when the
+#   current asset finished playing.  Those without it are polled on a timer.
 class VideoLooper(events.FileSystemEventHandler):
 
     def __init__(self, config_path):
@@ -56,6 +81,7 @@ class VideoLooper(events.FileSystemEventHandler):
         self._config = configparser.ConfigParser()
         if len(self._config.read(config_path)) == 0:
             raise RuntimeError('Failed to find configuration file at {0}, is the application properly installed?'.format(config_path))
+        baselog.configure(self._config)
         self._console_output = self._config.getboolean('video_looper', 'console_output')
         # Load other configuration values.
         self._osd = self._config.getboolean('video_looper', 'osd')
@@ -77,18 +103,17 @@ class VideoLooper(events.FileSystemEventHandler):
                                              .translate(str.maketrans('','', ','))
                                              .split()))
         # Initialize pygame and display a blank screen.
-        os.environ["SDL_FBDEV"] = self._sdl_device
-        pygame.display.init()
+        self._screen = display.init(self._config)
         pygame.font.init()
-        pygame.mouse.set_visible(False)
-        self._screen = pygame.display.set_mode((0,0), pygame.FULLSCREEN | pygame.NOFRAME)
-        self._size = (pygame.display.Info().current_w, pygame.display.Info().current_h)
+        self._size = self._screen.get_size()
+        self._overlay = OSD(self._screen, self._fgcolor, self._bgcolor)
         self._bgimage = self._load_bgimage()
         self._qrimage = self._load_qrimage()
         self._blank_screen()
         # Load configured video player and file reader modules.
         self._player = self._load_player()
         self._reader = self._load_file_reader()
+        self._reader_fd = None
         # Load ALSA hardware configuration.
         self._alsa_hw_device = parse_hw_device(self._config.get('alsa', 'hw_device'))
         self._alsa_hw_vol_control = self._config.get('alsa', 'hw_vol_control')
@@ -111,8 +136,29 @@ class VideoLooper(events.FileSystemEventHandler):
 
         self._preload = (self._config.getint('video_looper', 'preload') > 0)
         self._preloader = None
+        # Poster frames of videos, extracted by the preloader and shown while
+        # the player starts.
+        poster_path = self._config.get('vlc', 'poster_cache_path', fallback='').strip()
+        poster_count = self._config.getint('vlc', 'poster_cache_size', fallback=MAX_POSTERS)
+        self._posters = PosterCache(poster_path, self._size, poster_count) \
+            if poster_path and self._preload else None
         self._force_reload = False
 
+        self._loop = EventLoop()
+        self._playlist = None
+        self._asset = None
+        self._player_fd = None
+        self._player_timer = None
+        self._wait_timer = None
+        self._countdown_timer = None
+        self._idle_timer = None
+        # asset the preloader was still loading when it was due to play
+        self._waiting_for = None
+        # when the last asset ended, for the gap to the next one
+        self._player_exited = None
+        self._metrics = metrics.configure(self._config)
+        self._trace_path = trace.configure(self._config)
+
         # start keyboard handler thread:
         # Event handling for key press, if keyboard control is enabled
         if self._keyboard_control:
@@ -129,19 +175,24 @@ class VideoLooper(events.FileSystemEventHandler):
                 self.observer.start()
 
     def on_modified(self, event):
-        logger.info('watchdog modified %s' % event.src_path)
+        logger.debug('watchdog modified %s', event.src_path)
         if event.src_path == self._config.get('video_looper', 'qrimage'):
-            self._qrimage = self._load_qrimage()
+            self._loop.call_soon_threadsafe(self._reload_qrimage)
 
     def on_created(self, event):
-        logger.info('watchdog created %s' % event.src_path)
+        logger.debug('watchdog created %s', event.src_path)
         if event.src_path == self._config.get('video_looper', 'qrimage'):
-            self._qrimage = self._load_qrimage()
+            self._loop.call_soon_threadsafe(self._reload_qrimage)
+
+    def _reload_qrimage(self):
+        self._qrimage = self._load_qrimage()
+        if self._idle_timer is not None:
+            self._idle_message()
 
     def _print(self, message):
         """Print message to standard output if console output is enabled."""
         if self._console_output:
-            logger.info(message)
+            logger.info(message, stacklevel=2)
 
     def _load_player(self):
         """Load the configured video player and return an instance of it."""
@@ -270,7 +321,11 @@ class VideoLooper(events.FileSystemEventHandler):
             if self._force_rescan_playlist:
                 playlist.reload()
 
-        playlist.load(lambda c: self.display_message('loading %d assets...' % c))
+        # Showing progress costs a render and a display update, don't do it
+        # for every file found.
+        progress = ProgressThrottle(lambda c: self.display_message('loading %d assets...' % c))
+        playlist.load(progress)
+        progress.flush()
         return playlist
 
     def _blank_screen(self):
@@ -279,7 +334,8 @@ class VideoLooper(events.FileSystemEventHandler):
         if self._bgimage is not None:
             rect = self._bgimage.get_rect()
             self._screen.blit(self._bgimage, rect)
-        pygame.display.update()
+        display.update()
+        self._overlay.invalidate()
 
     def _render_text(self, message, font=None):
         """Draw the provided message and return as pygame surface of it rendered
@@ -288,36 +344,45 @@ class VideoLooper(events.FileSystemEventHandler):
         # Default to small font if not provided.
         if font is None:
             font = self._small_font
-        return font.render(message, True, self._fgcolor, self._bgcolor)
+        return self._overlay.render_text(message, font)
 
     def _animate_countdown(self, playlist):
         """Print text with the number of loaded media assets and a quick countdown
-        message if the on screen display is enabled.
+        message if the on screen display is enabled, then start playback.
         """
         # Print message to console with number of media assets in playlist.
         message = 'Found {0} asset{1}.'.format(playlist.length(), 
             's' if playlist.length() >= 2 else '')
         self._print(message)
-        # Do nothing else if the OSD is turned off.
+        # Nothing to animate if the OSD is turned off.
         if not self._osd:
+            self._countdown_step(None, 0)
             return
         # Draw message with number of assets loaded and animate countdown.
         # First render text that doesn't change and get static dimensions.
         label1 = self._render_text(message)
+        self._countdown_step(label1, self._countdown_time)
+
+    def _countdown_step(self, label1, i):
+        """Draw one frame of the countdown and schedule the next one a second
+        later, blank the screen and start playing when it reaches zero.
+        """
+        self._countdown_timer = None
+        if i <= 0:
+            self._blank_screen()
+            self._play_next()
+            return
         l1w, l1h = label1.get_size()
         sw, sh = self._screen.get_size()
-        for i in range(self._countdown_time, 0, -1):
-            # Each iteration of the countdown rendering changing text.
-            label2 = self._render_text(str(i), self._big_font)
-            l2w, l2h = label2.get_size()
-            # Clear screen and draw text with line1 above line2 and all
-            # centered horizontally and vertically.
-            self._screen.fill(self._bgcolor)
-            self._screen.blit(label1, (sw/2-l1w/2, sh/2-l2h/2-l1h))
-            self._screen.blit(label2, (sw/2-l2w/2, sh/2-l2h/2))
-            pygame.display.update()
-            # Pause for a second between each frame.
-            time.sleep(1)
+        # Each iteration of the countdown rendering changing text.
+        label2 = self._render_text(str(i), self._big_font)
+        l2w, l2h = label2.get_size()
+        # Draw text with line1 above line2 and all centered horizontally and
+        # vertically, only the number gets redrawn.
+        self._overlay.show([(label1, (sw/2-l1w/2, sh/2-l2h/2-l1h)),
+                            (label2, (sw/2-l2w/2, sh/2-l2h/2))])
+        # Pause for a second between each frame.
+        self._countdown_timer = self._loop.call_later(1, self._countdown_step, label1, i - 1)
 
     def _idle_message(self):
         """Print idle message from file reader."""
@@ -326,33 +391,15 @@ class VideoLooper(events.FileSystemEventHandler):
         # Do nothing else if the OSD is turned off.
         if not self._osd:
             return
-        # Display idle message in center of screen.
-        label = self._render_text(message)
-        lw, lh = label.get_size()
-        sw, sh = self._screen.get_size()
-        self._screen.fill(self._bgcolor)
-
+        # Display idle message in center of screen, the keyboard help and
+        # QRCode below it.  Redrawn only when any of them changed.
+        labels = [self._render_text(message)]
         # If keyboard control is enabled, display message about it
-        l2w = l2h = 0
         if self._keyboard_control:
-            label2 = self._render_text('Press "r" to reload, or press "ESC" then "Ctrl+Alt+F2" to quit to terminal')
-            l2w, l2h = label2.get_size()
-        iw = ih = 0
+            labels.append(self._render_text('Press "r" to reload, or press "ESC" then "Ctrl+Alt+F2" to quit to terminal'))
         if self._qrimage is not None:
-            iw, ih = self._qrimage.get_rect().size
-
-        gap = 50
-        total_h = lh + l2h + ih + 2 * gap
-        if total_h > sh:
-            return
-        start_h = sh/2 - total_h/2
-        self._screen.blit(label, (sw/2-lw/2, start_h))
-        if self._keyboard_control:
-            self._screen.blit(label2, (sw/2-l2w/2, start_h + lh + gap))
-        if self._qrimage is not None:
-            self._screen.blit(self._qrimage, (sw/2-iw/2, start_h + lh + 2*gap + l2h))
-
-        pygame.display.update()
+            labels.append(self._qrimage)
+        self._overlay.show_stack(labels, 50)
 
     def display_message(self,message):
         self._print(message)
@@ -360,12 +407,7 @@ class VideoLooper(events.FileSystemEventHandler):
         if not self._osd:
             return
         # Display idle message in center of screen.
-        label = self._render_text(message)
-        lw, lh = label.get_size()
-        sw, sh = self._screen.get_size()
-        self._screen.fill(self._bgcolor)
-        self._screen.blit(label, (sw/2-lw/2, sh/2-lh/2))
-        pygame.display.update()
+        self._overlay.show_centered(self._render_text(message))
 
     def _prepare_to_run_playlist(self, playlist):
         """Display messages when a new playlist is loaded."""
@@ -375,9 +417,8 @@ class VideoLooper(events.FileSystemEventHandler):
         self._firstStart = True
         if playlist.length() > 0:
             self._animate_countdown(playlist)
-            self._blank_screen()
         else:
-            self._idle_message()
+            self._update_idle()
 
     def _set_hardware_volume(self):
         if self._alsa_hw_vol != None:
@@ -394,143 +435,315 @@ class VideoLooper(events.FileSystemEventHandler):
             subprocess.check_call(cmd)
             
     def _handle_keyboard_shortcuts(self):
+        """Keyboard thread, pygame has no descriptor to wait on so block in
+        pygame.event.wait here and hand key presses over to the event loop.
+        """
         while self._running:
             event = pygame.event.wait()
             if event.type == pygame.KEYDOWN:
-                # If pressed key is ESC quit program
-                if event.key == pygame.K_ESCAPE:
-                    self._print("ESC was pressed. quitting...")
-                    self.quit()
-                if event.key == pygame.K_r:
-                    self._print("r was pressed. reload...")
-                    self._force_reload = True
-                if event.key == pygame.K_k:
-                    self._print("k was pressed. skipping...")
-                    self._player.stop(3)
-                if event.key == pygame.K_s:
-                    if self._playbackStopped:
-                        self._print("s was pressed. starting...")
-                        self._playbackStopped = False
-                    else:
-                        self._print("s was pressed. stopping...")
-                        self._playbackStopped = True
-                        self._player.stop(3)
+                self._loop.call_soon_threadsafe(self._handle_key, event.key)
+
+    def _handle_key(self, key):
+        # If pressed key is ESC quit program
+        if key == pygame.K_ESCAPE:
+            self._print("ESC was pressed. quitting...")
+            self.quit()
+        if key == pygame.K_r:
+            self._print("r was pressed. reload...")
+            self._force_reload = True
+            self._check_reader()
+        if key == pygame.K_k:
+            self._print("k was pressed. skipping...")
+            self._stop_player(3)
+            self._play_next()
+        if key == pygame.K_s:
+            if self._playbackStopped:
+                self._print("s was pressed. starting...")
+                self._playbackStopped = False
+                self._play_next()
+            else:
+                self._print("s was pressed. stopping...")
+                self._playbackStopped = True
+                self._stop_player(3)
+                if self._asset is not None:
+                    self._asset.clear_playcount() # so resume next time
+                self._update_idle()
 
     def _load_playlist(self):
         if self._preload:
-            self._preloader = ResourceLoader(self._build_playlist(), self._config)
+            self._preloader = ResourceLoader(self._build_playlist(), self._config,
+                on_loaded=lambda asset: self._loop.call_soon_threadsafe(self._play_next),
+                posters=self._posters)
             playlist = self._preloader
         else:
             playlist = self._build_playlist()
-        self._prepare_to_run_playlist(playlist)
         return playlist
 
+    def _start_playlist(self):
+        """Load the playlist, queue up its first asset (so preloading overlaps
+        the countdown) and show the countdown or idle screen.
+        """
+        if self._playlist is not None:
+            # writes out the cache file edits it still holds back
+            self._playlist.stop()
+        self._playlist = self._load_playlist()
+        self._asset = self._playlist.get_next(self._is_random)
+        self._prepare_to_run_playlist(self._playlist)
+
+    def _watch_player(self):
+        """Get called back when the asset that just started finished."""
+        fd = self._player.fileno() if hasattr(self._player, 'fileno') else None
+        if fd is not None:
+            self._player_fd = fd
+            self._loop.add_reader(fd, self._on_player_exit)
+        else:
+            self._player_timer = self._loop.call_later(PLAYER_POLL_SEC, self._on_player_exit)
+
+    def _unwatch_player(self):
+        # Must happen before the player closes (and possibly reuses) the fd.
+        if self._player_fd is not None:
+            self._loop.remove_reader(self._player_fd)
+            self._player_fd = None
+        if self._player_timer is not None:
+            self._player_timer.cancel()
+            self._player_timer = None
+
+    def _stop_player(self, block_timeout_sec=0):
+        self._unwatch_player()
+        if self._wait_timer is not None:
+            self._wait_timer.cancel()
+            self._wait_timer = None
+        self._player.stop(block_timeout_sec)
+
+    def _on_player_exit(self):
+        self._unwatch_player()
+        if self._player.is_playing():
+            self._watch_player()
+        else:
+            self._player_exited = time.monotonic()
+            self._play_next()
+
+    def _play_next(self):
+        """Load and play a new asset if nothing is playing.  Called whenever
+        something may have changed, does nothing when there is nothing to do.
+        """
+        if self._player_fd is not None or self._player_timer is not None \
+                or self._wait_timer is not None or self._countdown_timer is not None \
+                or self._playbackStopped or self._playlist is None:
+            return
+        if self._playlist.length() == 0:
+            self._update_idle()
+            return
+        if self._player.is_playing():
+            self._watch_player()
+            return
+
+        asset = self._asset
+        if asset is None: #just to avoid errors
+            return
+
+        if asset.playcount >= asset.repeats:
+            asset.clear_playcount()
+            asset = self._playlist.get_next(self._is_random)
+        elif self._player.can_loop_count() and asset.playcount > 0:
+            asset.clear_playcount()
+            asset = self._playlist.get_next(self._is_random)
+        self._asset = asset
+        if asset is None:
+            return
+
+        if self._preloader is not None:
+            ld = self._preloader.loading_status(asset)
+            if ld == LOAD_PENDING:
+                if self._waiting_for is not asset:
+                    self._waiting_for = asset
+                    preloads.labels('miss').inc()
+                # on_loaded calls us back when it's ready
+                return
+            waited, self._waiting_for = self._waiting_for is asset, None
+            if ld != LOAD_SUCC:
+                preloads.labels('failed').inc()
+                logger.warning('load failure %s, move to next' % asset)
+                self._asset = self._playlist.get_next(self._is_random)
+                logger.warning('move to next %s' % self._asset)
+                self._loop.call_soon(self._play_next)
+                return
+            if not waited:
+                preloads.labels('hit').inc()
+
+        asset.was_played()
+
+        if self._wait_time > 0 and not self._firstStart:
+            self._print('Waiting for: {0} seconds'.format(self._wait_time))
+            self._wait_timer = self._loop.call_later(self._wait_time, self._start_asset, asset)
+        else:
+            self._start_asset(asset)
+
+    def _start_asset(self, asset):
+        self._wait_timer = None
+        self._firstStart = False
+        playlist = self._playlist
+
+        #generating infotext
+        if self._player.can_loop_count():
+            infotext = '{0} time{1} (player counts loops)'.format(asset.repeats, "s" if asset.repeats>1 else "")
+        else:
+            infotext = '{0}/{1}'.format(asset.playcount, asset.repeats)
+        if playlist.length()==1:
+            infotext = '(endless loop)'
+
+        # Start playing the first available asset.
+        self._print('Playing asset: {0} {1}'.format(asset, infotext))
+        # todo: maybe clear screen to black so that background (image/color) is not visible for videos with a resolution that is < screen resolution
+        self._unwatch_player()
+        self._player.play(asset, loop=-1 if playlist.length()==1 else None, vol = self._sound_vol)
+        if self._player_exited is not None:
+            asset_gap.observe(time.monotonic() - self._player_exited)
+            self._player_exited = None
+        self._overlay.invalidate()
+        self._watch_player()
+
+    def _update_idle(self):
+        """Show the idle screen while the playlist is empty or playback is
+        stopped, and refresh it periodically until that's no longer the case.
+        """
+        if self._idle_timer is not None:
+            self._idle_timer.cancel()
+            self._idle_timer = None
+        if self._playlist is None:
+            return
+        #print('empty: %s, playlist len: %d' %(self._empty, playlist.length()))
+        if self._playlist.length() == 0:
+            self._stop_player(3)
+            self._idle_message()
+            self._empty = True
+        elif self._empty:
+            self._empty = False
+            self._force_reload = True
+            self._check_reader()
+            return
+        elif self._playbackStopped:
+            self._idle_message()
+        else:
+            return
+        self._idle_timer = self._loop.call_later(IDLE_REFRESH_SEC, self._update_idle)
+
+    def _check_reader(self):
+        """Check for changes in the file search path (like USB drives added)
+        and rebuild the playlist, or patch it in place when the reader
+        reports exactly which files were added and removed.
+        """
+        changed = self._reader.is_changed()
+        if changed and not self._force_reload and self._patch_playlist():
+            return
+        if hasattr(self._reader, 'pop_changes'):
+            self._reader.pop_changes()  # the rebuild sees them
+        if changed or self._force_reload:
+            self._print("need reload, stopping player")
+            if self._countdown_timer is not None:
+                self._countdown_timer.cancel()
+                self._countdown_timer = None
+            self._stop_player(3)  # Up to 3 second delay waiting for old 
+                                  # player to stop.
+            self._print("player stopped")
+            # Rebuild playlist and show countdown again (if OSD enabled).
+            self._set_hardware_volume()
+            if self._force_reload:
+                self._force_rescan_playlist = True
+            self._force_reload = False
+            self._playbackStopped = False
+            self._empty = False
+            if self._idle_timer is not None:
+                self._idle_timer.cancel()
+                self._idle_timer = None
+            if self._playlist is not None:
+                self._playlist.stop()
+            self._start_playlist()
+            self._force_rescan_playlist = False
+
+    def _patch_playlist(self):
+        """Apply the reader's changes to the playlist, return false if it
+        has to be rebuilt instead.
+        """
+        if self._playlist is None or self._countdown_timer is not None \
+                or not hasattr(self._reader, 'pop_changes'):
+            return False
+        added, removed = self._reader.pop_changes()
+        # a single asset is played in an endless loop, it never exits by itself
+        looping = self._playlist.length() == 1 and self._player.is_playing()
+        if not self._playlist.patch(added, removed):
+            return False
+        logger.info('playlist patched: %d added, %d removed, %d assets' % (
+            len(added), len(removed), self._playlist.length()))
+        if self._asset is not None and self._asset.filename in removed:
+            self._stop_player(3)
+            self._asset = self._playlist.get_next(self._is_random)
+        elif self._asset is None:
+            self._asset = self._playlist.get_next(self._is_random)
+        elif looping and self._playlist.length() > 1:
+            # end the loop so the new assets get their turn
+            self._stop_player(3)
+        if self._playlist.length() == 0:
+            self._update_idle()
+        elif self._empty:
+            self._empty = False
+            if self._idle_timer is not None:
+                self._idle_timer.cancel()
+                self._idle_timer = None
+        self._play_next()
+        return True
+
+    def _poll_reader(self):
+        if self._reader_fd is None or self._reader.polling():
+            self._check_reader()
+        self._loop.call_later(READER_POLL_SEC, self._poll_reader)
+
     def run(self):
         """Main program loop.  Will never return!"""
         self._set_hardware_volume()
+        # Wake up on file reader changes, either through its descriptor or
+        # by polling it.
+        fd = self._reader_fd = self._reader.fileno() if hasattr(self._reader, 'fileno') else None
+        if fd is not None:
+            self._loop.add_reader(fd, self._check_reader)
+        # readers with a descriptor may still have to poll some of it
+        if fd is None or hasattr(self._reader, 'polling'):
+            self._loop.call_later(READER_POLL_SEC, self._poll_reader)
         # Get playlist of media assets to play from file reader.
-        playlist = self._load_playlist()
-        asset = playlist.get_next(self._is_random)
+        self._start_playlist()
         # Main loop to play videos in the playlist and listen for file changes.
-        while self._running:
-            #self._blank_screen()
-            # Load and play a new asset if nothing is playing.
-            if not self._player.is_playing() and not self._playbackStopped:
-                if asset is not None: #just to avoid errors
-
-                    if asset.playcount >= asset.repeats:
-                        asset.clear_playcount()
-                        asset = playlist.get_next(self._is_random)
-                    elif self._player.can_loop_count() and asset.playcount > 0:
-                        asset.clear_playcount()
-                        asset = playlist.get_next(self._is_random)
-
-                    if self._preloader is None:
-                        ready = True
-                    else:
-                        ld = self._preloader.loading_status(asset)
-                        if ld == LOAD_SUCC:
-                            ready = True
-                        elif ld == LOAD_PENDING:
-                            ready = False
-                        else:
-                            logger.warning('load failure %s, move to next' % asset)
-                            ready = False
-                            asset = playlist.get_next(self._is_random)
-                            logger.warning('move to next %s' % asset)
-
-                    if ready:
-                        asset.was_played()
-
-                        if self._wait_time > 0 and not self._firstStart:
-                            self._print('Waiting for: {0} seconds'.format(self._wait_time))
-                            time.sleep(self._wait_time)
-                        self._firstStart = False
-
-                        #generating infotext
-                        if self._player.can_loop_count():
-                            infotext = '{0} time{1} (player counts loops)'.format(asset.repeats, "s" if asset.repeats>1 else "")
-                        else:
-                            infotext = '{0}/{1}'.format(asset.playcount, asset.repeats)
-                        if playlist.length()==1:
-                            infotext = '(endless loop)'
-
-                        # Start playing the first available asset.
-                        self._print('Playing asset: {0} {1}'.format(asset, infotext))
-                        # todo: maybe clear screen to black so that background (image/color) is not visible for videos with a resolution that is < screen resolution
-                        self._player.play(asset, loop=-1 if playlist.length()==1 else None, vol = self._sound_vol)
-
-            #print('empty: %s, playlist len: %d' %(self._empty, playlist.length()))
-            if playlist.length() == 0:
-                self._player.stop(3)
-                self._idle_message()
-                self._empty = True
-            elif self._empty:
-                self._empty = False
-                self._force_reload = True
-
-            # Check for changes in the file search path (like USB drives added)
-            # and rebuild the playlist.
-            if (self._reader.is_changed() or self._force_reload):
-                self._print("need reload, stopping player")
-                self._player.stop(3)  # Up to 3 second delay waiting for old 
-                                      # player to stop.
-                self._print("player stopped")
-                # Rebuild playlist and show countdown again (if OSD enabled).
-                self._set_hardware_volume()
-                if self._force_reload:
-                    self._force_rescan_playlist = True
-                playlist = self._load_playlist()
-                asset = playlist.get_next(self._is_random)
-                self._force_reload = False
-                self._force_rescan_playlist = False
-                self._playbackStopped = False
-
-            if self._playbackStopped:
-                if asset is not None:
-                    asset.clear_playcount() # so resume next time
-                self._idle_message()
-
-            # Give the CPU some time to do other tasks. low values increase "responsiveness to changes" and reduce the pause between files
-            # but increase CPU usage
-            # since keyboard commands are handled in a seperate thread this sleeptime mostly influences the pause between files
-                        
-            time.sleep(0.1)
+        self._loop.run()
 
     def quit(self):
         """Shut down the program"""
         self._print("quitting Video Looper")
         self._running = False
+        self._loop.stop()
         if self._player is not None:
             self._player.stop()
-        if self._preloader is not None:
-            self._preloader.stop()
+        if self._playlist is not None:
+            self._playlist.stop()
+        self._metrics.stop()
         pygame.quit()
+        display.quit()
         quit()
 
     def signal_reload(self, signal, frame):
         logger.info("reloading on SIGUSR1")
         self._force_reload = True
+        self._loop.call_soon_threadsafe(self._check_reader)
+
+    def signal_dump_trace(self, signal, frame):
+        self._loop.call_soon_threadsafe(self._dump_trace)
+
+    def _dump_trace(self):
+        if not trace.is_enabled():
+            logger.warning('tracing is disabled, see [trace] in the config')
+            return
+        try:
+            trace.dump(self._trace_path)
+        except OSError as e:
+            logger.error('cannot dump trace to %s: %s' % (self._trace_path, e))
 
     def signal_quit(self, signal, frame):
         """Shut down the program, meant to by called by signal handler."""
@@ -551,5 +764,6 @@ if __name__ == '__main__':
     signal.signal(signal.SIGTERM, videolooper.signal_quit)
     signal.signal(signal.SIGINT, videolooper.signal_quit)
     signal.signal(signal.SIGUSR1, videolooper.signal_reload)
+    signal.signal(signal.SIGUSR2, videolooper.signal_dump_trace)
     # Run the main loop.
     videolooper.run()
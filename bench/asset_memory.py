@@ -0,0 +1,74 @@
+"""Memory taken by a playlist's MediaAssets, old layout against the current one.
+
+    python -m bench.asset_memory --sizes 10000,100000,1000000
+
+Filenames look like a lomorage share: a few hundred files per month
+directory.  Measured with tracemalloc, so the figures are what the assets
+and their strings allocate, not the process RSS.
+"""
+import argparse
+import gc
+import os
+import re
+import time
+import tracemalloc
+
+from Adafruit_Video_Looper.model import getMediaAsset
+
+
+class DictAsset:
+    """MediaAsset as it was: a plain object with the full path and the
+    title and repeats worked out up front.
+    """
+
+    def __init__(self, filename, title=None, repeats=1):
+        self.filename = filename
+        self.title = title
+        self.repeats = int(repeats)
+        self.playcount = 0
+        self.preload_resource = None
+        self.loading_status = 0
+
+
+def get_dict_asset(filepath):
+    filename = os.path.basename(filepath)
+    repeatsetting = re.search('_repeat_([0-9]*)x', filename, flags=re.IGNORECASE)
+    repeat = repeatsetting.group(1) if repeatsetting is not None else 1
+    basename, extension = os.path.splitext(filename)
+    return DictAsset(filepath, basename, repeat)
+
+
+def filenames(count, per_dir=300):
+    for i in range(count):
+        d = i // per_dir
+        # built fresh like lines read from the cache file
+        yield '/opt/lomorage/mnt/Photos/share/%s/%d/%02d/IMG_%08d.JPG' % (
+            ('alice', 'bob')[d % 2], 2000 + d // 12, d % 12 + 1, i)
+
+
+def measure(make, count):
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    assets = [make(f) for f in filenames(count)]
+    elapsed = time.perf_counter() - start
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del assets
+    return size, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--sizes', default='10000,100000,1000000')
+    args = parser.parse_args()
+
+    print('%9s %-12s %10s %10s %9s' % ('assets', 'layout', 'MB', 'B/asset', 'build s'))
+    for count in [int(n) for n in args.sizes.split(',')]:
+        for name, make in (('dict', get_dict_asset), ('slots', getMediaAsset)):
+            size, elapsed = measure(make, count)
+            print('%9d %-12s %10.1f %10.1f %9.2f' % (count, name, size / 1e6, size / count, elapsed))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,85 @@
+"""Copy throughput of copy mode's old and new copy paths next to dd.
+
+    SDL_VIDEODRIVER=dummy python -m bench.copy --size-mb 512 --dir /media/usb
+
+The source file is created in --dir and read back from the page cache, so
+this measures the overhead of each copy path rather than the medium.
+"""
+import argparse
+import os
+import shutil
+import subprocess
+import tempfile
+import time
+
+import pygame
+
+from Adafruit_Video_Looper.copy_engine import copy_all
+
+
+def old_copy(src, dst, callback, length=16 * 1024):
+    """The loop copy mode used: 16 KB read/write, progress after each."""
+    total = os.path.getsize(src)
+    copied = 0
+    with open(src, 'rb') as fsrc, open(dst, 'wb') as fdst:
+        while True:
+            buf = fsrc.read(length)
+            if not buf:
+                break
+            fdst.write(buf)
+            copied += len(buf)
+            callback(copied, total)
+
+
+def timed(func):
+    start = time.perf_counter()
+    func()
+    os.sync()
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--size-mb', type=int, default=256)
+    parser.add_argument('--dir', default=None)
+    args = parser.parse_args()
+
+    os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+    pygame.display.init()
+    pygame.font.init()
+    screen = pygame.display.set_mode((1280, 720))
+    font = pygame.font.Font(None, 40)
+
+    def draw(copied, total):
+        # what draw_copy_progress costs: a label and a display update
+        label = font.render('%d%%' % (100 * copied // total), True, (255, 255, 255), (0, 0, 0))
+        screen.blit(label, (0, 0))
+        pygame.display.update(label.get_rect())
+
+    tmp = tempfile.mkdtemp(dir=args.dir)
+    try:
+        src = os.path.join(tmp, 'src.bin')
+        with open(src, 'wb') as f:
+            block = os.urandom(1024 * 1024)
+            for i in range(args.size_mb):
+                f.write(block)
+        dst = os.path.join(tmp, 'dst.bin')
+        size = args.size_mb * 1024 * 1024
+
+        results = [
+            ('old loop, no drawing', timed(lambda: old_copy(src, dst, lambda c, t: None))),
+            ('old loop + progress', timed(lambda: old_copy(src, dst, draw))),
+            ('copy_engine', timed(lambda: copy_all([[(src, dst)]], lambda p: draw(p.copied, p.total)))),
+        ]
+        if shutil.which('dd'):
+            results.append(('dd bs=8M', timed(lambda: subprocess.check_call(
+                ['dd', 'if=' + src, 'of=' + dst, 'bs=8M'], stderr=subprocess.DEVNULL))))
+        for name, elapsed in results:
+            print('%-22s %7.1f ms %8.1f MB/s' % (name, elapsed * 1000, size / elapsed / 1e6))
+    finally:
+        shutil.rmtree(tmp)
+        pygame.quit()
+
+
+if __name__ == '__main__':
+    main()
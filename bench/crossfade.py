@@ -0,0 +1,55 @@
+"""Milliseconds per blended crossfade frame at common screen sizes.
+
+    SDL_VIDEODRIVER=dummy python -m bench.crossfade
+"""
+import argparse
+import os
+import time
+
+import pygame
+
+from Adafruit_Video_Looper.transition import CrossFade
+
+SIZES = {'720p': (1280, 720), '1080p': (1920, 1080)}
+
+
+def bench(size, frames):
+    screen = pygame.display.set_mode(size)
+    frame_from = pygame.Surface(size).convert(screen)
+    frame_from.fill((10, 200, 30))
+    frame_to = pygame.Surface(size).convert(screen)
+    frame_to.fill((250, 20, 130))
+    crossfade = CrossFade(screen, 1000, 30)
+
+    start = time.perf_counter()
+    crossfade.prepare(frame_from, frame_to)
+    prepare = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for i in range(frames):
+        crossfade.blend(i % (CrossFade.ONE + 1))
+    blend = (time.perf_counter() - start) / frames
+
+    start = time.perf_counter()
+    for i in range(frames):
+        pygame.surfarray.blit_array(screen, crossfade.blend(i % (CrossFade.ONE + 1)))
+    blit = (time.perf_counter() - start) / frames
+    return prepare, blend, blit
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--frames', type=int, default=60)
+    args = parser.parse_args()
+
+    os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+    pygame.display.init()
+    for name, size in SIZES.items():
+        prepare, blend, blit = bench(size, args.frames)
+        print('%-6s prepare %6.2f ms, blend %6.2f ms/frame, blend+blit %6.2f ms/frame' %
+              (name, prepare * 1000, blend * 1000, blit * 1000))
+    pygame.quit()
+
+
+if __name__ == '__main__':
+    main()
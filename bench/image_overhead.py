@@ -0,0 +1,85 @@
+"""Per-image overhead of LomoPlayer: render thread vs a forked process per
+image (the previous implementation).  Fades and the display interval are
+set to zero so only the cost of starting, finishing and stopping an image
+is measured.
+
+    SDL_VIDEODRIVER=dummy python -m bench.image_overhead --ballast-mb 200
+"""
+import argparse
+import configparser
+import os
+import select
+import time
+from multiprocessing import Event, Process
+
+import pygame
+
+from Adafruit_Video_Looper.lomoplayer import LomoPlayer
+from Adafruit_Video_Looper.model import getMediaAsset, LOAD_SUCC
+from Adafruit_Video_Looper.utils import load_image_fit_screen
+
+
+class ForkingPlayer(LomoPlayer):
+    """The old way: fork a multiprocessing.Process for every image."""
+
+    def play_image(self, image, loop, vol):
+        self.stop()
+        done_r, done_w = os.pipe()
+        self._process = Process(target=self._play_image, args=(image, Event(), done_w))
+        self._process.start()
+        # the child closes its copy when it's done, we only need the sentinel
+        os.close(done_w)
+        os.close(done_r)
+
+    def fileno(self):
+        return self._process.sentinel
+
+    def is_playing(self):
+        return self._process.is_alive()
+
+    def stop(self, block_timeout_sec=0):
+        process = getattr(self, '_process', None)
+        if process is not None and process.is_alive():
+            process.kill()
+            process.join(block_timeout_sec)
+
+
+def run(player, asset, images):
+    start = time.perf_counter()
+    for i in range(images):
+        player.play(asset)
+        select.select([player.fileno()], [], [])
+        player.stop()
+    return (time.perf_counter() - start) / images
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--images', type=int, default=50)
+    parser.add_argument('--ballast-mb', type=int, default=0,
+                        help='resident memory to add, as a large preloaded looper would have')
+    args = parser.parse_args()
+
+    os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+    pygame.display.init()
+    screen = pygame.display.set_mode((1280, 720))
+    ballast = bytearray(args.ballast_mb * 1024 * 1024)
+    for i in range(0, len(ballast), 4096):
+        ballast[i] = 1
+
+    config = configparser.ConfigParser()
+    config.read('test/video_looper.ini')
+    config['sdl_image']['fade_ms'] = '0'
+    config['sdl_image']['interval_sec'] = '0'
+    asset = getMediaAsset('test/media/home/IMG_6849.png')
+    asset.preload_resource = load_image_fit_screen(asset.filename)
+    asset.loading_status = LOAD_SUCC
+
+    for name, cls in (('process', ForkingPlayer), ('thread', LomoPlayer)):
+        per_image = run(cls(config, screen), asset, args.images)
+        print('%-8s %7.2f ms per image' % (name, per_image * 1000))
+    pygame.quit()
+
+
+if __name__ == '__main__':
+    main()
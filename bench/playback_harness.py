@@ -0,0 +1,240 @@
+"""Headless end-to-end run of the video looper, measuring gaps between assets.
+
+    python -m bench.playback_harness --videos 4 --assets 8 --startup 0.3 --duration 2
+
+Runs Adafruit_Video_Looper.video_looper as a child process with SDL's
+dummy video driver against a temporary directory of (empty) videos.  Stub
+cvlc and ffprobe executables are put first on PATH.  The cvlc stub waits
+--startup seconds, logs the asset's start to a timeline file, waits
+--duration seconds and logs its stop (also when it's terminated).
+
+Reported:
+- time to first asset: from launching the looper to the first start
+- gap mean and p95: from an asset's stop to the next asset's start
+- idle CPU: the looper's CPU time per second of playback, when all it has
+  to do is wait for the player
+- reload latency: from SIGUSR1 to the next start, the stub's startup delay
+  included
+
+No display, network or GPU is needed.
+"""
+import argparse
+import configparser
+import json
+import os
+import shutil
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+
+CVLC_STUB = '''#!/bin/sh
+for file; do :; done
+log() { echo "$1 $(date +%s.%N) $file" >> "$LOOPER_TIMELINE"; }
+trap 'kill $! 2>/dev/null; log stop; exit 0' TERM INT
+sleep "$STUB_STARTUP" & wait $!
+log start
+sleep "$STUB_DURATION" & wait $!
+log stop
+'''
+
+# Long enough not to count as a short video.
+FFPROBE_STUB = '''#!/bin/sh
+echo 60.0
+'''
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def percentile(values, p):
+    values = sorted(values)
+    if not values:
+        return 0.0
+    k = min(int(round(p / 100.0 * (len(values) - 1))), len(values) - 1)
+    return values[k]
+
+
+class Harness:
+    """The looper running in a child process on a temporary directory."""
+
+    def __init__(self, tmpdir, videos=4, startup=0.2, duration=1.0, preload=0):
+        self.tmpdir = tmpdir
+        self.timeline_path = os.path.join(tmpdir, 'timeline.txt')
+        self.process = None
+        self.events = []    # (time, kind, path) recorded by the harness
+        bindir = os.path.join(tmpdir, 'bin')
+        os.mkdir(bindir)
+        for name, script in (('cvlc', CVLC_STUB), ('ffprobe', FFPROBE_STUB)):
+            path = os.path.join(bindir, name)
+            with open(path, 'w') as f:
+                f.write(script)
+            os.chmod(path, 0o755)
+        self.media = os.path.join(tmpdir, 'media')
+        os.mkdir(self.media)
+        for i in range(videos):
+            open(os.path.join(self.media, 'clip%03d.mp4' % i), 'w').close()
+        self.config_path = self._write_config(preload)
+        self.env = dict(os.environ,
+                        PATH=bindir + os.pathsep + os.environ.get('PATH', ''),
+                        SDL_VIDEODRIVER='dummy',
+                        SDL_AUDIODRIVER='dummy',
+                        LOOPER_TIMELINE=self.timeline_path,
+                        STUB_STARTUP=str(startup),
+                        STUB_DURATION=str(duration))
+
+    def _write_config(self, preload):
+        config = configparser.ConfigParser()
+        config.read(os.path.join(REPO, 'assets', 'video_looper.ini'))
+        config['video_looper'].update({
+            'output': 'sdl', 'video_player': 'lomoplayer', 'file_reader': 'directory',
+            'osd': 'false', 'countdown_time': '0', 'wait_time': '0',
+            'keyboard_control': 'false', 'bgimage': '', 'qrimage': '',
+            'preload': str(preload), 'console_output': 'true'})
+        config['directory']['path'] = self.media
+        config['playlist'].update({
+            'is_random': 'false', 'media_type': 'video',
+            'cache_path': os.path.join(self.tmpdir, 'playlist.txt')})
+        config['vlc'].update({
+            'sound_vol_file': os.path.join(self.tmpdir, 'sound_volume'),
+            'poster_cache_path': ''})
+        path = os.path.join(self.tmpdir, 'video_looper.ini')
+        with open(path, 'w') as f:
+            config.write(f)
+        return path
+
+    def start(self, log=None):
+        self.events.append((time.time(), 'launch', None))
+        self.process = subprocess.Popen(
+            [sys.executable, '-m', 'Adafruit_Video_Looper.video_looper', self.config_path],
+            cwd=REPO, env=self.env, stdout=log or subprocess.DEVNULL, stderr=subprocess.STDOUT)
+
+    def reload(self):
+        self.events.append((time.time(), 'reload', None))
+        self.process.send_signal(signal.SIGUSR1)
+
+    def stop(self, timeout=10):
+        if self.process is None:
+            return
+        self.process.send_signal(signal.SIGTERM)
+        try:
+            self.process.wait(timeout)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+            self.process.wait()
+
+    def timeline(self):
+        """All events so far, ordered by time."""
+        events = list(self.events)
+        try:
+            with open(self.timeline_path) as f:
+                for line in f:
+                    kind, ts, path = line.rstrip('\n').split(' ', 2)
+                    events.append((float(ts), kind, path))
+        except FileNotFoundError:
+            pass
+        return sorted(events)
+
+    def wait_for(self, kind, count, after=0, timeout=30):
+        """Wait for count events of kind after time after, return them."""
+        deadline = time.monotonic() + timeout
+        while True:
+            found = [e for e in self.timeline() if e[1] == kind and e[0] >= after]
+            if len(found) >= count:
+                return found
+            if self.process.poll() is not None:
+                raise RuntimeError('looper exited with %d' % self.process.returncode)
+            if time.monotonic() > deadline:
+                raise RuntimeError('timed out waiting for %d %s events, got %d' % (count, kind, len(found)))
+            time.sleep(0.02)
+
+    def cpu_seconds(self):
+        """User plus system CPU time of the looper (all its threads)."""
+        with open('/proc/%d/stat' % self.process.pid) as f:
+            fields = f.read().rsplit(')', 1)[1].split()
+        return (int(fields[11]) + int(fields[12])) / os.sysconf('SC_CLK_TCK')
+
+
+def gaps(timeline):
+    """Seconds between each stop and the start following it."""
+    result = []
+    stopped = None
+    for ts, kind, path in timeline:
+        if kind == 'stop':
+            stopped = ts
+        elif kind == 'start':
+            if stopped is not None:
+                result.append(ts - stopped)
+            stopped = None
+    return result
+
+
+def run(videos=4, assets=6, startup=0.2, duration=1.0, preload=0, log=None):
+    """Run the looper until it played assets assets, then reload it once.
+    Return the metrics and the timeline.
+    """
+    tmpdir = tempfile.mkdtemp()
+    harness = Harness(tmpdir, videos, startup, duration, preload)
+    try:
+        harness.start(log)
+        launched = harness.events[0][0]
+        starts = harness.wait_for('start', 2, timeout=60)
+        cpu_from, cpu_start = time.time(), harness.cpu_seconds()
+        starts = harness.wait_for('start', assets, timeout=60 + assets * (startup + duration) * 3)
+        cpu = (harness.cpu_seconds() - cpu_start) / (time.time() - cpu_from)
+        played = harness.timeline()
+
+        harness.reload()
+        signalled = harness.events[-1][0]
+        reloaded = harness.wait_for('start', 1, after=signalled, timeout=60)[0][0]
+
+        steady = gaps(played)
+        metrics = {
+            'time_to_first_asset_ms': (starts[0][0] - launched) * 1000,
+            'gap_mean_ms': sum(steady) / len(steady) * 1000 if steady else 0.0,
+            'gap_p95_ms': percentile(steady, 95) * 1000,
+            'gaps': len(steady),
+            'idle_cpu_ms_per_s': cpu * 1000,
+            'reload_latency_ms': (reloaded - signalled) * 1000,
+        }
+        return metrics, harness.timeline()
+    finally:
+        harness.stop()
+        shutil.rmtree(tmpdir)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--videos', type=int, default=4, help='videos in the directory')
+    parser.add_argument('--assets', type=int, default=8, help='assets to play before reloading')
+    parser.add_argument('--startup', type=float, default=0.3, help='seconds the stub player takes to start')
+    parser.add_argument('--duration', type=float, default=2.0, help='seconds every video plays')
+    parser.add_argument('--preload', type=int, default=0)
+    parser.add_argument('--timeline', action='store_true', help='print the timeline')
+    parser.add_argument('--json', action='store_true', help='print the metrics as JSON')
+    parser.add_argument('--log', help='file for the looper output')
+    args = parser.parse_args()
+
+    log = open(args.log, 'w') if args.log else None
+    try:
+        metrics, timeline = run(args.videos, args.assets, args.startup, args.duration, args.preload, log)
+    finally:
+        if log is not None:
+            log.close()
+    if args.timeline:
+        start = timeline[0][0]
+        for ts, kind, path in timeline:
+            print('%9.3f %-7s %s' % (ts - start, kind, os.path.basename(path) if path else ''))
+    if args.json:
+        print(json.dumps(metrics, indent=2, sort_keys=True))
+    else:
+        print('time to first asset %8.1f ms' % metrics['time_to_first_asset_ms'])
+        print('gap mean            %8.1f ms (%d gaps)' % (metrics['gap_mean_ms'], metrics['gaps']))
+        print('gap p95             %8.1f ms' % metrics['gap_p95_ms'])
+        print('idle CPU            %8.1f ms/s' % metrics['idle_cpu_ms_per_s'])
+        print('reload latency      %8.1f ms (stub startup %.0f ms included)' % (
+            metrics['reload_latency_ms'], args.startup * 1000))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,76 @@
+"""Milliseconds to fit 12/24/48 MP photos to a 1080p screen.
+
+    SDL_VIDEODRIVER=dummy python -m bench.resample
+
+Compares pygame's scale (nearest) and smoothscale with the resample
+module, single threaded and tiled over all cores.
+"""
+import argparse
+import os
+import time
+
+import pygame
+
+from Adafruit_Video_Looper.resample import resample, NEAREST
+from Adafruit_Video_Looper.utils import scale_image
+
+# 4:3 camera sensors
+SIZES = {'12MP': (4000, 3000), '24MP': (5664, 4248), '48MP': (8000, 6000)}
+SCREEN = (1920, 1080)
+
+
+def make_photo(size):
+    """A surface with detail everywhere (nearest neighbour has something to
+    alias), built from a small random tile so setup stays quick."""
+    tile = pygame.Surface((97, 89)).convert()
+    pixels = pygame.PixelArray(tile)
+    seed = 12345
+    for x in range(97):
+        for y in range(89):
+            seed = (seed * 1103515245 + 12345) & 0x7fffffff
+            pixels[x, y] = seed & 0xffffff
+    del pixels
+    photo = pygame.Surface(size).convert()
+    for x in range(0, size[0], 97):
+        for y in range(0, size[1], 89):
+            photo.blit(tile, (x, y))
+    return photo
+
+
+def timed(func, repeat):
+    best = None
+    for i in range(repeat):
+        start = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+    pygame.display.init()
+    pygame.display.set_mode(SCREEN)
+    cores = os.cpu_count() or 1
+    print('%d cores, best of %d' % (cores, args.repeat))
+    for name, size in SIZES.items():
+        photo = make_photo(size)
+        # the size scale_image fits the photo to
+        fit = scale_image(photo, SCREEN, NEAREST).get_size()
+        results = [
+            ('scale', timed(lambda: pygame.transform.scale(photo, fit), args.repeat)),
+            ('smoothscale', timed(lambda: pygame.transform.smoothscale(photo, fit), args.repeat)),
+            ('resample 1 thread', timed(lambda: resample(photo, fit, tiles=1), args.repeat)),
+            ('resample %d threads' % cores, timed(lambda: resample(photo, fit), args.repeat)),
+        ]
+        print('%s -> %dx%d: %s' % (name, fit[0], fit[1],
+                                   ', '.join('%s %.1f ms' % r for r in results)))
+    pygame.quit()
+
+
+if __name__ == '__main__':
+    main()
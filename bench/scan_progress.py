@@ -0,0 +1,79 @@
+"""Scan throughput of CacheFilePlayList with and without throttled progress.
+
+    SDL_VIDEODRIVER=dummy python -m bench.scan_progress --files 20000
+"""
+import argparse
+import configparser
+import os
+import shutil
+import tempfile
+import time
+
+import pygame
+
+from Adafruit_Video_Looper.model import CacheFilePlayList
+from Adafruit_Video_Looper.osd import OSD
+from Adafruit_Video_Looper.utils import ProgressThrottle
+
+
+def make_tree(root, files, per_dir=500):
+    for i in range(files):
+        subdir = os.path.join(root, 'd%04d' % (i // per_dir))
+        if i % per_dir == 0:
+            os.makedirs(subdir)
+        open(os.path.join(subdir, 'IMG_%06d.jpg' % i), 'w').close()
+
+
+def scan(root, config, progress):
+    playlist = CacheFilePlayList([root], 'jpg|png', config)
+    playlist.removeCacheFile()
+    start = time.perf_counter()
+    playlist.load(progress)
+    if isinstance(progress, ProgressThrottle):
+        progress.flush()
+    elapsed = time.perf_counter() - start
+    playlist.removeCacheFile()
+    return playlist.length(), elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--files', type=int, default=5000)
+    args = parser.parse_args()
+
+    os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+    pygame.display.init()
+    pygame.font.init()
+    screen = pygame.display.set_mode((1280, 720))
+    osd = OSD(screen, (255, 255, 255), (0, 0, 0))
+    font = pygame.font.Font(None, 50)
+    shown = []
+
+    def display(count):
+        shown.append(count)
+        osd.show_centered(osd.render_text('loading %d assets...' % count, font))
+
+    tmpdir = tempfile.mkdtemp()
+    try:
+        root = os.path.join(tmpdir, 'media')
+        make_tree(root, args.files)
+        config = configparser.ConfigParser()
+        config.read('test/video_looper.ini')
+        config['playlist']['cache_path'] = os.path.join(tmpdir, 'playlist.txt')
+
+        # warm up the dentry cache so every run sees the same file system
+        scan(root, config, None)
+        for name, progress in (('no progress', None),
+                               ('every file', display),
+                               ('throttled', ProgressThrottle(display))):
+            del shown[:]
+            count, elapsed = scan(root, config, progress)
+            print('%-12s %7d assets %8.1f ms %9.0f assets/s %6d updates' %
+                  (name, count, elapsed * 1000, count / elapsed, len(shown)))
+    finally:
+        shutil.rmtree(tmpdir)
+        pygame.quit()
+
+
+if __name__ == '__main__':
+    main()
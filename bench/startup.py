@@ -0,0 +1,52 @@
+"""Time to first asset of CacheFilePlayList with and without streaming.
+
+    python -m bench.startup --files 20000
+"""
+import argparse
+import configparser
+import os
+import shutil
+import tempfile
+import time
+
+from Adafruit_Video_Looper.model import CacheFilePlayList
+from .scan_progress import make_tree
+
+
+def first_asset(root, config):
+    playlist = CacheFilePlayList([root], 'jpg|png', config)
+    playlist.removeCacheFile()
+    start = time.perf_counter()
+    playlist.load()
+    asset = playlist.get_next(False)
+    first = time.perf_counter() - start
+    playlist.wait_scanned()
+    total = time.perf_counter() - start
+    assert asset is not None and playlist.cacheFileExists()
+    playlist.removeCacheFile()
+    return first, total, playlist.length()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--files', type=int, default=5000)
+    args = parser.parse_args()
+
+    tmpdir = tempfile.mkdtemp()
+    try:
+        root = os.path.join(tmpdir, 'media')
+        make_tree(root, args.files)
+        config = configparser.ConfigParser()
+        config.read('test/video_looper.ini')
+        config['playlist']['cache_path'] = os.path.join(tmpdir, 'playlist.txt')
+        for name, stream_after in (('full scan', args.files + 1), ('streaming', 10)):
+            config['playlist']['stream_after'] = str(stream_after)
+            first, total, count = first_asset(root, config)
+            print('%-10s first asset %8.1f ms, scan done %8.1f ms, %d assets' %
+                  (name, first * 1000, total * 1000, count))
+    finally:
+        shutil.rmtree(tmpdir)
+
+
+if __name__ == '__main__':
+    main()
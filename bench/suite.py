@@ -0,0 +1,235 @@
+"""Playlist, scanning and selection hot paths against a stored baseline.
+
+    python -m bench.suite --files 20000            # run and print
+    python -m bench.suite --save                   # store bench/baseline.json
+    python -m bench.suite --compare                # fail on regressions
+
+Every case runs on a synthetic library (see bench.synthetic).  Wall time is
+the best of --repeat runs; allocations (tracemalloc peak) and peak RSS come
+from one more run each, since tracing slows the code down.  Log output
+below WARNING is disabled so the console doesn't dominate the timings.
+
+Baselines are only comparable on the same machine with the same options.
+"""
+import argparse
+import configparser
+import gc
+import json
+import logging
+import os
+import resource
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from watchdog import events
+
+from Adafruit_Video_Looper.model import CacheFilePlayList, WatchDogWrapIter, fileSystemMediaIter, cacheIter
+from Adafruit_Video_Looper.playlist_builders import build_playlist_m3u
+from . import synthetic
+
+BASELINE = os.path.join(os.path.dirname(__file__), 'baseline.json')
+EXTENSIONS = '(%s)' % '|'.join(synthetic.IMAGE_EXTENSIONS + synthetic.VIDEO_EXTENSIONS)
+
+
+class Library:
+    """The synthetic library and config the cases run on."""
+
+    def __init__(self, tmpdir, args):
+        self.args = args
+        self.root = os.path.join(tmpdir, 'media')
+        self.paths = synthetic.make_tree(self.root, args.files, args.depth, args.fanout)
+        self.cache_file = os.path.join(tmpdir, 'playlist.txt')
+        synthetic.write_cache_file(self.cache_file, self.paths)
+        self.m3u = os.path.join(tmpdir, 'playlist.m3u')
+        synthetic.write_m3u(self.m3u, self.paths)
+        self.config = configparser.ConfigParser()
+        self.config.read('test/video_looper.ini')
+        self.config['playlist']['media_type'] = 'image'
+        self.config['playlist']['cache_path'] = self.cache_file
+
+    def playlist(self):
+        return CacheFilePlayList([self.root], EXTENSIONS, self.config)
+
+
+# Each case takes the Library, does its setup and returns the function
+# that gets measured.
+
+def case_scan(lib):
+    return lambda: sum(1 for _ in fileSystemMediaIter([lib.root], EXTENSIONS))
+
+def case_cache_load(lib):
+    def run():
+        lib.playlist().load()
+    return run
+
+def case_cache_reload(lib):
+    def run():
+        playlist = lib.playlist()
+        playlist.reload()
+        playlist.wait_scanned()
+    return run
+
+def _selection(lib, is_random):
+    playlist = lib.playlist()
+    playlist.load()
+    def run():
+        for _ in range(lib.args.calls):
+            playlist.get_next(is_random)
+    return run
+
+def case_get_next(lib):
+    return _selection(lib, False)
+
+def case_get_next_random(lib):
+    return _selection(lib, True)
+
+def case_watchdog_burst(lib):
+    assets = list(cacheIter(lib.cache_file))
+    new = [os.path.join(lib.root, 'new', 'IMG_%06d.jpg' % i) for i in range(lib.args.burst)]
+    def run():
+        wrap = WatchDogWrapIter(iter(assets), [])
+        try:
+            for path in new:
+                wrap.on_created(events.FileCreatedEvent(path))
+            for _ in new:
+                next(wrap)
+            for path in new:
+                wrap.on_deleted(events.FileDeletedEvent(path))
+        finally:
+            wrap.stop()
+    return run
+
+def case_m3u(lib):
+    def run():
+        build_playlist_m3u(lib.m3u, lib.config).load()
+    return run
+
+CASES = [
+    ('scan', case_scan),
+    ('cache_load', case_cache_load),
+    ('cache_reload', case_cache_reload),
+    ('get_next', case_get_next),
+    ('get_next_random', case_get_next_random),
+    ('watchdog_burst', case_watchdog_burst),
+    ('m3u', case_m3u),
+]
+
+
+def _reset_peak_rss():
+    """Reset the kernel's peak RSS of this process, false if it can't be."""
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+        return True
+    except OSError:
+        return False
+
+
+def _peak_rss_kb():
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def measure(run, repeat):
+    wall = []
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        run()
+        wall.append(time.perf_counter() - start)
+
+    gc.collect()
+    tracemalloc.start()
+    run()
+    _, alloc_peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    gc.collect()
+    _reset_peak_rss()
+    run()
+    return {
+        'wall_ms': min(wall) * 1000,
+        'alloc_peak_kb': alloc_peak / 1024,
+        'rss_peak_kb': _peak_rss_kb(),
+    }
+
+
+def run_cases(args):
+    tmpdir = tempfile.mkdtemp()
+    try:
+        lib = Library(tmpdir, args)
+        results = {}
+        for name, case in CASES:
+            if args.cases and name not in args.cases:
+                continue
+            results[name] = measure(case(lib), args.repeat)
+            print('%-16s %10.1f ms %10.0f kB alloc %10.0f kB rss' % (
+                name, results[name]['wall_ms'], results[name]['alloc_peak_kb'], results[name]['rss_peak_kb']))
+        return results
+    finally:
+        shutil.rmtree(tmpdir)
+
+
+def compare(results, baseline, threshold):
+    """Print the ratio to the baseline of every metric, return the names of
+    the cases that got slower than threshold times the baseline.
+    """
+    regressions = []
+    for name, result in results.items():
+        base = baseline.get(name)
+        if base is None:
+            continue
+        ratios = dict((key, result[key] / base[key] if base[key] else 1) for key in result)
+        print('%-16s %9.2fx time %9.2fx alloc %9.2fx rss' % (
+            name, ratios['wall_ms'], ratios['alloc_peak_kb'], ratios['rss_peak_kb']))
+        if ratios['wall_ms'] > threshold or ratios['alloc_peak_kb'] > threshold:
+            regressions.append(name)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--files', type=int, default=20000)
+    parser.add_argument('--depth', type=int, default=3)
+    parser.add_argument('--fanout', type=int, default=6)
+    parser.add_argument('--calls', type=int, default=10000, help='get_next calls per run')
+    parser.add_argument('--burst', type=int, default=200, help='files added and removed per watchdog burst')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--cases', nargs='*', help='cases to run, all by default')
+    parser.add_argument('--baseline', default=BASELINE)
+    parser.add_argument('--save', action='store_true', help='store the results as the baseline')
+    parser.add_argument('--compare', action='store_true', help='compare with the baseline')
+    parser.add_argument('--threshold', type=float, default=1.25,
+                        help='slowdown (or allocation growth) counting as a regression')
+    args = parser.parse_args()
+
+    logging.disable(logging.INFO)
+    options = dict((key, getattr(args, key)) for key in ('files', 'depth', 'fanout', 'calls', 'burst'))
+    results = run_cases(args)
+
+    if args.compare:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if baseline['options'] != options:
+            print('baseline was taken with %s' % baseline['options'])
+        regressions = compare(results, baseline['results'], args.threshold)
+        if regressions:
+            print('regressions: %s' % ', '.join(regressions))
+            sys.exit(1)
+    if args.save:
+        with open(args.baseline, 'w') as f:
+            json.dump({'options': options, 'results': results}, f, indent=2, sort_keys=True)
+            f.write('\n')
+
+
+if __name__ == '__main__':
+    main()
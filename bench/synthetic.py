@@ -0,0 +1,77 @@
+"""Synthetic media libraries for the benchmarks.
+
+    python -m bench.synthetic /tmp/media --files 20000 --depth 3
+
+Files are spread evenly over a tree of the given depth, fanout directories
+per level, with the given share of videos.  They're empty: nothing here
+reads their content.
+"""
+import argparse
+import os
+
+IMAGE_EXTENSIONS = ('jpg', 'png', 'heic')
+VIDEO_EXTENSIONS = ('mp4', 'mov')
+
+
+def media_paths(root, files, depth=2, fanout=10, video_ratio=0.2):
+    """Yield the paths of a library of files below root."""
+    dirs = fanout ** depth
+    per_dir = max(-(-files // dirs), 1)
+    videos_every = round(1 / video_ratio) if video_ratio > 0 else 0
+    for i in range(files):
+        d = i // per_dir
+        parts = []
+        for level in range(depth):
+            parts.append('d%d' % (d % fanout))
+            d //= fanout
+        if videos_every and i % videos_every == 0:
+            ext = VIDEO_EXTENSIONS[i % len(VIDEO_EXTENSIONS)]
+        else:
+            ext = IMAGE_EXTENSIONS[i % len(IMAGE_EXTENSIONS)]
+        yield os.path.join(root, *parts, 'IMG_%07d.%s' % (i, ext))
+
+
+def make_tree(root, files, depth=2, fanout=10, video_ratio=0.2):
+    """Create the library on disk, return its paths."""
+    paths = list(media_paths(root, files, depth, fanout, video_ratio))
+    made = set()
+    for path in paths:
+        d = os.path.dirname(path)
+        if d not in made:
+            os.makedirs(d, exist_ok=True)
+            made.add(d)
+        open(path, 'w').close()
+    return paths
+
+
+def write_cache_file(path, paths):
+    """Write a CacheFilePlayList cache file listing paths."""
+    with open(path, 'w') as f:
+        for p in paths:
+            f.write('%s\n' % p)
+
+
+def write_m3u(path, paths):
+    """Write an extended m3u playlist of paths, every other one titled."""
+    with open(path, 'w') as f:
+        f.write('#EXTM3U\n')
+        for i, p in enumerate(paths):
+            if i % 2 == 0:
+                f.write('#EXTINF:-1,Title %d\n' % i)
+            f.write('%s\n' % p)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('root')
+    parser.add_argument('--files', type=int, default=10000)
+    parser.add_argument('--depth', type=int, default=2)
+    parser.add_argument('--fanout', type=int, default=10)
+    parser.add_argument('--video-ratio', type=float, default=0.2)
+    args = parser.parse_args()
+    paths = make_tree(args.root, args.files, args.depth, args.fanout, args.video_ratio)
+    print('created %d files below %s' % (len(paths), args.root))
+
+
+if __name__ == '__main__':
+    main()
@@ -47,6 +47,7 @@ do
 done
 
 rescan_cmd="sudo killall -SIGUSR1 python3"
+trace_cmd="sudo killall -SIGUSR2 python3"
 
 frame_off_cmd="vcgencmd display_power 0;sudo service supervisor stop"
 frame_off_job="$MIN_OFF $HOUR_OFF * * * $frame_off_cmd"
@@ -114,8 +115,11 @@ case "$1" in
 	rescan)
 		eval $rescan_cmd
 		;;
+	trace)
+		eval $trace_cmd
+		;;
 	*)
-		echo "Usage: $0 { add | remove | on | off | rescan } --on-hour [00-23] --on-min [00-59] --off-hour [00-23] --off-min [00-59]" >&2
+		echo "Usage: $0 { add | remove | on | off | rescan | trace } --on-hour [00-23] --on-min [00-59] --off-hour [00-23] --off-min [00-59]" >&2
 		exit 3
 		;;
 esac
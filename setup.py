@@ -8,4 +8,5 @@ setup(name              = 'Adafruit_Video_Looper',
       license           = 'GNU GPLv2',
       url               = 'https://github.com/adafruit/pi_video_looper',
       install_requires  = ['pyudev', 'pygame', 'watchdog'],
+      extras_require    = {'numpy': ['numpy']},
       packages          = find_packages())
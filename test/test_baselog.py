@@ -0,0 +1,93 @@
+import unittest
+import configparser
+import logging
+import os
+import shutil
+import tempfile
+from Adafruit_Video_Looper import baselog
+
+
+class Record:
+    """Minimal stand-in for the attributes RateLimitFilter reads."""
+
+    def __init__(self, lineno, levelno=logging.INFO):
+        self.pathname = 'test.py'
+        self.lineno = lineno
+        self.levelno = levelno
+        self.msg = 'message'
+
+
+class TestRateLimit(unittest.TestCase):
+
+    def test_burst(self):
+        f = baselog.RateLimitFilter(interval=60, burst=3)
+        self.assertEqual([f.filter(Record(1)) for _ in range(5)], [True, True, True, False, False])
+        # other call sites and errors have their own budget
+        self.assertTrue(f.filter(Record(2)))
+        self.assertTrue(f.filter(Record(1, logging.ERROR)))
+
+    def test_suppressed_count(self):
+        f = baselog.RateLimitFilter(interval=0.01, burst=1)
+        self.assertTrue(f.filter(Record(1)))
+        self.assertFalse(f.filter(Record(1)))
+        self.assertFalse(f.filter(Record(1)))
+        f.interval = 0
+        record = Record(1)
+        self.assertTrue(f.filter(record))
+        self.assertEqual(record.msg, 'message (2 similar suppressed)')
+
+
+class TestLogging(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmpdir, 'looper.log')
+        self.config = configparser.ConfigParser()
+        self.config.read_dict({'logging': {'file': self.path, 'console': 'false', 'rate_limit_burst': '2'}})
+        baselog.configure(self.config)
+
+    def tearDown(self):
+        baselog.configure(configparser.ConfigParser())
+        shutil.rmtree(self.tmpdir)
+
+    def read(self):
+        baselog.flush()
+        with open(self.path) as f:
+            return f.read()
+
+    def test_getlogger_once(self):
+        logger = baselog.getlogger('test.baselog')
+        self.assertIs(baselog.getlogger('test.baselog'), logger)
+        self.assertEqual(logger.handlers.count(baselog._queue_handler), 1)
+        logger.info('hello %s', 'world')
+        self.assertEqual(self.read().count('INFO - hello world\n'), 1)
+
+    def test_level_and_rate(self):
+        logger = baselog.getlogger('test.baselog')
+        logger.debug('not shown')
+        for i in range(5):
+            logger.info('line %d', i)
+        logger.error('always')
+        text = self.read()
+        self.assertNotIn('not shown', text)
+        self.assertIn('line 1', text)
+        self.assertNotIn('line 2', text)
+        self.assertIn('always', text)
+
+    def test_lazy_args(self):
+        class Expensive:
+            calls = 0
+            def __str__(self):
+                Expensive.calls += 1
+                return 'expensive'
+        logger = baselog.getlogger('test.baselog')
+        logger.debug('%s', Expensive())
+        self.assertEqual(Expensive.calls, 0)
+        self.config['logging']['level'] = 'debug'
+        baselog.configure(self.config)
+        logger.debug('%s', Expensive())
+        self.assertIn('DEBUG - expensive', self.read())
+
+
+if __name__ == '__main__':
+    unittest.main()
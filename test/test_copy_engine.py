@@ -0,0 +1,87 @@
+import unittest
+import errno
+import os
+import shutil
+import tempfile
+from Adafruit_Video_Looper import copy_engine
+from Adafruit_Video_Looper.copy_engine import *
+
+class TestCopyEngine(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.data = os.urandom(300 * 1024 + 7)
+        self.src = self.make('src.mp4', self.data)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+
+    def make(self, name, data):
+        path = os.path.join(self.tmp, name)
+        with open(path, 'wb') as f:
+            f.write(data)
+        return path
+
+    def read(self, path):
+        with open(path, 'rb') as f:
+            return f.read()
+
+    def test_copy_file(self):
+        dst = os.path.join(self.tmp, 'dst.mp4')
+        progress = CopyProgress(len(self.data))
+        self.assertEqual(copy_file(self.src, dst, progress, chunk=64 * 1024), len(self.data))
+        self.assertEqual(self.read(dst), self.data)
+        self.assertEqual(progress.copied, len(self.data))
+
+    def test_fallback(self):
+        calls = []
+        def unsupported(infd, outfd, chunk):
+            calls.append(chunk)
+            raise OSError(errno.EXDEV, 'cross device')
+        methods = copy_engine._METHODS
+        copy_engine._METHODS = [unsupported, copy_engine._read_write]
+        try:
+            dst = os.path.join(self.tmp, 'dst.mp4')
+            copy_file(self.src, dst, chunk=64 * 1024)
+        finally:
+            copy_engine._METHODS = methods
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(self.read(dst), self.data)
+
+    def test_copy_all(self):
+        other = self.make('other.mp4', b'x' * 1000)
+        out = os.path.join(self.tmp, 'out')
+        os.mkdir(out)
+        seen = []
+        failed = copy_all([[(self.src, os.path.join(out, 'a.mp4'))],
+                           [(other, os.path.join(out, 'b.mp4')),
+                            (os.path.join(self.tmp, 'missing.mp4'), os.path.join(out, 'c.mp4'))],
+                           []],
+                          lambda progress: seen.append((progress.copied, progress.total)),
+                          interval=0.01)
+        self.assertEqual(self.read(os.path.join(out, 'a.mp4')), self.data)
+        self.assertEqual(self.read(os.path.join(out, 'b.mp4')), b'x' * 1000)
+        self.assertEqual([f[0] for f in failed], [os.path.join(self.tmp, 'missing.mp4')])
+        self.assertEqual(seen[-1], (len(self.data) + 1000, len(self.data) + 1000))
+
+    def test_copy_all_syncs_copied_files(self):
+        out = os.path.join(self.tmp, 'out')
+        os.mkdir(out)
+        synced = []
+        fsync_path = copy_engine._fsync_path
+        copy_engine._fsync_path = synced.append
+        try:
+            failed = copy_all([[(self.src, os.path.join(out, 'a.mp4')),
+                                (os.path.join(self.tmp, 'missing.mp4'), os.path.join(out, 'c.mp4'))]])
+        finally:
+            copy_engine._fsync_path = fsync_path
+        self.assertEqual(len(failed), 1)
+        # only what was written, then its directory
+        self.assertEqual(synced, [os.path.join(out, 'a.mp4'), out])
+
+    def test_sync_files_failure(self):
+        failed = sync_files([os.path.join(self.tmp, 'missing.mp4')])
+        self.assertEqual([path for path, e in failed], [os.path.join(self.tmp, 'missing.mp4')])
+
+if __name__ == '__main__':
+    unittest.main()
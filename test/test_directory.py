@@ -0,0 +1,111 @@
+import unittest
+import configparser
+import errno
+import os
+import shutil
+import tempfile
+from Adafruit_Video_Looper import directory
+from Adafruit_Video_Looper.directory import DirectoryReader
+
+class TestDirectoryReader(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.root = os.path.join(self.tmp, 'movies')
+        os.mkdir(self.root)
+        self.make('a.mp4')
+        os.mkdir(self.path('sub'))
+        self.make('sub/b.mp4')
+        self.config = configparser.ConfigParser()
+        self.config.read_dict({'directory': {'path': self.root}})
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+
+    def path(self, name):
+        return os.path.join(self.root, name)
+
+    def make(self, name):
+        with open(self.path(name), 'w') as f:
+            f.write(name)
+
+    def reader(self):
+        return DirectoryReader(self.config)
+
+    def check(self, reader, added, removed):
+        if reader.polling():
+            # changes within one clock tick don't move directory mtimes
+            for d in reader._mtimes:
+                reader._mtimes[d] -= 1
+        self.assertEqual(reader.is_changed(), bool(added or removed))
+        self.assertEqual(reader.pop_changes(), ([self.path(p) for p in added], [self.path(p) for p in removed]))
+
+    def changes(self, reader):
+        os.rename(self.path('a.mp4'), self.path('c.mp4'))
+        self.make('sub/d.mp4')
+        os.remove(self.path('sub/b.mp4'))
+        self.check(reader, ['c.mp4', 'sub/d.mp4'], ['a.mp4', 'sub/b.mp4'])
+        self.check(reader, [], [])
+        # a file added and removed again is no change
+        self.make('e.mp4')
+        os.remove(self.path('e.mp4'))
+        self.check(reader, [], [])
+        # new and removed directories
+        os.mkdir(self.path('new'))
+        self.make('new/f.mp4')
+        self.check(reader, ['new/f.mp4'], [])
+        shutil.rmtree(self.path('sub'))
+        self.check(reader, [], ['sub/d.mp4'])
+        os.rename(self.path('new'), os.path.join(self.tmp, 'moved'))
+        self.check(reader, [], ['new/f.mp4'])
+
+    def test_inotify(self):
+        reader = self.reader()
+        self.assertIsNotNone(reader.fileno())
+        self.assertEqual(reader.count_files(), 2)
+        self.check(reader, [], [])
+        self.changes(reader)
+
+    def test_mtime_fallback(self):
+        inotify = directory.Inotify
+        def unavailable():
+            raise OSError(38, 'not available')
+        directory.Inotify = unavailable
+        try:
+            reader = self.reader()
+        finally:
+            directory.Inotify = inotify
+        self.assertIsNone(reader.fileno())
+        self.check(reader, [], [])
+        self.changes(reader)
+
+    def test_watch_fallback(self):
+        root = self.root
+        class Full(directory.Inotify):
+            def add_watch(self, path, mask):
+                if path != root:
+                    raise OSError(errno.ENOSPC, os.strerror(errno.ENOSPC), path)
+                return super().add_watch(path, mask)
+        inotify = directory.Inotify
+        directory.Inotify = Full
+        try:
+            reader = self.reader()
+        finally:
+            directory.Inotify = inotify
+        self.assertIsNotNone(reader.fileno())
+        self.assertEqual(list(reader._mtimes), [self.path('sub')])
+        self.assertTrue(reader.polling())
+        self.check(reader, [], [])
+        self.changes(reader)
+        self.assertFalse(reader.polling())
+
+    def test_directory_recreated(self):
+        reader = self.reader()
+        shutil.rmtree(self.root)
+        self.check(reader, [], ['a.mp4', 'sub/b.mp4'])
+        os.mkdir(self.root)
+        self.make('g.mp4')
+        self.check(reader, ['g.mp4'], [])
+
+if __name__ == '__main__':
+    unittest.main()
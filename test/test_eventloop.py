@@ -0,0 +1,70 @@
+import unittest
+import os
+import signal
+import threading
+import time
+from Adafruit_Video_Looper.eventloop import *
+
+class TestEventLoop(unittest.TestCase):
+
+    def setUp(self):
+        self.loop = EventLoop()
+        self.calls = []
+
+    def tearDown(self):
+        self.loop.close()
+
+    def test_timers_order(self):
+        self.loop.call_later(0.02, self.calls.append, 2)
+        self.loop.call_later(0.01, self.calls.append, 1)
+        self.loop.call_later(0.03, self.loop.stop)
+        self.loop.run()
+        self.assertEqual(self.calls, [1, 2])
+
+    def test_timer_cancel(self):
+        timer = self.loop.call_later(0.01, self.calls.append, 1)
+        timer.cancel()
+        self.loop.call_later(0.02, self.loop.stop)
+        self.loop.run()
+        self.assertEqual(self.calls, [])
+
+    def test_reader(self):
+        r, w = os.pipe()
+        def on_read():
+            self.calls.append(os.read(r, 10))
+            self.loop.remove_reader(r)
+            self.loop.stop()
+        self.loop.add_reader(r, on_read)
+        self.loop.call_later(0.01, os.write, w, b'x')
+        self.loop.run()
+        self.assertEqual(self.calls, [b'x'])
+        os.close(r)
+        os.close(w)
+
+    def test_call_soon_threadsafe_wakes(self):
+        def post():
+            time.sleep(0.05)
+            self.loop.call_soon_threadsafe(self.loop.stop)
+        threading.Thread(target=post).start()
+        start = time.monotonic()
+        # no timer pending, only the other thread can wake us up
+        self.loop.run()
+        self.assertLess(time.monotonic() - start, 1)
+
+    def test_call_soon_threadsafe_from_signal(self):
+        # the handler interrupts the loop while it runs the ready callbacks
+        def handler(signum, frame):
+            self.loop.call_soon_threadsafe(self.calls.append, 'signal')
+            self.loop.call_soon_threadsafe(self.loop.stop)
+        previous = signal.signal(signal.SIGUSR2, handler)
+        try:
+            self.loop.call_soon(os.kill, os.getpid(), signal.SIGUSR2)
+            self.loop.call_soon(self.calls.append, 'queued')
+            self.loop.call_later(5, self.loop.stop)
+            self.loop.run()
+        finally:
+            signal.signal(signal.SIGUSR2, previous)
+        self.assertEqual(self.calls, ['queued', 'signal'])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,94 @@
+import unittest
+import configparser
+import os
+import struct
+import tempfile
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+import pygame
+from Adafruit_Video_Looper.framebuffer import *
+from Adafruit_Video_Looper import display
+
+class TestFramebuffer(unittest.TestCase):
+
+    def setUp(self):
+        pygame.display.init()
+        fd, self.path = tempfile.mkstemp()
+        os.close(fd)
+
+    def tearDown(self):
+        pygame.quit()
+        os.remove(self.path)
+
+    def pixel(self, fb, x, y):
+        with open(self.path, 'rb') as f:
+            f.seek(y * fb.stride + x * fb.bpp // 8)
+            data = f.read(fb.bpp // 8)
+        return struct.unpack('<H' if fb.bpp == 16 else '<I', data)[0]
+
+    def test_parse_geometry(self):
+        self.assertEqual(parse_geometry('64x32x16'), (64, 32, 16))
+        self.assertRaises(ValueError, parse_geometry, '64x32')
+        self.assertRaises(ValueError, parse_geometry, '64x32x12')
+
+    def test_regular_file_needs_geometry(self):
+        self.assertRaises(ValueError, Framebuffer, self.path)
+
+    def test_present_32bpp(self):
+        fb = Framebuffer(self.path, (64, 32, 32))
+        self.assertEqual(os.path.getsize(self.path), 64 * 32 * 4)
+        self.assertFalse(fb.double_buffered)
+        surface = pygame.Surface(fb.size)
+        surface.fill((255, 0, 0))
+        surface.fill((0, 0, 255), pygame.Rect(10, 5, 4, 4))
+        fb.present(surface)
+        self.assertEqual(self.pixel(fb, 0, 0) & 0xFFFFFF, 0xFF0000)
+        self.assertEqual(self.pixel(fb, 11, 6) & 0xFFFFFF, 0x0000FF)
+        fb.close()
+
+    def test_present_16bpp(self):
+        fb = Framebuffer(self.path, (64, 32, 16))
+        surface = pygame.Surface(fb.size)
+        surface.fill((0, 255, 0))
+        fb.present(surface)
+        self.assertEqual(self.pixel(fb, 63, 31), 0x07E0)
+        fb.close()
+
+    def test_present_rects(self):
+        fb = Framebuffer(self.path, (64, 32, 32))
+        surface = pygame.Surface(fb.size)
+        surface.fill((255, 255, 255))
+        fb.present(surface, [pygame.Rect(8, 8, 4, 4), (60, 30, 10, 10)])
+        self.assertEqual(self.pixel(fb, 0, 0), 0)
+        self.assertEqual(self.pixel(fb, 9, 9) & 0xFFFFFF, 0xFFFFFF)
+        self.assertEqual(self.pixel(fb, 12, 9), 0)
+        # clipped to the screen
+        self.assertEqual(self.pixel(fb, 63, 31) & 0xFFFFFF, 0xFFFFFF)
+        fb.close()
+
+    def test_display_fbdev(self):
+        config = configparser.ConfigParser()
+        config.read_string('[video_looper]\nsdl_device = %s\noutput = fbdev\nfb_geometry = 64x32x32\n' % self.path)
+        screen = display.init(config)
+        try:
+            self.assertEqual(screen.get_size(), (64, 32))
+            screen.fill((0, 255, 0))
+            display.update()
+            with open(self.path, 'rb') as f:
+                self.assertEqual(struct.unpack('<I', f.read(4))[0] & 0xFFFFFF, 0x00FF00)
+        finally:
+            display.quit()
+
+    def test_display_update_single_rect(self):
+        config = configparser.ConfigParser()
+        config.read_string('[video_looper]\nsdl_device = %s\noutput = fbdev\nfb_geometry = 64x32x32\n' % self.path)
+        screen = display.init(config)
+        try:
+            screen.fill((0, 255, 0))
+            display.update(pygame.Rect(1, 1, 4, 4))
+            display.update((10, 1, 4, 4))
+            fb = display._framebuffer
+            self.assertEqual(self.pixel(fb, 0, 0), 0)
+            self.assertEqual(self.pixel(fb, 2, 2) & 0xFFFFFF, 0x00FF00)
+            self.assertEqual(self.pixel(fb, 11, 2) & 0xFFFFFF, 0x00FF00)
+        finally:
+            display.quit()
@@ -1,6 +1,11 @@
 import unittest
 import configparser
 import os
+import json
+import select
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 from Adafruit_Video_Looper.lomo_home import *
 
 class TestLomoHomeReader(unittest.TestCase):
@@ -13,10 +18,16 @@ class TestLomoHomeReader(unittest.TestCase):
         config.read("test/video_looper.ini")
         self.reader = create_file_reader(config, None)
 
+    def tearDown(self):
+        self.reader._mounts.stop()
+        if os.path.exists(self.share_dir):
+            os.rmdir(self.share_dir)
+
     def test_search_paths_home_glob(self):
         config = configparser.ConfigParser()
         config.read("test/video_looper.ini")
         config['lomorage']['mount_path'] = 'test/media/ho*'
+        self.reader._mounts.stop()
         self.reader = create_file_reader(config, None)
         searchPaths = self.reader.search_paths()
         self.assertEqual(len(searchPaths), 1)
@@ -33,13 +44,13 @@ class TestLomoHomeReader(unittest.TestCase):
 
     def test_search_paths_share(self):
         os.mkdir(self.share_dir)
+        self.reader.refresh()
         self.assertTrue(self.reader.is_changed())
         self.assertFalse(self.reader.is_changed())
         searchPaths = self.reader.search_paths()
         self.assertEqual(len(searchPaths), 1)
         self.assertEqual(searchPaths[0], self.share_dir)
         self.assertTrue(self.reader.enable_watchdog())
-        os.rmdir(self.share_dir)
 
     def test_search_paths_changes(self):
         self.assertFalse(self.reader.is_changed())
@@ -49,6 +60,7 @@ class TestLomoHomeReader(unittest.TestCase):
         self.assertFalse(self.reader.enable_watchdog())
 
         os.mkdir(self.share_dir)
+        self.reader.refresh()
         self.assertTrue(self.reader.is_changed())
         self.assertFalse(self.reader.is_changed())
         searchPaths = self.reader.search_paths()
@@ -56,8 +68,111 @@ class TestLomoHomeReader(unittest.TestCase):
         self.assertTrue(self.reader.enable_watchdog())
 
         os.rmdir(self.share_dir)
+        self.reader.refresh()
         self.assertTrue(self.reader.is_changed())
         self.assertFalse(self.reader.is_changed())
         searchPaths = self.reader.search_paths()
         self.assertEqual(searchPaths[0], 'test/media/home')
-        self.assertFalse(self.reader.enable_watchdog())
\ No newline at end of file
+        self.assertFalse(self.reader.enable_watchdog())
+
+    def test_watcher_notifies(self):
+        watcher = MountWatcher({'share': [self.share_dir]}, interval=0.05)
+        watcher.start()
+        try:
+            os.mkdir(self.share_dir)
+            readable, _, _ = select.select([watcher], [], [], 5)
+            self.assertEqual(readable, [watcher])
+            watcher.drain()
+            self.assertEqual(watcher.paths, {'share': (self.share_dir,)})
+        finally:
+            watcher.stop()
+
+
+class HungWatcher(MountWatcher):
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.release = threading.Event()
+        self.started = 0
+
+    def _check(self, patterns):
+        self.started += 1
+        self.release.wait(5)
+        return super()._check(patterns)
+
+
+class TestMountWatcher(unittest.TestCase):
+
+    def test_timeout(self):
+        watcher = HungWatcher({'home': ['test/media/home']}, timeout=0.05)
+        start = time.monotonic()
+        self.assertFalse(watcher.refresh())
+        self.assertFalse(watcher.refresh())
+        self.assertLess(time.monotonic() - start, 1)
+        self.assertEqual(watcher.paths, {'home': ()})
+        # no second check while the first one hangs
+        self.assertEqual(watcher.started, 1)
+        watcher.release.set()
+        watcher._stuck['home'].join(5)
+        self.assertTrue(watcher.refresh())
+        self.assertEqual(watcher.paths, {'home': ('test/media/home',)})
+
+
+class StatusHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    delay = 0
+    code = 200
+    status = {'SystemStatus': 4, 'MountStatus': 0, 'KeepaliveStatus': 0}
+
+    def do_GET(self):
+        time.sleep(self.delay)
+        body = json.dumps(self.status).encode()
+        self.send_response(self.code)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class TestLomoStatusClient(unittest.TestCase):
+
+    def setUp(self):
+        StatusHandler.delay = 0
+        StatusHandler.code = 200
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), StatusHandler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.url = 'http://127.0.0.1:%d/system' % self.server.server_address[1]
+        config = configparser.ConfigParser()
+        config.read("test/video_looper.ini")
+        config['lomorage']['status_url'] = self.url
+        self.reader = create_file_reader(config, None)
+
+    def tearDown(self):
+        self.reader._status_client.stop()
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_status(self):
+        self.assertEqual(self.reader.idle_message(), 'Checking system status...')
+        self.assertTrue(self.reader._status_client.updated.wait(5))
+        self.assertEqual(self.reader.get_lomoframed_status(), (4, 0, 0))
+        self.assertEqual(self.reader.idle_message(), 'LomoFrame bind successfully, you can share Photo with Lomorage APP')
+
+    def test_slow_server_does_not_block(self):
+        StatusHandler.delay = 2
+        start = time.monotonic()
+        self.reader.idle_message()
+        self.reader.idle_message()
+        self.assertLess(time.monotonic() - start, 0.5)
+
+    def test_error_backoff(self):
+        StatusHandler.code = 500
+        client = LomoStatusClient(self.url, interval=0.01)
+        client.start()
+        self.assertTrue(client.updated.wait(5))
+        client.stop()
+        self.assertEqual(client.status, STATUS_ERROR)
+        self.assertGreaterEqual(client.failures, 1)
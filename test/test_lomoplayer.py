@@ -0,0 +1,70 @@
+import unittest
+import configparser
+import os
+import select
+import threading
+import time
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+import pygame
+from Adafruit_Video_Looper.lomoplayer import *
+from Adafruit_Video_Looper.model import getMediaAsset
+
+class TestLomoPlayerImage(unittest.TestCase):
+
+    def setUp(self):
+        pygame.display.init()
+        self.screen = pygame.display.set_mode((320, 240))
+        self.config = configparser.ConfigParser()
+        self.config.read("test/video_looper.ini")
+        self.config['video_looper']['preload'] = '0'
+        self.config['sdl_image']['fade_ms'] = '50'
+        self.asset = getMediaAsset('test/media/home/IMG_6849.png')
+
+    def tearDown(self):
+        pygame.quit()
+
+    def test_play_image(self):
+        self.config['sdl_image']['interval_sec'] = '0'
+        player = create_player(self.config, self.screen)
+        player.play(self.asset)
+        self.assertTrue(player.is_playing())
+        fd = player.fileno()
+        r, _, _ = select.select([fd], [], [], 5)
+        self.assertEqual(r, [fd])
+        self.assertFalse(player.is_playing())
+        player.stop()
+        self.assertIsNone(player.fileno())
+
+    def test_stop_cancels(self):
+        player = create_player(self.config, self.screen)
+        player.play(self.asset)
+        time.sleep(0.1)
+        start = time.monotonic()
+        player.stop(3)
+        self.assertLess(time.monotonic() - start, 0.5)
+        self.assertFalse(player.is_playing())
+
+    def test_stop_while_loading(self):
+        player = create_player(self.config, self.screen)
+        get_image = player._get_image
+        loaded = threading.Event()
+        def slow_get_image(image):
+            loaded.wait(5)
+            return get_image(image)
+        drawn = []
+        player._fader.fade = lambda *args: drawn.append(threading.current_thread())
+        player._get_image = slow_get_image
+        player.play(self.asset)
+        slow = player._ithread
+        player.stop()
+        self.assertTrue(slow.is_alive())
+        player._get_image = get_image
+        threading.Timer(0.2, loaded.set).start()
+        player.play(self.asset)
+        # the next render started once the slow one ended, without drawing
+        self.assertFalse(slow.is_alive())
+        self.assertNotIn(slow, drawn)
+        player.stop()
+
+if __name__ == '__main__':
+    unittest.main()
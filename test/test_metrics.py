@@ -0,0 +1,149 @@
+import unittest
+import configparser
+import http.client
+import json
+import os
+import shutil
+import socket
+import tempfile
+from Adafruit_Video_Looper.metrics import *
+
+
+class UnixHTTPConnection(http.client.HTTPConnection):
+
+    def __init__(self, path):
+        super().__init__('localhost')
+        self._path = path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.connect(self._path)
+
+
+class TestMetrics(unittest.TestCase):
+
+    def setUp(self):
+        self.registry = Registry()
+
+    def test_counter(self):
+        c = self.registry.counter('test_total', 'Test.')
+        c.inc()
+        c.inc(2)
+        self.assertEqual(c.value, 3)
+        self.assertIs(self.registry.counter('test_total', 'Test.'), c)
+
+    def test_labels(self):
+        c = self.registry.counter('test_total', 'Test.', ['result'])
+        c.labels('hit').inc()
+        c.labels('hit').inc()
+        c.labels('miss').inc()
+        self.assertEqual(self.registry.snapshot(), {'test_total': {'result=hit': 2, 'result=miss': 1}})
+
+    def test_gauge(self):
+        g = self.registry.gauge('test_gauge', 'Test.')
+        g.set(5)
+        self.assertEqual(g.value, 5)
+        g.set_function(lambda: 7)
+        self.assertEqual(g.value, 7)
+
+    def test_histogram(self):
+        h = self.registry.histogram('test_seconds', 'Test.', buckets=(0.1, 1))
+        h.observe(0.05)
+        h.observe(0.5)
+        h.observe(5)
+        with h.time():
+            pass
+        self.assertEqual(h.count, 4)
+        snapshot = self.registry.snapshot()['test_seconds']
+        self.assertEqual(snapshot['buckets'], {'0.1': 2, '1.0': 3, '+Inf': 4})
+        self.assertAlmostEqual(snapshot['sum'], 5.55, places=2)
+
+    def test_prometheus(self):
+        self.registry.counter('test_total', 'Test "counter".', ['result']).labels('hit').inc()
+        self.registry.histogram('test_seconds', 'Test.', buckets=(1,)).observe(0.5)
+        text = self.registry.prometheus()
+        self.assertIn('# HELP test_total Test \\"counter\\".\n', text)
+        self.assertIn('# TYPE test_total counter\n', text)
+        self.assertIn('test_total{result="hit"} 1\n', text)
+        self.assertIn('# TYPE test_seconds histogram\n', text)
+        self.assertIn('test_seconds_bucket{le="1.0"} 1\n', text)
+        self.assertIn('test_seconds_bucket{le="+Inf"} 1\n', text)
+        self.assertIn('test_seconds_count 1\n', text)
+
+    def test_rss(self):
+        self.assertGreater(REGISTRY.snapshot()['looper_rss_bytes'], 0)
+
+
+class TestExporters(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.registry = Registry()
+        self.registry.counter('test_total', 'Test.').inc()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def get(self, conn, path):
+        conn.request('GET', path)
+        response = conn.getresponse()
+        return response.status, response.read().decode()
+
+    def test_tcp(self):
+        server = MetricsServer('127.0.0.1:0', self.registry)
+        server.start()
+        try:
+            host, port = server.address.split(':')
+            conn = http.client.HTTPConnection(host, int(port), timeout=5)
+            status, body = self.get(conn, '/metrics')
+            self.assertEqual(status, 200)
+            self.assertIn('test_total 1\n', body)
+            status, body = self.get(conn, '/metrics.json')
+            self.assertEqual(json.loads(body), {'test_total': 1})
+            status, body = self.get(conn, '/other')
+            self.assertEqual(status, 404)
+            conn.close()
+        finally:
+            server.stop()
+
+    def test_unix(self):
+        path = os.path.join(self.tmpdir, 'metrics.sock')
+        server = MetricsServer('unix:' + path, self.registry)
+        server.start()
+        try:
+            conn = UnixHTTPConnection(path)
+            status, body = self.get(conn, '/metrics')
+            self.assertEqual(status, 200)
+            self.assertIn('test_total 1\n', body)
+            conn.close()
+        finally:
+            server.stop()
+        self.assertFalse(os.path.exists(path))
+
+    def test_snapshot(self):
+        path = os.path.join(self.tmpdir, 'metrics.json')
+        writer = SnapshotWriter(path, 60, self.registry)
+        writer.start()
+        writer.stop()
+        with open(path) as f:
+            self.assertEqual(json.load(f)['metrics'], {'test_total': 1})
+
+    def test_configure(self):
+        config = configparser.ConfigParser()
+        config.read_dict({'metrics': {'enabled': 'false', 'listen': '127.0.0.1:0'}})
+        exporters = configure(config)
+        self.assertIsNone(exporters.server)
+        exporters.stop()
+        config['metrics'].update({'enabled': 'true',
+                                  'snapshot_path': os.path.join(self.tmpdir, 'metrics.json')})
+        exporters = configure(config)
+        try:
+            self.assertIsNotNone(exporters.server)
+            self.assertIsNotNone(exporters.writer)
+        finally:
+            exporters.stop()
+        self.assertTrue(os.path.exists(os.path.join(self.tmpdir, 'metrics.json')))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -4,6 +4,34 @@ from Adafruit_Video_Looper.model import *
 from watchdog import events
 from shutil import copyfile
 
+class TestMediaAsset(unittest.TestCase):
+
+    def test_from_name(self):
+        asset = getMediaAsset('/media/share/a//clip_repeat_3x.mp4')
+        self.assertEqual(asset.filename, '/media/share/a//clip_repeat_3x.mp4')
+        self.assertEqual(asset.title, 'clip_repeat_3x')
+        self.assertEqual(asset.repeats, 3)
+        self.assertEqual(str(asset), '/media/share/a//clip_repeat_3x.mp4 (clip_repeat_3x)')
+        self.assertEqual(getMediaAsset('file4').filename, 'file4')
+        self.assertEqual(getMediaAsset('file4').repeats, 1)
+
+    def test_explicit(self):
+        asset = MediaAsset('/media/share/a.mp4', 'Title')
+        self.assertEqual((asset.title, asset.repeats), ('Title', 1))
+        asset = MediaAsset('/media/share/b_repeat_2x.mp4')
+        self.assertEqual((asset.title, asset.repeats), (None, 1))
+        asset.repeats = '4'
+        self.assertEqual(asset.repeats, 4)
+
+    def test_compact(self):
+        a = getMediaAsset('/media/share/x/a.jpg')
+        b = getMediaAsset('/media/share/x/b.jpg')
+        self.assertFalse(hasattr(a, '__dict__'))
+        self.assertEqual(a._prefix, b._prefix)
+        self.assertEqual(a, getMediaAsset('/media/share/x/a.jpg'))
+        self.assertNotEqual(a, b)
+        self.assertLess(a, b)
+
 class TestSimplePlaylist(unittest.TestCase):
 
     def setUp(self):
@@ -14,13 +42,13 @@ class TestSimplePlaylist(unittest.TestCase):
         self.playlist.load()
 
     def test_next_random(self):
-        self.assertEqual(self.playlist.length(), 3)
+        self.assertEqual(self.playlist.length(), 2)
         self.assertIsNotNone(self.playlist.get_next(True))
         self.assertIsNotNone(self.playlist.get_next(True))
         self.assertIsNotNone(self.playlist.get_next(True))
 
     def test_next(self):
-        self.assertEqual(self.playlist.length(), 3)
+        self.assertEqual(self.playlist.length(), 2)
         self.assertEqual(self.playlist.get_next(False).filename, self.file_list[0])
         self.assertEqual(self.playlist.get_next(False).filename, self.file_list[1])
         self.assertEqual(self.playlist.get_next(False).filename, self.file_list[0])
@@ -34,6 +62,66 @@ class TestSimplePlaylist(unittest.TestCase):
         self.assertIsNone(playlist.get_next(True))
         self.assertIsNone(playlist.get_next(False))
 
+    def test_media_type(self):
+        config = configparser.ConfigParser()
+        config.read("test/video_looper.ini")
+        files = ['a.mp4', 'b.png', 'c.MOV', 'd.txt']
+        config['playlist']['media_type'] = 'video'
+        playlist = SimplePlaylist([getMediaAsset(f) for f in files], config)
+        playlist.load()
+        self.assertEqual(playlist.length(), 2)
+        config['playlist']['media_type'] = 'all'
+        assets = [getMediaAsset(f) for f in files]
+        for asset in assets:
+            asset.short = False
+        playlist = SimplePlaylist(assets, config)
+        playlist.load()
+        self.assertEqual(playlist.length(), 3)
+        self.assertEqual(playlist.get_next(False).filename, 'a.mp4')
+        self.assertEqual(playlist.get_next(False).filename, 'b.png')
+
+    def test_no_eligible_asset(self):
+        config = configparser.ConfigParser()
+        config.read("test/video_looper.ini")
+        playlist = SimplePlaylist([getMediaAsset(f) for f in ['a.mp4', 'b.mov']], config)
+        playlist.load()
+        self.assertEqual(playlist.length(), 0)
+        self.assertIsNone(playlist.get_next(False))
+        self.assertIsNone(playlist.get_next(True))
+
+    def test_short_videos(self):
+        config = configparser.ConfigParser()
+        config.read("test/video_looper.ini")
+        config['playlist']['media_type'] = 'video'
+        assets = [getMediaAsset(f) for f in ['a.mp4', 'b.mp4']]
+        for asset in assets:
+            asset.short = True
+        playlist = SimplePlaylist(assets, config)
+        playlist.load()
+        self.assertIsNone(playlist.get_next(False))
+        self.assertIsNone(playlist.get_next(True))
+        assets[1].short = False
+        self.assertEqual(playlist.get_next(False).filename, 'b.mp4')
+
+    def test_short_videos_random(self):
+        config = configparser.ConfigParser()
+        config.read("test/video_looper.ini")
+        config['playlist']['media_type'] = 'video'
+        config['video_looper']['preload'] = '2'
+        assets = [getMediaAsset(f) for f in ['a.mp4', 'b.mp4', 'c.mp4']]
+        assets[0].short = assets[1].short = True
+        assets[2].short = False
+        playlist = SimplePlaylist(assets, config)
+        playlist.load()
+        for _ in range(500):
+            self.assertEqual(playlist.get_next(True).filename, 'c.mp4')
+        loader = ResourceLoader(playlist, config)
+        try:
+            for _ in range(20):
+                self.assertEqual(loader.get_next(True).filename, 'c.mp4')
+        finally:
+            loader.stop()
+
 class TestCacheFilePlayList(unittest.TestCase):
 
     def setUp(self):
@@ -86,6 +174,55 @@ class TestCacheFilePlayList(unittest.TestCase):
         self.assertIsNone(playlist.get_next(True))
         self.assertIsNone(playlist.get_next(False))
 
+    def test_streaming(self):
+        self.playlist.removeCacheFile()
+        config = configparser.ConfigParser()
+        config.read("test/video_looper.ini")
+        config['playlist']['stream_after'] = '1'
+        playlist = CacheFilePlayList(['test/media/home'], '*.png', config)
+        progress = []
+        playlist.load(progress.append)
+        self.assertGreaterEqual(playlist.length(), 1)
+        self.assertGreaterEqual(progress[-1], 1)
+        self.assertIsNotNone(playlist.get_next(False))
+        self.assertTrue(playlist.wait_scanned(5))
+        self.assertTrue(playlist.cacheFileExists())
+        self.assertEqual(playlist.length(), 2)
+        self.assertFalse(os.path.exists(playlist.cache_file_path + '.tmp'))
+
+    def test_patch(self):
+        first = 'test/media/home/20190601_12440.png'
+        self.assertEqual(self.playlist.get_next(False).filename, first)
+        self.assertTrue(self.playlist.patch([self.another_file, 'test/media/home/notes.txt'], [first]))
+        self.assertEqual(self.playlist.length(), 2)
+        self.assertEqual(self.playlist.get_next(False).filename, 'test/media/home/IMG_6849.png')
+        self.assertEqual(self.playlist.get_next(False).filename, self.another_file)
+        # the removal is held back, the addition appended
+        self.assertEqual(list(a.filename for a in cacheIter(self.playlist.cache_file_path)),
+                         [first, 'test/media/home/IMG_6849.png', self.another_file])
+        self.playlist.stop()
+        self.assertEqual(list(a.filename for a in cacheIter(self.playlist.cache_file_path)),
+                         ['test/media/home/IMG_6849.png', self.another_file])
+        self.playlist.patch([], ['test/media/home/IMG_6849.png', self.another_file])
+        self.assertEqual(self.playlist.length(), 0)
+        self.assertFalse(self.playlist.cacheFileExists())
+
+    def test_patch_rewrite(self):
+        first = 'test/media/home/20190601_12440.png'
+        cache = self.playlist.cache_file_path
+        self.playlist.patch([], [first])
+        self.playlist.patch([first], [])
+        self.playlist.patch([self.another_file], [])
+        # added back before the rewrite, listed once
+        self.playlist.stop()
+        self.assertEqual(list(a.filename for a in cacheIter(cache)),
+                         [first, 'test/media/home/IMG_6849.png', self.another_file])
+        self.playlist.patch([], [first])
+        self.playlist._cache_removed_since -= CACHE_REWRITE_SEC
+        self.playlist.patch([], [])
+        self.assertEqual(list(a.filename for a in cacheIter(cache)),
+                         ['test/media/home/IMG_6849.png', self.another_file])
+
 class TestWatchDogPlaylist(unittest.TestCase):
 
     def setUp(self):
@@ -126,6 +263,11 @@ class TestWatchDogPlaylist(unittest.TestCase):
         self.assertEqual(self.playlist.length(), 3)
         self.assertEqual(self.playlist.get_next(True).filename, asset_name_lst[0])
 
+    def test_add_other_type(self):
+        e = events.FileCreatedEvent('added.mp4')
+        self.playlist._wrap_asset_iter.on_created(e)
+        self.assertEqual(self.playlist.length(), 2)
+
     def test_add_remove(self):
         e = events.FileCreatedEvent('added.jpg')
         self.playlist._wrap_asset_iter.on_created(e)
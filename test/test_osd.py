@@ -0,0 +1,48 @@
+import unittest
+import os
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+import pygame
+from Adafruit_Video_Looper.osd import *
+
+class TestOSD(unittest.TestCase):
+
+    def setUp(self):
+        pygame.display.init()
+        pygame.font.init()
+        self.screen = pygame.display.set_mode((640, 480))
+        self.font = pygame.font.Font(None, 50)
+        self.osd = OSD(self.screen, (255, 255, 255), (0, 0, 0))
+
+    def tearDown(self):
+        pygame.quit()
+
+    def test_label_cache(self):
+        label = self.osd.render_text('hello', self.font)
+        self.assertIs(self.osd.render_text('hello', self.font), label)
+        self.assertIsNot(self.osd.render_text('world', self.font), label)
+
+    def test_unchanged_frame_not_redrawn(self):
+        label = self.osd.render_text('hello', self.font)
+        self.assertEqual(self.osd.show_centered(label), [self.screen.get_rect()])
+        self.assertEqual(self.osd.show_centered(self.osd.render_text('hello', self.font)), [])
+
+    def test_dirty_rects(self):
+        label1 = self.osd.render_text('Found 2 assets.', self.font)
+        self.osd.show([(label1, (10, 10)), (self.osd.render_text('5', self.font), (10, 100))])
+        dirty = self.osd.show([(label1, (10, 10)), (self.osd.render_text('4', self.font), (10, 100))])
+        # the old and the new number, not the static line
+        self.assertEqual(len(dirty), 2)
+        self.assertTrue(all(r.top >= 100 for r in dirty))
+
+    def test_invalidate(self):
+        label = self.osd.render_text('hello', self.font)
+        self.osd.show_centered(label)
+        self.osd.invalidate()
+        self.assertEqual(self.osd.show_centered(label), [self.screen.get_rect()])
+
+    def test_stack_too_tall(self):
+        tall = pygame.Surface((10, 300))
+        self.assertEqual(self.osd.show_stack([tall, tall], 50), [])
+
+if __name__ == '__main__':
+    unittest.main()
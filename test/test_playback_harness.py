@@ -0,0 +1,48 @@
+import unittest
+import os
+import shutil
+import tempfile
+import time
+from bench.playback_harness import Harness, run, gaps, percentile
+
+@unittest.skipUnless(os.path.exists('/proc/self/stat'), 'needs /proc')
+class TestPlaybackHarness(unittest.TestCase):
+
+    def test_playback(self):
+        metrics, timeline = run(videos=2, assets=3, startup=0.05, duration=0.3)
+        self.assertLess(metrics['time_to_first_asset_ms'], 20000)
+        self.assertEqual(metrics['gaps'], 2)
+        # the stub's startup is part of every gap
+        self.assertGreaterEqual(metrics['gap_mean_ms'], 50)
+        self.assertLess(metrics['gap_p95_ms'], 2000)
+        self.assertLess(metrics['reload_latency_ms'], 5000)
+        self.assertIn('reload', [kind for _, kind, _ in timeline])
+
+    def test_added_to_looping_video(self):
+        # a single video plays in a loop (the stub plays it for a minute),
+        # a video added meanwhile must get its turn
+        tmpdir = tempfile.mkdtemp()
+        harness = Harness(tmpdir, videos=1, startup=0.05, duration=60)
+        try:
+            harness.start()
+            harness.wait_for('start', 1, timeout=30)
+            added = time.time()
+            with open(os.path.join(harness.media, 'clip999.mp4'), 'w'):
+                pass
+            start = harness.wait_for('start', 1, after=added, timeout=20)[0]
+            self.assertEqual(os.path.basename(start[2]), 'clip999.mp4')
+        finally:
+            harness.stop()
+            shutil.rmtree(tmpdir)
+
+class TestMetrics(unittest.TestCase):
+
+    def test_gaps(self):
+        timeline = [(0.0, 'launch', None), (1.0, 'start', 'a'), (2.0, 'stop', 'a'),
+                    (2.5, 'start', 'b'), (3.0, 'stop', 'b'), (3.2, 'start', 'a')]
+        self.assertEqual([round(g, 3) for g in gaps(timeline)], [0.5, 0.2])
+        self.assertEqual(percentile([3, 1, 2], 50), 2)
+        self.assertEqual(percentile([], 95), 0.0)
+
+if __name__ == '__main__':
+    unittest.main()
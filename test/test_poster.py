@@ -0,0 +1,112 @@
+import unittest
+import os
+import shutil
+import tempfile
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+import pygame
+from Adafruit_Video_Looper.poster import *
+
+FRAME = os.path.abspath('test/media/home/IMG_6849.png')
+
+# Stands in for ffmpeg: "extracts" a test image to the output path (last
+# argument) and records the call.
+STUB_FFMPEG = '''#!/bin/sh
+for last; do :; done
+echo "$@" >> "%s"
+%s
+/bin/cp "%s" "$last"
+'''
+
+class TestPosterCache(unittest.TestCase):
+
+    def setUp(self):
+        pygame.display.init()
+        pygame.display.set_mode((320, 240))
+        self.tmp = tempfile.mkdtemp()
+        self.bin = os.path.join(self.tmp, 'bin')
+        os.mkdir(self.bin)
+        self.calls = os.path.join(self.tmp, 'calls')
+        self.video = os.path.join(self.tmp, 'movie.mp4')
+        open(self.video, 'w').close()
+        self.path = os.environ['PATH']
+        os.environ['PATH'] = self.bin
+
+    def tearDown(self):
+        os.environ['PATH'] = self.path
+        shutil.rmtree(self.tmp)
+        pygame.quit()
+
+    def stub_ffmpeg(self, fail=False):
+        ffmpeg = os.path.join(self.bin, 'ffmpeg')
+        with open(ffmpeg, 'w') as f:
+            f.write(STUB_FFMPEG % (self.calls, 'exit 1' if fail else '', FRAME))
+        os.chmod(ffmpeg, 0o755)
+
+    def ncalls(self):
+        if not os.path.exists(self.calls):
+            return 0
+        with open(self.calls) as f:
+            return len(f.readlines())
+
+    def test_cached(self):
+        self.stub_ffmpeg()
+        posters = PosterCache(os.path.join(self.tmp, 'cache'), (320, 240))
+        self.assertIsInstance(posters.load(self.video), pygame.Surface)
+        self.assertIsInstance(posters.load(self.video), pygame.Surface)
+        self.assertEqual(self.ncalls(), 1)
+        self.assertEqual((posters.stats.hits, posters.stats.misses), (1, 1))
+        self.assertEqual(posters.stats.hit_rate, 0.5)
+
+        # survives a restart
+        posters = PosterCache(os.path.join(self.tmp, 'cache'), (320, 240))
+        self.assertIsNotNone(posters.load(self.video))
+        self.assertEqual(self.ncalls(), 1)
+
+        # but not the video changing
+        st = os.stat(self.video)
+        os.utime(self.video, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+        self.assertIsNotNone(posters.load(self.video))
+        self.assertEqual(self.ncalls(), 2)
+        self.assertEqual((posters.stats.hits, posters.stats.misses), (1, 1))
+
+    def test_prune(self):
+        self.stub_ffmpeg()
+        cache = os.path.join(self.tmp, 'cache')
+        posters = PosterCache(cache, (320, 240), max_posters=2)
+        videos = []
+        for i in range(4):
+            videos.append(os.path.join(self.tmp, 'movie%d.mp4' % i))
+            open(videos[-1], 'w').close()
+        def age(video, seconds):
+            path = posters.path_for(video)
+            st = os.stat(path)
+            os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns - seconds * 10**9))
+        posters.load(videos[0])
+        age(videos[0], 20)
+        posters.load(videos[1])
+        age(videos[1], 10)
+        posters.load(videos[2])
+        self.assertEqual(sorted(os.listdir(cache)),
+                         sorted(os.path.basename(posters.path_for(v)) for v in videos[1:3]))
+        # showing a poster makes it the most recently used
+        posters.load(videos[1])
+        age(videos[2], 10)
+        posters.load(videos[3])
+        self.assertEqual(sorted(os.listdir(cache)),
+                         sorted(os.path.basename(posters.path_for(v)) for v in (videos[1], videos[3])))
+
+    def test_failure(self):
+        self.stub_ffmpeg(fail=True)
+        posters = PosterCache(os.path.join(self.tmp, 'cache'), (320, 240))
+        self.assertIsNone(posters.load(self.video))
+        self.assertEqual(posters.stats.failures, 1)
+        self.assertEqual(os.listdir(os.path.join(self.tmp, 'cache')), [])
+
+    def test_no_ffmpeg(self):
+        posters = PosterCache(os.path.join(self.tmp, 'cache'), (320, 240))
+        self.assertIsNone(posters.load(self.video))
+        self.assertIsNone(posters.load(self.video))
+        self.assertEqual(posters.stats.failures, 0)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,53 @@
+import unittest
+import os
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+import pygame
+from Adafruit_Video_Looper.resample import *
+
+class TestResample(unittest.TestCase):
+
+    def setUp(self):
+        pygame.display.init()
+        pygame.display.set_mode((64, 64))
+        self.img = pygame.image.load('test/media/home/IMG_6849.png').convert()  # 640x1136
+
+    def tearDown(self):
+        pygame.quit()
+
+    def test_choose(self):
+        self.assertEqual(choose((4000, 3000), (1440, 1080)), AREA)
+        self.assertEqual(choose((640, 480), (1440, 1080)), BILINEAR)
+
+    def test_tile_rows(self):
+        # 1136 -> 568 maps every output row on 2 source rows
+        self.assertEqual(tile_rows(1136, 568, 4), 142)
+        # 3000 -> 1080 on 9 output rows = 25 source rows
+        self.assertEqual(tile_rows(3000, 1080, 4) % 9, 0)
+        # no exact split
+        self.assertIsNone(tile_rows(1137, 568, 4))
+        self.assertIsNone(tile_rows(1136, 568, 1))
+
+    def test_area(self):
+        checker = pygame.Surface((4, 4)).convert()
+        checker.fill((0, 0, 0))
+        for x, y in ((0, 0), (2, 0), (0, 2), (2, 2)):
+            checker.fill((200, 200, 200), (x, y, 1, 1))
+        out = resample(checker, (2, 2))
+        self.assertEqual(out.get_at((1, 1))[:3], (50, 50, 50))
+
+    def test_tiled_matches_untiled(self):
+        whole = resample(self.img, (320, 568), tiles=1)
+        tiled = resample(self.img, (320, 568), tiles=4)
+        self.assertEqual(tiled.get_size(), (320, 568))
+        self.assertFalse(self.img.get_locked())
+        for x in range(0, 320, 7):
+            for y in range(0, 568, 7):
+                a, b = whole.get_at((x, y)), tiled.get_at((x, y))
+                self.assertLessEqual(max(abs(a[i] - b[i]) for i in range(3)), 1, (x, y))
+
+    def test_nearest(self):
+        out = resample(self.img, (320, 568), NEAREST)
+        self.assertEqual(out.get_at((10, 10)), pygame.transform.scale(self.img, (320, 568)).get_at((10, 10)))
+
+if __name__ == '__main__':
+    unittest.main()
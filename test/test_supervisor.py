@@ -0,0 +1,50 @@
+import unittest
+import time
+from Adafruit_Video_Looper.supervisor import *
+
+class TestChildProcess(unittest.TestCase):
+
+    def test_wait_exit(self):
+        p = ChildProcess(['sleep', '0.2'])
+        self.assertTrue(p.is_running())
+        self.assertIsNotNone(p.fileno())
+        self.assertFalse(p.wait(0))
+        self.assertTrue(p.wait(5))
+        self.assertEqual(p.returncode, 0)
+        self.assertFalse(p.is_running())
+
+    def test_stop_terminate(self):
+        p = ChildProcess(['sleep', '10'])
+        start = time.monotonic()
+        self.assertTrue(p.stop(3))
+        # SIGTERM is enough, no need to sit out the timeout
+        self.assertLess(time.monotonic() - start, 0.5)
+        self.assertEqual(p.returncode, -signal.SIGTERM)
+
+    def test_stop_escalate(self):
+        p = ChildProcess(['sh', '-c', 'trap "" TERM; sleep 10'],
+                         ladder=((signal.SIGTERM, 0.2), (signal.SIGKILL, None)))
+        # give the shell time to install its trap
+        self.assertFalse(p.wait(0.2))
+        start = time.monotonic()
+        self.assertTrue(p.stop(3))
+        elapsed = time.monotonic() - start
+        self.assertGreaterEqual(elapsed, 0.2)
+        self.assertLess(elapsed, 1)
+        self.assertEqual(p.returncode, -signal.SIGKILL)
+
+    def test_stop_only_own_process(self):
+        p1 = ChildProcess(['sleep', '10'])
+        p2 = ChildProcess(['sleep', '10'])
+        self.assertTrue(p1.stop(3))
+        self.assertTrue(p2.is_running())
+        self.assertTrue(p2.stop(3))
+
+    def test_stop_exited(self):
+        p = ChildProcess(['true'])
+        self.assertTrue(p.wait(5))
+        self.assertTrue(p.stop(3))
+        self.assertTrue(p.stop(0))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,180 @@
+import unittest
+import configparser
+import json
+import os
+import shutil
+import tempfile
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+import pygame
+from Adafruit_Video_Looper.sync_manifest import *
+from Adafruit_Video_Looper import usb_drive_copymode
+from Adafruit_Video_Looper.usb_drive_copymode import USBDriveReaderCopy
+
+class TestSyncManifest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.drive = os.path.join(self.tmp, 'drive')
+        self.target = os.path.join(self.tmp, 'target')
+        os.mkdir(self.drive)
+        os.mkdir(self.target)
+        for name in ('a.mp4', 'b.mp4', 'c.mp4'):
+            self.write(self.drive, name, name.encode() * 1000)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+
+    def write(self, directory, name, data):
+        with open(os.path.join(directory, name), 'wb') as f:
+            f.write(data)
+
+    def sync(self, replace=True, use_hash=True):
+        """What copy mode does, return (copied, deleted)."""
+        manifest = SyncManifest(self.target, use_hash).load()
+        sources = {x: os.path.join(self.drive, x) for x in os.listdir(self.drive)}
+        targets = [x for x in os.listdir(self.target) if not x.startswith('.')]
+        to_copy, to_delete = manifest.plan(sources, targets, replace)
+        for x in to_delete:
+            os.remove(os.path.join(self.target, x))
+            manifest.forget(x)
+        for x in to_copy:
+            shutil.copyfile(sources[x], os.path.join(self.target, x))
+            manifest.record(x, sources[x])
+        manifest.save()
+        return to_copy, to_delete
+
+    def test_incremental(self):
+        self.assertEqual(self.sync(), (['a.mp4', 'b.mp4', 'c.mp4'], []))
+        self.assertEqual(self.sync(), ([], []))
+        self.write(self.drive, 'b.mp4', b'changed')
+        self.write(self.drive, 'd.mp4', b'new')
+        self.assertEqual(self.sync(), (['b.mp4', 'd.mp4'], []))
+        self.assertEqual(self.sync(), ([], []))
+
+    def test_removed(self):
+        self.sync()
+        os.remove(os.path.join(self.drive, 'a.mp4'))
+        self.assertEqual(self.sync(replace=False), ([], []))
+        self.assertTrue(os.path.exists(os.path.join(self.target, 'a.mp4')))
+        self.assertEqual(self.sync(replace=True), ([], ['a.mp4']))
+        self.assertFalse(os.path.exists(os.path.join(self.target, 'a.mp4')))
+
+    def test_target_changed(self):
+        self.sync()
+        self.write(self.target, 'c.mp4', b'tampered')
+        os.remove(os.path.join(self.target, 'a.mp4'))
+        self.assertEqual(self.sync(), (['a.mp4', 'c.mp4'], []))
+
+    def test_mtime_only(self):
+        self.sync()
+        path = os.path.join(self.drive, 'a.mp4')
+        st = os.stat(path)
+        os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 3600 * 10**9))
+        self.assertEqual(self.sync(), ([], []))
+        os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 7200 * 10**9))
+        self.assertEqual(self.sync(use_hash=False), (['a.mp4'], []))
+
+    def test_bad_manifest(self):
+        self.sync()
+        self.write(self.target, MANIFEST_NAME, b'{not json')
+        self.assertEqual(self.sync(), (['a.mp4', 'b.mp4', 'c.mp4'], []))
+
+    def test_sample_hash(self):
+        big = os.path.join(self.tmp, 'big')
+        with open(big, 'wb') as f:
+            f.write(b'\0' * (SAMPLE_SIZE * 4))
+        h = sample_hash(big)
+        with open(big, 'r+b') as f:
+            f.seek(SAMPLE_SIZE * 4 - 1)
+            f.write(b'\1')
+        self.assertNotEqual(sample_hash(big), h)
+
+class TestCopyFiles(unittest.TestCase):
+    """The manifest as kept by USBDriveReaderCopy.copy_files."""
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.drive = os.path.join(self.tmp, 'drive')
+        self.target = os.path.join(self.tmp, 'target')
+        os.mkdir(self.drive)
+        os.mkdir(self.target)
+        pygame.display.init()
+        pygame.font.init()
+        screen = pygame.display.set_mode((320, 240))
+        config = configparser.ConfigParser()
+        config.read('test/video_looper.ini')
+        config['directory']['path'] = self.target
+        config['copymode'].update({'mode': 'replace', 'password': '', 'copyloader': 'false'})
+        # copy mode takes the extensions from the section named after the player
+        config['lomoplayer'] = {'extensions': config.get('vlc', 'extensions')}
+        # without __init__, it would start monitoring the real USB drives
+        self.reader = USBDriveReaderCopy.__new__(USBDriveReaderCopy)
+        self.reader._config = config
+        self.reader._screen = screen
+        self.reader._load_config(config)
+        self.reader._pygame_init(config)
+
+    def tearDown(self):
+        pygame.quit()
+        shutil.rmtree(self.tmp)
+
+    def write(self, directory, name, data):
+        with open(os.path.join(directory, name), 'wb') as f:
+            f.write(data)
+
+    def manifest(self):
+        with open(os.path.join(self.target, MANIFEST_NAME)) as f:
+            return json.load(f)['files']
+
+    def test_copy_files(self):
+        for name in ('a.mp4', 'b.mp4', 'c.mp4'):
+            self.write(self.drive, name, name.encode() * 1000)
+        self.write(self.target, 'old.mp4', b'old')
+        # c.mp4 can't be written over a directory
+        os.mkdir(os.path.join(self.target, 'c.mp4'))
+
+        self.reader.copy_files([self.drive])
+        self.assertFalse(os.path.exists(os.path.join(self.target, 'old.mp4')))
+        with open(os.path.join(self.target, 'a.mp4'), 'rb') as f:
+            self.assertEqual(f.read(), b'a.mp4' * 1000)
+        manifest = self.manifest()
+        self.assertEqual(sorted(manifest), ['a.mp4', 'b.mp4'])
+        self.assertEqual(manifest['a.mp4']['size'], 5000)
+
+        # a changed file whose copy fails is forgotten, the copy that
+        # works now is recorded
+        self.write(self.drive, 'a.mp4', b'changed')
+        os.remove(os.path.join(self.target, 'a.mp4'))
+        os.mkdir(os.path.join(self.target, 'a.mp4'))
+        os.rmdir(os.path.join(self.target, 'c.mp4'))
+        self.reader.copy_files([self.drive])
+        self.assertEqual(sorted(self.manifest()), ['b.mp4', 'c.mp4'])
+
+    def test_copy_files_errors(self):
+        for name in ('a.mp4', 'b.mp4'):
+            self.write(self.drive, name, name.encode() * 1000)
+        # can't be deleted
+        os.mkdir(os.path.join(self.target, 'old.mp4'))
+        def copy_all(lists, on_progress=None):
+            failed = real_copy_all(lists, on_progress)
+            # the stick is pulled right after the copy
+            os.remove(os.path.join(self.drive, 'b.mp4'))
+            return failed
+        real_copy_all = usb_drive_copymode.copy_all
+        usb_drive_copymode.copy_all = copy_all
+        try:
+            self.reader.copy_files([self.drive])
+        finally:
+            usb_drive_copymode.copy_all = real_copy_all
+        self.assertEqual(sorted(self.manifest()), ['a.mp4'])
+
+        # the manifest can't be saved, copy_files still returns
+        self.write(self.drive, 'a.mp4', b'changed')
+        os.remove(os.path.join(self.target, MANIFEST_NAME))
+        os.mkdir(os.path.join(self.target, MANIFEST_NAME + '.tmp'))
+        self.reader.copy_files([self.drive])
+        with open(os.path.join(self.target, 'a.mp4'), 'rb') as f:
+            self.assertEqual(f.read(), b'changed')
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,74 @@
+import unittest
+import json
+import os
+import shutil
+import tempfile
+import threading
+from Adafruit_Video_Looper import trace
+
+
+class TestTrace(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        trace.clear()
+
+    def tearDown(self):
+        # back to the default buffer, disabled
+        trace.enable(trace.BUFFER_SIZE)
+        trace.disable()
+        trace.clear()
+        shutil.rmtree(self.tmpdir)
+
+    def test_disabled(self):
+        trace.disable()
+        with trace.span('scan'):
+            pass
+        self.assertEqual(trace.spans(), [])
+
+    def test_span(self):
+        trace.enable()
+        with trace.span('decode', {'path': 'a.jpg'}):
+            pass
+        (name, start, duration, tid, args), = trace.spans()
+        self.assertEqual(name, 'decode')
+        self.assertGreaterEqual(duration, 0)
+        self.assertEqual(tid, threading.get_ident())
+        self.assertEqual(args, {'path': 'a.jpg'})
+
+    def test_traced(self):
+        @trace.traced('work')
+        def work(x):
+            return x * 2
+        self.assertEqual(work(2), 4)
+        trace.enable()
+        self.assertEqual(work(3), 6)
+        self.assertEqual([s[0] for s in trace.spans()], ['work'])
+
+    def test_ring_buffer(self):
+        trace.enable(3)
+        for i in range(5):
+            with trace.span('s%d' % i):
+                pass
+        self.assertEqual([s[0] for s in trace.spans()], ['s2', 's3', 's4'])
+
+    def test_dump(self):
+        trace.enable()
+        with trace.span('outer'):
+            with trace.span('inner'):
+                pass
+        path = os.path.join(self.tmpdir, 'trace.json')
+        self.assertEqual(trace.dump(path), 2)
+        with open(path) as f:
+            events = json.load(f)['traceEvents']
+        spans = [e for e in events if e['ph'] == 'X']
+        self.assertEqual(sorted(e['name'] for e in spans), ['inner', 'outer'])
+        inner, outer = sorted(spans, key=lambda e: e['name'])
+        self.assertLessEqual(outer['ts'], inner['ts'])
+        self.assertGreaterEqual(outer['ts'] + outer['dur'], inner['ts'] + inner['dur'])
+        names = [e['args']['name'] for e in events if e['ph'] == 'M']
+        self.assertEqual(names, [threading.current_thread().name])
+
+
+if __name__ == '__main__':
+    unittest.main()
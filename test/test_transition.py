@@ -0,0 +1,77 @@
+import unittest
+import os
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+import pygame
+from Adafruit_Video_Looper.transition import *
+
+class TestFadeEngine(unittest.TestCase):
+
+    def setUp(self):
+        pygame.display.init()
+        self.screen = pygame.display.set_mode((320, 240))
+        self.image = pygame.Surface((100, 50)).convert()
+        self.image.fill((255, 0, 0))
+
+    def tearDown(self):
+        pygame.quit()
+
+    def test_steps(self):
+        fader = FadeEngine(self.screen, (0, 0, 0), 1000, 20)
+        steps = fader.steps(50, 200)
+        self.assertEqual(len(steps), 20)
+        self.assertEqual(steps[-1], 200)
+        self.assertIs(fader.steps(50, 200), steps)
+        self.assertEqual(fader.steps(200, 50)[-1], 50)
+
+    def test_fade_duration(self):
+        fader = FadeEngine(self.screen, (0, 0, 0), 200, 25)
+        stats = fader.fade(self.image, 0, 255)
+        self.assertEqual(stats.frames + stats.dropped, 5)
+        self.assertGreater(stats.elapsed, 0.1)
+        self.assertLess(stats.elapsed, 0.4)
+        self.assertEqual(self.image.get_alpha(), 255)
+
+    def test_fade_skips_late_frames(self):
+        fader = FadeEngine(self.screen, (0, 0, 0), 200, 50)
+        draw = fader._draw
+        def slow_draw(*args):
+            draw(*args)
+            pygame.time.wait(50)
+        fader._draw = slow_draw
+        stats = fader.fade(self.image, 0, 255)
+        self.assertGreater(stats.dropped, 0)
+        self.assertEqual(self.image.get_alpha(), 255)
+        self.assertLess(stats.elapsed, 0.4)
+
+class TestCrossFade(unittest.TestCase):
+
+    def setUp(self):
+        pygame.display.init()
+        self.screen = pygame.display.set_mode((320, 240))
+        self.frame_from = pygame.Surface((320, 240)).convert(self.screen)
+        self.frame_from.fill((0, 100, 255))
+        self.frame_to = pygame.Surface((320, 240)).convert(self.screen)
+        self.frame_to.fill((200, 0, 255))
+
+    def tearDown(self):
+        pygame.quit()
+
+    def test_blend(self):
+        crossfade = CrossFade(self.screen, 100, 20)
+        crossfade.prepare(self.frame_from, self.frame_to)
+        out = crossfade.blend(0)
+        self.assertEqual(tuple(out[10, 10]), (0, 100, 255))
+        out = crossfade.blend(CrossFade.ONE // 2)
+        self.assertEqual(tuple(out[10, 10]), (100, 50, 255))
+        # same buffer every frame
+        self.assertIs(crossfade.blend(CrossFade.ONE), out)
+        self.assertEqual(tuple(out[10, 10]), (200, 0, 255))
+
+    def test_fade(self):
+        crossfade = CrossFade(self.screen, 100, 20)
+        stats = crossfade.fade(self.frame_from, self.frame_to)
+        self.assertEqual(stats.frames + stats.dropped, 2)
+        self.assertEqual(tuple(self.screen.get_at((10, 10)))[:3], (200, 0, 255))
+
+if __name__ == '__main__':
+    unittest.main()
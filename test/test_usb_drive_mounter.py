@@ -0,0 +1,82 @@
+import unittest
+from Adafruit_Video_Looper.usb_drive_mounter import *
+
+ROOT = '/mnt/usbdrive'
+
+MOUNTINFO_TEXT = '''\
+22 1 179:2 / / rw,noatime shared:1 - ext4 /dev/root rw
+35 22 8:1 / /mnt/usbdrive0 ro,relatime shared:20 - vfat /dev/sda1 ro,fmask=0022
+36 22 8:17 / /mnt/usb\\040stick ro,relatime - exfat /dev/sdb1 ro
+'''
+
+A = Partition('uuid:AAAA', '/dev/sda1', 'vfat')
+B = Partition('uuid:BBBB', '/dev/sdb1', 'exfat')
+C = Partition('uuid:CCCC', '/dev/sdc1', 'vfat')
+
+def mounted(*pairs):
+    return [Mount(path, p.node, p.fstype) for p, path in pairs]
+
+class TestMountinfo(unittest.TestCase):
+
+    def test_parse(self):
+        mounts = parse_mountinfo(MOUNTINFO_TEXT)
+        self.assertEqual(mounts[1], Mount('/mnt/usbdrive0', '/dev/sda1', 'vfat'))
+        self.assertEqual(mounts[2].mount_point, '/mnt/usb stick')
+        self.assertEqual(len(mounts), 3)
+
+    def test_partition_key(self):
+        self.assertEqual(partition_key({'ID_FS_UUID': '1234-ABCD', 'ID_SERIAL': 'x'}), 'uuid:1234-ABCD')
+        self.assertEqual(partition_key({'ID_SERIAL': 'Kingston_1', 'ID_PART_ENTRY_NUMBER': '2'}), 'serial:Kingston_1:2')
+        self.assertEqual(partition_key({'DEVNAME': '/dev/sda1'}), 'node:/dev/sda1')
+
+class TestPlan(unittest.TestCase):
+
+    def test_fresh(self):
+        to_mount, to_unmount, slots = plan([A, B], parse_mountinfo(MOUNTINFO_TEXT)[:1], ROOT, {}, {})
+        self.assertEqual(to_mount, [(A, '/mnt/usbdrive0'), (B, '/mnt/usbdrive1')])
+        self.assertEqual(to_unmount, [])
+        self.assertEqual(slots, {A.key: 0, B.key: 1})
+
+    def test_nothing_changed(self):
+        mounts = mounted((A, '/mnt/usbdrive0'), (B, '/mnt/usbdrive1'))
+        to_mount, to_unmount, slots = plan([A, B], mounts, ROOT, {}, {})
+        self.assertEqual((to_mount, to_unmount), ([], []))
+        self.assertEqual(slots, {A.key: 0, B.key: 1})
+
+    def test_removed(self):
+        mounts = mounted((A, '/mnt/usbdrive0'), (B, '/mnt/usbdrive1'))
+        to_mount, to_unmount, slots = plan([B], mounts, ROOT, {}, {})
+        self.assertEqual((to_mount, to_unmount), ([], ['/mnt/usbdrive0']))
+
+    def test_stable_names(self):
+        slots = {A.key: 0, B.key: 1}
+        # A unplugged, C takes the free slot 0
+        to_mount, _, slots = plan([B, C], mounted((B, '/mnt/usbdrive1')), ROOT, {}, slots)
+        self.assertEqual(to_mount, [(C, '/mnt/usbdrive0')])
+        # C unplugged, A plugged back in gets 0 again
+        to_mount, _, slots = plan([A, B], mounted((B, '/mnt/usbdrive1')), ROOT, {}, slots)
+        self.assertEqual(to_mount, [(A, '/mnt/usbdrive0')])
+        # a drive remembered elsewhere keeps its number even if lower ones are free
+        to_mount, _, slots = plan([B], [], ROOT, {}, slots)
+        self.assertEqual(to_mount, [(B, '/mnt/usbdrive1')])
+
+    def test_node_reused(self):
+        # the drive mounted from sda1 was replaced by another one on sda1
+        other = Partition('uuid:DDDD', A.node, 'vfat')
+        mounts = mounted((A, '/mnt/usbdrive0'))
+        to_mount, to_unmount, slots = plan([other], mounts, ROOT, {'/mnt/usbdrive0': A.key}, {A.key: 0})
+        self.assertEqual(to_unmount, ['/mnt/usbdrive0'])
+        self.assertEqual(to_mount, [(other, '/mnt/usbdrive0')])
+
+    def test_duplicate_mount(self):
+        mounts = mounted((A, '/mnt/usbdrive0'), (A, '/mnt/usbdrive3'))
+        to_mount, to_unmount, slots = plan([A], mounts, ROOT, {}, {})
+        self.assertEqual((to_mount, to_unmount), ([], ['/mnt/usbdrive3']))
+
+    def test_ignores_other_mounts(self):
+        mounts = [Mount('/mnt/usbdrive_backup', A.node, 'vfat'), Mount('/media/x', B.node, 'exfat')]
+        to_mount, to_unmount, slots = plan([A], mounts, ROOT, {}, {})
+        self.assertEqual((to_mount, to_unmount), ([(A, '/mnt/usbdrive0')], []))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,63 @@
+import unittest
+import os
+import time
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+import pygame
+from Adafruit_Video_Looper.utils import *
+
+class TestProgressThrottle(unittest.TestCase):
+
+    def setUp(self):
+        self.shown = []
+        self.progress = ProgressThrottle(self.shown.append, interval=60, check_every=4)
+
+    def test_first_and_last_shown(self):
+        for i in range(1, 1001):
+            self.progress(i)
+        self.assertEqual(self.shown, [1])
+        self.progress.flush()
+        self.assertEqual(self.shown, [1, 1000])
+        self.progress.flush()
+        self.assertEqual(self.shown, [1, 1000])
+
+    def test_interval(self):
+        progress = ProgressThrottle(self.shown.append, interval=0.01, check_every=1)
+        progress(1)
+        progress(2)
+        time.sleep(0.02)
+        progress(3)
+        self.assertEqual(self.shown, [1, 3])
+
+    def test_flush_nothing(self):
+        self.progress.flush()
+        self.assertEqual(self.shown, [])
+
+
+class TestLoadImage(unittest.TestCase):
+
+    image = 'test/media/home/IMG_6849.png'  # portrait
+
+    def setUp(self):
+        pygame.display.init()
+        pygame.display.set_mode((320, 180))
+
+    def tearDown(self):
+        pygame.quit()
+
+    def test_fill_color(self):
+        img = load_image_fit_screen(self.image)
+        self.assertEqual(img.get_height(), 180)
+        self.assertLess(img.get_width(), 320)
+
+    def test_fill_blur(self):
+        img = load_image_fit_screen(self.image, FILL_BLUR)
+        self.assertEqual(img.get_size(), (320, 180))
+        fitted = load_image_fit_screen(self.image)
+        x = (320 - fitted.get_width()) // 2
+        # image in the middle, its darker blurred copy on the sides
+        self.assertEqual(img.get_at((x + 10, 90)), fitted.get_at((10, 90)))
+        bar = img.get_at((2, 90))
+        self.assertLessEqual(max(bar[:3]), AMBIENT_BRIGHTNESS + 1)
+
+if __name__ == '__main__':
+    unittest.main()